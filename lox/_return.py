@@ -1,4 +1,25 @@
-class Return(Exception):
+from typing import List
+
+
+class Return:
+    """
+    The completion of a "return" statement. Statements hand it back to
+    whatever executed them instead of raising it, until it reaches the
+    LoxFunction that is being called.
+    """
+
     def __init__(self, value: object):
-        super().__init__(value)
         self.value = value
+
+
+class TailCall:
+    """
+    The completion of a "return" whose value is a call to a Lox function.
+    Instead of making the call, it hands the function and the values of its
+    slots back to the LoxFunction being called, which then runs the callee in
+    its own place.
+    """
+
+    def __init__(self, function: "LoxFunction", values: List[object]):
+        self.function = function
+        self.values = values
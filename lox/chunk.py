@@ -0,0 +1,103 @@
+from array import array
+from bisect import bisect_right
+from enum import IntEnum
+from typing import List
+
+
+class OpCode(IntEnum):
+    # Ordered roughly by how often they execute, since the VM tests them
+    # in this order
+    GET_LOCAL = 0
+    CONSTANT = 1
+    GET_GLOBAL = 2
+    SET_LOCAL = 3
+    POP = 4
+    ADD = 5
+    SUBTRACT = 6
+    LESS = 7
+    POP_JUMP_IF_FALSE = 8
+    LOOP = 9
+    CALL = 10
+    RETURN = 11
+    GET_UPVALUE = 12
+    GET_PROPERTY = 13
+    INVOKE = 14
+    JUMP = 15
+    MULTIPLY = 16
+    GREATER = 17
+    LESS_EQUAL = 18
+    GREATER_EQUAL = 19
+    EQUAL = 20
+    NOT_EQUAL = 21
+    SET_PROPERTY = 22
+    SET_GLOBAL = 23
+    SET_UPVALUE = 24
+    NIL = 25
+    TRUE = 26
+    FALSE = 27
+    DIVIDE = 28
+    NOT = 29
+    NEGATE = 30
+    JUMP_IF_FALSE = 31
+    JUMP_IF_TRUE = 32
+    PRINT = 33
+    DEFINE_GLOBAL = 34
+    CLOSURE = 35
+    CLOSE_UPVALUE = 36
+    GET_SUPER = 37
+    SUPER_INVOKE = 38
+    CLASS = 39
+
+
+class Chunk:
+    """
+    A compiled sequence of instructions.
+
+    Instructions are single bytes followed by their operands. Indexes into the
+    constant pool and jump offsets are two bytes wide (big-endian), everything
+    else is one byte. Line numbers are stored run-length encoded: "_line_starts"
+    holds the offset of the first byte of each run and "_lines" its line.
+    """
+
+    def __init__(self):
+        self.code = bytearray()
+        self.constants: List[object] = []
+        self._constant_indexes = {}
+        self._line_starts = array("I")
+        self._lines = array("I")
+
+    def write(self, byte: int, line: int) -> None:
+        if len(self._lines) == 0 or self._lines[-1] != line:
+            self._line_starts.append(len(self.code))
+            self._lines.append(line)
+        self.code.append(byte)
+
+    def add_constant(self, value: object) -> int:
+        # Identical numbers and strings share a single slot in the pool.
+        # Zero is left out since 0.0 and -0.0 compare equal.
+        shareable = isinstance(value, str) or (isinstance(value, float) and value)
+        if shareable and value in self._constant_indexes:
+            return self._constant_indexes[value]
+
+        self.constants.append(value)
+        index = len(self.constants) - 1
+        if shareable:
+            self._constant_indexes[value] = index
+        return index
+
+    def get_line(self, offset: int) -> int:
+        return self._lines[bisect_right(self._line_starts, offset) - 1]
+
+
+class CompiledFunction:
+    def __init__(self, name: str, arity: int, is_initializer: bool):
+        self.name = name
+        self.arity = arity
+        self.is_initializer = is_initializer
+        self.upvalue_count = 0
+        self.chunk = Chunk()
+
+    def __str__(self) -> str:
+        if self.name == "":
+            return "<script>"
+        return f"<fn {self.name}>"
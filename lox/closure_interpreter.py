@@ -0,0 +1,630 @@
+from typing import Callable, List, Optional, Self
+import expr
+import stmt
+from token_type import TokenType
+from token import Token
+from runtime_error import RuntimeError
+from error_reporter import error_reporter
+from environment import Environment
+from interpreter import Interpreter
+from lox_callable import LoxCallable
+from lox_function import LoxFunction
+from lox_class import LoxClass
+from lox_instance import LoxInstance
+
+
+# A compiled expression evaluates itself in the environment it is given
+ExprFn = Callable[[Environment], object]
+
+# A compiled statement returns None when it completes normally, or a
+# one-element tuple holding the value of the "return" it executed
+StmtFn = Callable[[Environment], Optional[tuple]]
+
+
+class ClosureFunction(LoxFunction):
+    __slots__ = ("_body", "_arity")
+
+    def __init__(
+        self,
+        declaration: stmt.Function,
+        closure: Environment,
+        is_initializer: bool,
+        body: StmtFn,
+        instance: LoxInstance = None,
+    ):
+        super().__init__(declaration, closure, is_initializer, instance)
+        self._body = body
+        self._arity = len(declaration.params)
+
+    def bind(self, instance: LoxInstance) -> Self:
+        return ClosureFunction(
+            self._declaration, self._closure, self._is_initializer, self._body, instance
+        )
+
+    def arity(self) -> int:
+        return self._arity
+
+    def invoke(self, interpreter: Interpreter, values: List[object]) -> object:
+        completion = self._body(self.frame(values))
+
+        if self._is_initializer:
+            return values[0]
+        if completion is not None:
+            return completion[0]
+        return None
+
+
+class ClosureCompiler(expr.Visitor[ExprFn], stmt.Visitor[StmtFn]):
+    """
+    Walks a resolved AST once and turns every node into a Python closure.
+
+    Everything that the tree-walking Interpreter looks up on every execution
+    (the operator, the resolved depth of a variable, literal values) is looked
+    up here once and captured by the closure instead.
+    """
+
+    def __init__(self, interpreter: "ClosureInterpreter"):
+        self._interpreter = interpreter
+        self._globals = interpreter.globals._values
+
+    def compile(self, statements: List[stmt.Stmt]) -> StmtFn:
+        return self._sequence([self._compile_stmt(s) for s in statements])
+
+    def _compile_expr(self, _expr: expr.Expr) -> ExprFn:
+        return _expr.accept(self)
+
+    def _compile_stmt(self, _stmt: stmt.Stmt) -> StmtFn:
+        return _stmt.accept(self)
+
+    def _sequence(self, fns: List[StmtFn]) -> StmtFn:
+        if len(fns) == 1:
+            return fns[0]
+
+        def sequence(env: Environment) -> Optional[tuple]:
+            for fn in fns:
+                completion = fn(env)
+                if completion is not None:
+                    return completion
+            return None
+
+        return sequence
+
+    def _variable(self, _expr: expr.Expr, name: Token) -> ExprFn:
+        lexme = name.lexme
+
+        if _expr.depth is None:
+            values = self._globals
+
+            def global_variable(env: Environment) -> object:
+                try:
+                    return values[lexme]
+                except KeyError:
+                    raise RuntimeError(name, f"Undefined variable '{lexme}'.")
+
+            return global_variable
+
+        distance, slot = _expr.depth, _expr.slot
+        if distance == 0:
+
+            def local_variable(env: Environment) -> object:
+                return env._values[slot]
+
+        elif distance == 1:
+
+            def local_variable(env: Environment) -> object:
+                return env.enclosing._values[slot]
+
+        elif distance == 2:
+
+            def local_variable(env: Environment) -> object:
+                return env.enclosing.enclosing._values[slot]
+
+        else:
+
+            def local_variable(env: Environment) -> object:
+                return env.ancestor(distance)._values[slot]
+
+        return local_variable
+
+    def visit_assign_expr(self, _expr: expr.Assign) -> ExprFn:
+        value_fn = self._compile_expr(_expr.value)
+        name = _expr.name
+        lexme = name.lexme
+
+        if _expr.depth is None:
+            values = self._globals
+
+            def assign_global(env: Environment) -> object:
+                value = value_fn(env)
+                if lexme not in values:
+                    raise RuntimeError(name, f"Undefined variable '{lexme}'.")
+                values[lexme] = value
+                return value
+
+            return assign_global
+
+        distance, slot = _expr.depth, _expr.slot
+        if distance == 0:
+
+            def assign_local(env: Environment) -> object:
+                value = env._values[slot] = value_fn(env)
+                return value
+
+        else:
+
+            def assign_local(env: Environment) -> object:
+                value = env.ancestor(distance)._values[slot] = value_fn(env)
+                return value
+
+        return assign_local
+
+    def visit_binary_expr(self, _expr: expr.Binary) -> ExprFn:
+        left_fn = self._compile_expr(_expr.left)
+        right_fn = self._compile_expr(_expr.right)
+        operator = _expr.operator
+        type = operator.type
+
+        if type == TokenType.PLUS:
+
+            def add(env: Environment) -> object:
+                left = left_fn(env)
+                right = right_fn(env)
+                if left.__class__ is right.__class__ and (
+                    left.__class__ is float or left.__class__ is str
+                ):
+                    return left + right
+                raise RuntimeError(
+                    operator, "Operands must be two numbers or two strings."
+                )
+
+            return add
+
+        if type == TokenType.EQUAL_EQUAL:
+
+            def equal(env: Environment) -> object:
+                left = left_fn(env)
+                right = right_fn(env)
+                return left.__class__ is right.__class__ and left == right
+
+            return equal
+
+        if type == TokenType.BANG_EQUAL:
+
+            def not_equal(env: Environment) -> object:
+                left = left_fn(env)
+                right = right_fn(env)
+                return not (left.__class__ is right.__class__ and left == right)
+
+            return not_equal
+
+        if type == TokenType.SLASH:
+            # Mirrors Interpreter.visit_binary_expr, which does not check
+            # the operands of a division
+            def divide(env: Environment) -> object:
+                return float(left_fn(env)) / float(right_fn(env))
+
+            return divide
+
+        # The remaining operators all require two numbers
+        if type == TokenType.MINUS:
+
+            def number_op(env: Environment) -> object:
+                left = left_fn(env)
+                right = right_fn(env)
+                if left.__class__ is float and right.__class__ is float:
+                    return left - right
+                raise RuntimeError(operator, "Operands must be numbers.")
+
+        elif type == TokenType.STAR:
+
+            def number_op(env: Environment) -> object:
+                left = left_fn(env)
+                right = right_fn(env)
+                if left.__class__ is float and right.__class__ is float:
+                    return left * right
+                raise RuntimeError(operator, "Operands must be numbers.")
+
+        elif type == TokenType.GREATER:
+
+            def number_op(env: Environment) -> object:
+                left = left_fn(env)
+                right = right_fn(env)
+                if left.__class__ is float and right.__class__ is float:
+                    return left > right
+                raise RuntimeError(operator, "Operands must be numbers.")
+
+        elif type == TokenType.GREATER_EQUAL:
+
+            def number_op(env: Environment) -> object:
+                left = left_fn(env)
+                right = right_fn(env)
+                if left.__class__ is float and right.__class__ is float:
+                    return left >= right
+                raise RuntimeError(operator, "Operands must be numbers.")
+
+        elif type == TokenType.LESS:
+
+            def number_op(env: Environment) -> object:
+                left = left_fn(env)
+                right = right_fn(env)
+                if left.__class__ is float and right.__class__ is float:
+                    return left < right
+                raise RuntimeError(operator, "Operands must be numbers.")
+
+        elif type == TokenType.LESS_EQUAL:
+
+            def number_op(env: Environment) -> object:
+                left = left_fn(env)
+                right = right_fn(env)
+                if left.__class__ is float and right.__class__ is float:
+                    return left <= right
+                raise RuntimeError(operator, "Operands must be numbers.")
+
+        else:
+            # Unreachable
+            return lambda env: None
+
+        return number_op
+
+    def visit_call_expr(self, _expr: expr.Call) -> ExprFn:
+        callee_fn = self._compile_expr(_expr.callee)
+        argument_fns = [self._compile_expr(argument) for argument in _expr.arguments]
+        count = len(argument_fns)
+        paren = _expr.paren
+        interpreter = self._interpreter
+
+        def call(env: Environment) -> object:
+            callee = callee_fn(env)
+            arguments = [argument_fn(env) for argument_fn in argument_fns]
+
+            # Fast path for plain compiled functions, which skips the
+            # arity() and call() method dispatch
+            if callee.__class__ is ClosureFunction and not callee._is_initializer:
+                if count != callee._arity:
+                    raise RuntimeError(
+                        paren, f"Expected {callee.arity()} arguments but got {count}."
+                    )
+                if callee._instance is not None:
+                    arguments.insert(0, callee._instance)
+                completion = callee._body(callee.frame(arguments))
+                if completion is not None:
+                    return completion[0]
+                return None
+
+            if not isinstance(callee, LoxCallable):
+                raise RuntimeError(paren, "Can only call functions and classes.")
+
+            if count != callee.arity():
+                raise RuntimeError(
+                    paren, f"Expected {callee.arity()} arguments but got {count}."
+                )
+
+            return callee.call(interpreter, arguments)
+
+        return call
+
+    def visit_get_expr(self, _expr: expr.Get) -> ExprFn:
+        object_fn = self._compile_expr(_expr.object)
+        name = _expr.name
+
+        def get(env: Environment) -> object:
+            _object = object_fn(env)
+            if isinstance(_object, LoxInstance):
+                return _object.get(name)
+
+            raise RuntimeError(name, "Only instances have properties.")
+
+        return get
+
+    def visit_grouping_expr(self, _expr: expr.Grouping) -> ExprFn:
+        # Groupings only matter to the parser
+        return self._compile_expr(_expr.expression)
+
+    def visit_literal_expr(self, _expr: expr.Literal) -> ExprFn:
+        value = _expr.value
+
+        def literal(env: Environment) -> object:
+            return value
+
+        return literal
+
+    def visit_logical_expr(self, _expr: expr.Logical) -> ExprFn:
+        left_fn = self._compile_expr(_expr.left)
+        right_fn = self._compile_expr(_expr.right)
+
+        if _expr.operator.type == TokenType.OR:
+
+            def logical_or(env: Environment) -> object:
+                left = left_fn(env)
+                if left is not None and left is not False:
+                    return left
+                return right_fn(env)
+
+            return logical_or
+
+        def logical_and(env: Environment) -> object:
+            left = left_fn(env)
+            if left is None or left is False:
+                return left
+            return right_fn(env)
+
+        return logical_and
+
+    def visit_set_expr(self, _expr: expr.Set) -> ExprFn:
+        object_fn = self._compile_expr(_expr.object)
+        value_fn = self._compile_expr(_expr.value)
+        name = _expr.name
+
+        def set(env: Environment) -> object:
+            _object = object_fn(env)
+
+            if not isinstance(_object, LoxInstance):
+                raise RuntimeError(name, "Only instances have fields.")
+
+            value = value_fn(env)
+            _object.set(name, value)
+            return value
+
+        return set
+
+    def visit_super_expr(self, _expr: expr.Super) -> ExprFn:
+        distance, slot = _expr.depth, _expr.slot
+        method = _expr.method
+
+        def super_(env: Environment) -> object:
+            superclass = env.get_at(distance, slot)
+            _object = env.get_at(distance - 1, 0)
+
+            function = superclass.find_method(method.lexme)
+            if function is None:
+                raise RuntimeError(method, f"Undefined property '{method.lexme}'.")
+
+            return function.bind(_object)
+
+        return super_
+
+    def visit_this_expr(self, _expr: expr.This) -> ExprFn:
+        return self._variable(_expr, _expr.keyword)
+
+    def visit_unary_expr(self, _expr: expr.Unary) -> ExprFn:
+        right_fn = self._compile_expr(_expr.right)
+        operator = _expr.operator
+
+        if operator.type == TokenType.BANG:
+
+            def bang(env: Environment) -> object:
+                right = right_fn(env)
+                return right is None or right is False
+
+            return bang
+
+        def negate(env: Environment) -> object:
+            right = right_fn(env)
+            if right.__class__ is float:
+                return -right
+            raise RuntimeError(operator, "Operand must be a number.")
+
+        return negate
+
+    def visit_variable_expr(self, _expr: expr.Variable) -> ExprFn:
+        return self._variable(_expr, _expr.name)
+
+    def visit_block_stmt(self, _stmt: stmt.Block) -> StmtFn:
+        body = self.compile(_stmt.statements)
+        if not _stmt.scoped:
+            return body
+
+        size = _stmt.size
+
+        def block(env: Environment) -> Optional[tuple]:
+            return body(Environment(env, [None] * size))
+
+        return block
+
+    def visit_class_stmt(self, _stmt: stmt.Class) -> StmtFn:
+        name = _stmt.name
+        key = self._key(_stmt)
+        superclass_fn = None
+        if _stmt.superclass is not None:
+            superclass_fn = self._compile_expr(_stmt.superclass)
+
+        methods = [
+            (method, self.compile(method.body), method.name.lexme == "init")
+            for method in _stmt.methods
+        ]
+
+        def class_(env: Environment) -> Optional[tuple]:
+            superclass = None
+            if superclass_fn is not None:
+                superclass = superclass_fn(env)
+                if not isinstance(superclass, LoxClass):
+                    raise RuntimeError(
+                        _stmt.superclass.name, "Superclass must be a class."
+                    )
+
+            closure = env
+            if superclass is not None:
+                closure = Environment(env, [superclass])
+
+            functions = {}
+            for declaration, body, is_initializer in methods:
+                functions[declaration.name.lexme] = ClosureFunction(
+                    declaration, closure, is_initializer, body
+                )
+
+            env._values[key] = LoxClass(name.lexme, superclass, functions)
+            return None
+
+        return class_
+
+    def visit_expression_stmt(self, _stmt: stmt.Expression) -> StmtFn:
+        expression_fn = self._compile_expr(_stmt.expression)
+
+        def expression(env: Environment) -> Optional[tuple]:
+            expression_fn(env)
+
+        return expression
+
+    def visit_function_stmt(self, _stmt: stmt.Function) -> StmtFn:
+        body = self.compile(_stmt.body)
+        key = self._key(_stmt)
+
+        def function(env: Environment) -> Optional[tuple]:
+            env._values[key] = ClosureFunction(_stmt, env, False, body)
+
+        return function
+
+    def visit_if_stmt(self, _stmt: stmt.If) -> StmtFn:
+        condition_fn = self._compile_expr(_stmt.condition)
+        then_fn = self._compile_stmt(_stmt.then_branch)
+
+        if _stmt.else_branch is None:
+
+            def if_(env: Environment) -> Optional[tuple]:
+                condition = condition_fn(env)
+                if condition is not None and condition is not False:
+                    return then_fn(env)
+                return None
+
+            return if_
+
+        else_fn = self._compile_stmt(_stmt.else_branch)
+
+        def if_else(env: Environment) -> Optional[tuple]:
+            condition = condition_fn(env)
+            if condition is not None and condition is not False:
+                return then_fn(env)
+            return else_fn(env)
+
+        return if_else
+
+    def visit_print_stmt(self, _stmt: stmt.Print) -> StmtFn:
+        expression_fn = self._compile_expr(_stmt.expression)
+        stringify = self._interpreter._stringify
+
+        def print_(env: Environment) -> Optional[tuple]:
+            print(stringify(expression_fn(env)))
+
+        return print_
+
+    def visit_return_stmt(self, _stmt: stmt.Return) -> StmtFn:
+        if _stmt.value is None:
+            return lambda env: (None,)
+
+        value_fn = self._compile_expr(_stmt.value)
+
+        def return_(env: Environment) -> Optional[tuple]:
+            return (value_fn(env),)
+
+        return return_
+
+    def visit_var_stmt(self, _stmt: stmt.Var) -> StmtFn:
+        key = self._key(_stmt)
+
+        if _stmt.initializer is None:
+
+            def var(env: Environment) -> Optional[tuple]:
+                env._values[key] = None
+
+            return var
+
+        initializer_fn = self._compile_expr(_stmt.initializer)
+
+        def var_init(env: Environment) -> Optional[tuple]:
+            env._values[key] = initializer_fn(env)
+
+        return var_init
+
+    def _key(self, declaration: stmt.Stmt) -> object:
+        """
+        Returns where a declaration stores its variable in the environment it
+        runs in: its name for a global, otherwise its slot. A local always
+        lives in the innermost environment of the code declaring it.
+        """
+        if declaration.depth is None:
+            return declaration.name.lexme
+        return declaration.slot
+
+    def visit_while_stmt(self, _stmt: stmt.While) -> StmtFn:
+        condition_fn = self._compile_expr(_stmt.condition)
+        body_fn = self._compile_stmt(_stmt.body)
+
+        def while_(env: Environment) -> Optional[tuple]:
+            while True:
+                condition = condition_fn(env)
+                if condition is None or condition is False:
+                    return None
+                completion = body_fn(env)
+                if completion is not None:
+                    return completion
+
+        return while_
+
+    def visit_for_stmt(self, _stmt: stmt.For) -> StmtFn:
+        condition_fn = self._compile_expr(_stmt.condition)
+        body_fn = self._compile_stmt(_stmt.body)
+
+        if _stmt.increment is None:
+
+            def for_(env: Environment) -> Optional[tuple]:
+                while True:
+                    condition = condition_fn(env)
+                    if condition is None or condition is False:
+                        return None
+                    completion = body_fn(env)
+                    if completion is not None:
+                        return completion
+
+            return for_
+
+        increment_fn = self._compile_expr(_stmt.increment)
+
+        def for_increment(env: Environment) -> Optional[tuple]:
+            while True:
+                condition = condition_fn(env)
+                if condition is None or condition is False:
+                    return None
+                completion = body_fn(env)
+                if completion is not None:
+                    return completion
+                increment_fn(env)
+
+        return for_increment
+
+    def visit_forrange_stmt(self, _stmt: stmt.ForRange) -> StmtFn:
+        start_fn = self._compile_expr(_stmt.start)
+        end_fn = self._compile_expr(_stmt.end)
+        body_fn = self._compile_stmt(_stmt.body)
+        key = self._key(_stmt)
+        dots = _stmt.dots
+
+        def for_range(env: Environment) -> Optional[tuple]:
+            value = start_fn(env)
+            end = end_fn(env)
+            if value.__class__ is not float or end.__class__ is not float:
+                raise RuntimeError(dots, "Operands must be numbers.")
+
+            values = env._values
+            while value < end:
+                values[key] = value
+                completion = body_fn(env)
+                if completion is not None:
+                    return completion
+                value += 1
+            return None
+
+        return for_range
+
+
+class ClosureInterpreter(Interpreter):
+    """
+    Executes programs by compiling them into closures with ClosureCompiler
+    instead of dispatching through the visitor on every evaluation.
+    """
+
+    def interpret(self, statements: List[stmt.Stmt]) -> None:
+        program = ClosureCompiler(self).compile(statements)
+        try:
+            program(self.globals)
+        except RuntimeError as error:
+            error_reporter.runtime_error(error)
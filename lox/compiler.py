@@ -0,0 +1,520 @@
+from typing import List, Optional, Self
+import expr
+import stmt
+from token import Token
+from token_type import TokenType
+from error_reporter import error_reporter
+from chunk import OpCode, CompiledFunction
+from resolver import FunctionType
+
+
+UINT8_COUNT = 256
+UINT16_MAX = 65535
+
+
+class _Local:
+    def __init__(self, name: str, depth: int, defined: bool = True):
+        self.name = name
+        self.depth = depth
+        self.defined = defined
+        self.is_captured = False
+
+
+class _FunctionState:
+    def __init__(
+        self,
+        enclosing: Optional[Self],
+        function: CompiledFunction,
+        type: FunctionType,
+    ):
+        self.enclosing = enclosing
+        self.function = function
+        self.type = type
+        self.upvalues: List[tuple] = []
+        self.scope_depth = 0
+
+        # Slot zero holds the receiver in methods and the called closure
+        # everywhere else, where it can't be referenced by name
+        if type in (FunctionType.METHOD, FunctionType.INTIALIZER):
+            self.locals = [_Local("this", 0)]
+        else:
+            self.locals = [_Local("", 0)]
+
+
+class Compiler(expr.Visitor[None], stmt.Visitor[None]):
+    """
+    Compiles a resolved AST into bytecode for the VM.
+
+    The Resolver has already reported every static error, so the compiler
+    only has to worry about the limits of the bytecode format.
+    """
+
+    def __init__(self):
+        self._state: _FunctionState = None
+        self._line = 0
+
+    def compile(self, statements: List[stmt.Stmt]) -> CompiledFunction:
+        self._state = _FunctionState(
+            None, CompiledFunction("", 0, False), FunctionType.NONE
+        )
+        for statement in statements:
+            self._compile_stmt(statement)
+        return self._end_function()
+
+    def _compile_expr(self, _expr: expr.Expr) -> None:
+        _expr.accept(self)
+
+    def _compile_stmt(self, _stmt: stmt.Stmt) -> None:
+        _stmt.accept(self)
+
+    def _chunk(self):
+        return self._state.function.chunk
+
+    def _emit(self, *bytes: int) -> None:
+        chunk = self._chunk()
+        for byte in bytes:
+            chunk.write(byte, self._line)
+
+    def _emit_short(self, op: OpCode, operand: int) -> None:
+        self._emit(op, (operand >> 8) & 0xFF, operand & 0xFF)
+
+    def _emit_constant(self, value: object) -> None:
+        self._emit_short(OpCode.CONSTANT, self._make_constant(value))
+
+    def _make_constant(self, value: object) -> int:
+        constant = self._chunk().add_constant(value)
+        if constant > UINT16_MAX:
+            error_reporter.error(self._line, "Too many constants in one chunk.")
+            return 0
+        return constant
+
+    def _emit_jump(self, op: OpCode) -> int:
+        self._emit(op, 0xFF, 0xFF)
+        return len(self._chunk().code) - 2
+
+    def _patch_jump(self, offset: int) -> None:
+        code = self._chunk().code
+        jump = len(code) - offset - 2
+        if jump > UINT16_MAX:
+            error_reporter.error(self._line, "Too much code to jump over.")
+
+        code[offset] = (jump >> 8) & 0xFF
+        code[offset + 1] = jump & 0xFF
+
+    def _emit_loop(self, loop_start: int) -> None:
+        offset = len(self._chunk().code) - loop_start + 3
+        if offset > UINT16_MAX:
+            error_reporter.error(self._line, "Loop body too large.")
+        self._emit_short(OpCode.LOOP, offset)
+
+    def _emit_return(self) -> None:
+        if self._state.type == FunctionType.INTIALIZER:
+            self._emit(OpCode.GET_LOCAL, 0)
+        else:
+            self._emit(OpCode.NIL)
+        self._emit(OpCode.RETURN)
+
+    def _end_function(self) -> CompiledFunction:
+        self._emit_return()
+        function = self._state.function
+        function.upvalue_count = len(self._state.upvalues)
+        return function
+
+    def _begin_scope(self) -> None:
+        self._state.scope_depth += 1
+
+    def _end_scope(self) -> None:
+        state = self._state
+        state.scope_depth -= 1
+
+        while state.locals and state.locals[-1].depth > state.scope_depth:
+            if state.locals[-1].is_captured:
+                self._emit(OpCode.CLOSE_UPVALUE)
+            else:
+                self._emit(OpCode.POP)
+            state.locals.pop()
+
+    def _add_local(self, name: Token, defined: bool = True) -> None:
+        if len(self._state.locals) == UINT8_COUNT:
+            error_reporter.error(name, "Too many local variables in function.")
+            return
+        self._state.locals.append(
+            _Local(name.lexme, self._state.scope_depth, defined)
+        )
+
+    def _declare_variable(self, name: Token, defined: bool = True) -> int:
+        """
+        Declares a variable and returns the constant holding its name if it
+        is a global, which has to be defined with DEFINE_GLOBAL afterwards.
+        A local that isn't "defined" yet is defined by "_define_variable".
+        """
+        if self._state.scope_depth > 0:
+            self._add_local(name, defined)
+            return -1
+        return self._make_constant(name.lexme)
+
+    def _define_variable(self, global_constant: int) -> None:
+        # Locals are defined simply by leaving their value on the stack
+        if global_constant >= 0:
+            self._emit_short(OpCode.DEFINE_GLOBAL, global_constant)
+        elif self._state.locals:
+            self._state.locals[-1].defined = True
+
+    def _resolve_local(self, state: _FunctionState, name: str) -> int:
+        for idx in range(len(state.locals) - 1, -1, -1):
+            if state.locals[idx].name == name:
+                return idx
+        return -1
+
+    def _add_upvalue(
+        self, state: _FunctionState, index: int, is_local: bool, name: Token
+    ) -> int:
+        upvalue = (index, is_local)
+        if upvalue in state.upvalues:
+            return state.upvalues.index(upvalue)
+
+        if len(state.upvalues) == UINT8_COUNT:
+            error_reporter.error(name, "Too many closure variables in function.")
+            return 0
+
+        state.upvalues.append(upvalue)
+        return len(state.upvalues) - 1
+
+    def _resolve_upvalue(self, state: _FunctionState, name: Token) -> int:
+        if state.enclosing is None:
+            return -1
+
+        local = self._resolve_local(state.enclosing, name.lexme)
+        if local != -1:
+            state.enclosing.locals[local].is_captured = True
+            return self._add_upvalue(state, local, True, name)
+
+        upvalue = self._resolve_upvalue(state.enclosing, name)
+        if upvalue != -1:
+            return self._add_upvalue(state, upvalue, False, name)
+
+        return -1
+
+    def _named_variable(self, name: Token, assign: bool = False) -> None:
+        """
+        Emits a read of the variable, or an assignment of the value on top of
+        the stack to it if "assign" is set.
+        """
+        self._line = name.line
+
+        arg = self._resolve_local(self._state, name.lexme)
+        if arg != -1:
+            if assign and not self._state.locals[arg].defined:
+                # See visit_var_stmt. The value stays on the stack as that
+                # of the assignment.
+                return
+            self._emit(OpCode.SET_LOCAL if assign else OpCode.GET_LOCAL, arg)
+            return
+
+        arg = self._resolve_upvalue(self._state, name)
+        if arg != -1:
+            self._emit(OpCode.SET_UPVALUE if assign else OpCode.GET_UPVALUE, arg)
+            return
+
+        self._emit_short(
+            OpCode.SET_GLOBAL if assign else OpCode.GET_GLOBAL,
+            self._make_constant(name.lexme),
+        )
+
+    def _function(self, function: stmt.Function, type: FunctionType) -> None:
+        self._state = _FunctionState(
+            self._state,
+            CompiledFunction(
+                function.name.lexme,
+                len(function.params),
+                type == FunctionType.INTIALIZER,
+            ),
+            type,
+        )
+        self._begin_scope()
+
+        for param in function.params:
+            self._add_local(param)
+
+        for statement in function.body:
+            self._compile_stmt(statement)
+
+        state = self._state
+        compiled = self._end_function()
+        self._state = state.enclosing
+
+        self._line = function.name.line
+        self._emit_short(OpCode.CLOSURE, self._make_constant(compiled))
+        for index, is_local in state.upvalues:
+            self._emit(1 if is_local else 0, index)
+
+    def visit_assign_expr(self, _expr: expr.Assign) -> None:
+        self._compile_expr(_expr.value)
+        self._named_variable(_expr.name, assign=True)
+
+    def visit_binary_expr(self, _expr: expr.Binary) -> None:
+        self._compile_expr(_expr.left)
+        self._compile_expr(_expr.right)
+
+        self._line = _expr.operator.line
+        self._emit(_BINARY_OPS[_expr.operator.type])
+
+    def visit_call_expr(self, _expr: expr.Call) -> None:
+        callee = _expr.callee
+        if isinstance(callee, expr.Get):
+            # Method calls skip creating a bound method
+            self._compile_expr(callee.object)
+            for argument in _expr.arguments:
+                self._compile_expr(argument)
+            self._line = _expr.paren.line
+            self._emit_short(OpCode.INVOKE, self._make_constant(callee.name.lexme))
+            self._emit(len(_expr.arguments))
+            return
+
+        if isinstance(callee, expr.Super):
+            self._named_variable(_this_token(callee.keyword))
+            for argument in _expr.arguments:
+                self._compile_expr(argument)
+            self._named_variable(callee.keyword)
+            self._line = _expr.paren.line
+            self._emit_short(
+                OpCode.SUPER_INVOKE, self._make_constant(callee.method.lexme)
+            )
+            self._emit(len(_expr.arguments))
+            return
+
+        self._compile_expr(callee)
+        for argument in _expr.arguments:
+            self._compile_expr(argument)
+        self._line = _expr.paren.line
+        self._emit(OpCode.CALL, len(_expr.arguments))
+
+    def visit_get_expr(self, _expr: expr.Get) -> None:
+        self._compile_expr(_expr.object)
+        self._line = _expr.name.line
+        self._emit_short(
+            OpCode.GET_PROPERTY, self._make_constant(_expr.name.lexme)
+        )
+
+    def visit_grouping_expr(self, _expr: expr.Grouping) -> None:
+        self._compile_expr(_expr.expression)
+
+    def visit_literal_expr(self, _expr: expr.Literal) -> None:
+        if _expr.value is None:
+            self._emit(OpCode.NIL)
+        elif _expr.value is True:
+            self._emit(OpCode.TRUE)
+        elif _expr.value is False:
+            self._emit(OpCode.FALSE)
+        else:
+            self._emit_constant(_expr.value)
+
+    def visit_logical_expr(self, _expr: expr.Logical) -> None:
+        self._compile_expr(_expr.left)
+
+        self._line = _expr.operator.line
+        if _expr.operator.type == TokenType.OR:
+            end_jump = self._emit_jump(OpCode.JUMP_IF_TRUE)
+        else:
+            end_jump = self._emit_jump(OpCode.JUMP_IF_FALSE)
+
+        self._emit(OpCode.POP)
+        self._compile_expr(_expr.right)
+        self._patch_jump(end_jump)
+
+    def visit_set_expr(self, _expr: expr.Set) -> None:
+        self._compile_expr(_expr.object)
+        self._compile_expr(_expr.value)
+        self._line = _expr.name.line
+        self._emit_short(
+            OpCode.SET_PROPERTY, self._make_constant(_expr.name.lexme)
+        )
+
+    def visit_super_expr(self, _expr: expr.Super) -> None:
+        self._named_variable(_this_token(_expr.keyword))
+        self._named_variable(_expr.keyword)
+        self._line = _expr.method.line
+        self._emit_short(
+            OpCode.GET_SUPER, self._make_constant(_expr.method.lexme)
+        )
+
+    def visit_this_expr(self, _expr: expr.This) -> None:
+        self._named_variable(_expr.keyword)
+
+    def visit_unary_expr(self, _expr: expr.Unary) -> None:
+        self._compile_expr(_expr.right)
+        self._line = _expr.operator.line
+        if _expr.operator.type == TokenType.BANG:
+            self._emit(OpCode.NOT)
+        else:
+            self._emit(OpCode.NEGATE)
+
+    def visit_variable_expr(self, _expr: expr.Variable) -> None:
+        self._named_variable(_expr.name)
+
+    def visit_block_stmt(self, _stmt: stmt.Block) -> None:
+        self._begin_scope()
+        for statement in _stmt.statements:
+            self._compile_stmt(statement)
+        self._end_scope()
+
+    def visit_class_stmt(self, _stmt: stmt.Class) -> None:
+        name = _stmt.name
+        self._line = name.line
+
+        # Like the Interpreter, the name is defined before the methods are
+        # created so that they can refer to the class
+        global_constant = self._declare_variable(name)
+        self._emit(OpCode.NIL)
+        self._define_variable(global_constant)
+
+        if _stmt.superclass is not None:
+            # The superclass lives in a local named "super" that the methods
+            # capture as an upvalue
+            self._begin_scope()
+            self._compile_expr(_stmt.superclass)
+            self._add_local(Token(TokenType.SUPER, "super", None, name.line))
+
+        for method in _stmt.methods:
+            if method.name.lexme == "init":
+                self._function(method, FunctionType.INTIALIZER)
+            else:
+                self._function(method, FunctionType.METHOD)
+
+        # CLASS checks the superclass, so report errors on its line
+        if _stmt.superclass is not None:
+            self._line = _stmt.superclass.name.line
+        else:
+            self._line = name.line
+        self._emit_short(OpCode.CLASS, self._make_constant(name.lexme))
+        self._emit(len(_stmt.methods) >> 8, len(_stmt.methods) & 0xFF)
+        self._emit(1 if _stmt.superclass is not None else 0)
+
+        self._named_variable(name, assign=True)
+        self._emit(OpCode.POP)
+
+        if _stmt.superclass is not None:
+            self._end_scope()
+
+    def visit_expression_stmt(self, _stmt: stmt.Expression) -> None:
+        self._compile_expr(_stmt.expression)
+        self._emit(OpCode.POP)
+
+    def visit_function_stmt(self, _stmt: stmt.Function) -> None:
+        global_constant = self._declare_variable(_stmt.name)
+        self._function(_stmt, FunctionType.FUNCTION)
+        self._define_variable(global_constant)
+
+    def visit_if_stmt(self, _stmt: stmt.If) -> None:
+        self._compile_expr(_stmt.condition)
+        then_jump = self._emit_jump(OpCode.POP_JUMP_IF_FALSE)
+        self._compile_stmt(_stmt.then_branch)
+
+        if _stmt.else_branch is None:
+            self._patch_jump(then_jump)
+            return
+
+        else_jump = self._emit_jump(OpCode.JUMP)
+        self._patch_jump(then_jump)
+        self._compile_stmt(_stmt.else_branch)
+        self._patch_jump(else_jump)
+
+    def visit_print_stmt(self, _stmt: stmt.Print) -> None:
+        self._compile_expr(_stmt.expression)
+        self._emit(OpCode.PRINT)
+
+    def visit_return_stmt(self, _stmt: stmt.Return) -> None:
+        self._line = _stmt.keyword.line
+        if _stmt.value is None:
+            self._emit_return()
+            return
+
+        self._compile_expr(_stmt.value)
+        self._emit(OpCode.RETURN)
+
+    def visit_var_stmt(self, _stmt: stmt.Var) -> None:
+        # The slot of a local is where the value of its initializer ends up,
+        # so until then it holds whatever the initializer has on the stack.
+        # The Resolver only lets the initializer assign the variable, not
+        # read it, and the value of the initializer replaces what it
+        # assigned anyway, so such assignments are simply left out.
+        global_constant = self._declare_variable(_stmt.name, defined=False)
+
+        if _stmt.initializer is not None:
+            self._compile_expr(_stmt.initializer)
+        else:
+            self._emit(OpCode.NIL)
+
+        self._define_variable(global_constant)
+
+    def visit_while_stmt(self, _stmt: stmt.While) -> None:
+        loop_start = len(self._chunk().code)
+        self._compile_expr(_stmt.condition)
+
+        exit_jump = self._emit_jump(OpCode.POP_JUMP_IF_FALSE)
+        self._compile_stmt(_stmt.body)
+        self._emit_loop(loop_start)
+
+        self._patch_jump(exit_jump)
+
+    def visit_for_stmt(self, _stmt: stmt.For) -> None:
+        loop_start = len(self._chunk().code)
+        self._compile_expr(_stmt.condition)
+
+        exit_jump = self._emit_jump(OpCode.POP_JUMP_IF_FALSE)
+        self._compile_stmt(_stmt.body)
+        if _stmt.increment is not None:
+            self._compile_expr(_stmt.increment)
+            self._emit(OpCode.POP)
+        self._emit_loop(loop_start)
+
+        self._patch_jump(exit_jump)
+
+    def visit_forrange_stmt(self, _stmt: stmt.ForRange) -> None:
+        # The count and the end of the range live in locals of their own,
+        # under names no variable can have, next to the loop variable
+        dots = _stmt.dots
+        value = len(self._state.locals)
+        self._compile_expr(_stmt.start)
+        self._add_local(Token(TokenType.IDENTIFIER, " value", None, dots.line))
+        end = len(self._state.locals)
+        self._compile_expr(_stmt.end)
+        self._add_local(Token(TokenType.IDENTIFIER, " end", None, dots.line))
+        variable = len(self._state.locals)
+        self._emit(OpCode.NIL)
+        self._add_local(_stmt.name)
+
+        # LESS reports bounds that aren't numbers, on the line of the ".."
+        loop_start = len(self._chunk().code)
+        self._line = dots.line
+        self._emit(OpCode.GET_LOCAL, value, OpCode.GET_LOCAL, end, OpCode.LESS)
+        exit_jump = self._emit_jump(OpCode.POP_JUMP_IF_FALSE)
+        self._emit(OpCode.GET_LOCAL, value, OpCode.SET_LOCAL, variable, OpCode.POP)
+
+        self._compile_stmt(_stmt.body)
+
+        self._line = dots.line
+        self._emit(OpCode.GET_LOCAL, value)
+        self._emit_constant(1.0)
+        self._emit(OpCode.ADD, OpCode.SET_LOCAL, value, OpCode.POP)
+        self._emit_loop(loop_start)
+
+        self._patch_jump(exit_jump)
+
+
+def _this_token(keyword: Token) -> Token:
+    return Token(TokenType.THIS, "this", None, keyword.line)
+
+
+_BINARY_OPS = {
+    TokenType.PLUS: OpCode.ADD,
+    TokenType.MINUS: OpCode.SUBTRACT,
+    TokenType.STAR: OpCode.MULTIPLY,
+    TokenType.SLASH: OpCode.DIVIDE,
+    TokenType.GREATER: OpCode.GREATER,
+    TokenType.GREATER_EQUAL: OpCode.GREATER_EQUAL,
+    TokenType.LESS: OpCode.LESS,
+    TokenType.LESS_EQUAL: OpCode.LESS_EQUAL,
+    TokenType.EQUAL_EQUAL: OpCode.EQUAL,
+    TokenType.BANG_EQUAL: OpCode.NOT_EQUAL,
+}
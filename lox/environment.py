@@ -1,12 +1,23 @@
-from typing import Self
+from typing import List, Self
 from token import Token
 from runtime_error import RuntimeError
 
 
 class Environment:
-    def __init__(self, enclosing: Self = None):
+    __slots__ = ("enclosing", "_values")
+
+    def __init__(self, enclosing: Self = None, values: List[object] = None):
         self.enclosing = enclosing
-        self._values = {}
+
+        # Only the global environment looks variables up by name. Every other
+        # environment is a list indexed by the slot the Resolver gave each
+        # variable, with a slot for each of them from the start.
+        if enclosing is None:
+            self._values = {}
+        elif values is None:
+            self._values = []
+        else:
+            self._values = values
 
     def get(self, name: Token) -> object:
         if name.lexme in self._values:
@@ -29,7 +40,10 @@ class Environment:
         raise RuntimeError(name, f"Undefined variable '{name.lexme}'.")
 
     def define(self, name: str, value: object) -> None:
-        self._values[name] = value
+        if self.enclosing is None:
+            self._values[name] = value
+        else:
+            self._values.append(value)
 
     def ancestor(self, distance: int) -> Self:
         environment = self
@@ -38,8 +52,8 @@ class Environment:
 
         return environment
 
-    def get_at(self, distance: int, name: str) -> object:
-        return self.ancestor(distance)._values[name]
+    def get_at(self, distance: int, slot: int) -> object:
+        return self.ancestor(distance)._values[slot]
 
-    def assign_at(self, distance: int, name: Token, value: object) -> None:
-        self.ancestor(distance)._values[name.lexme] = value
+    def assign_at(self, distance: int, slot: int, value: object) -> None:
+        self.ancestor(distance)._values[slot] = value
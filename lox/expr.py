@@ -1,4 +1,8 @@
-from typing import Generic, TypeVar, List
+"""
+Generated by "generate_ast.py", which is where the nodes are defined.
+Edit the definitions there and rerun it instead of editing this file.
+"""
+from typing import Callable, Generic, List, Optional, TypeVar
 from token import Token
 
 
@@ -6,47 +10,239 @@ R = TypeVar("R")
 
 
 class Expr:
+    __slots__ = ()
+
+    # Which subclass the node is, as an index into a dispatch table
+    kind: int
+
     def __init__(self):
         pass
 
+    def __reduce__(self) -> tuple:
+        # Pickles the node as a call to its class with the fields it is
+        # made with, followed by the fields filled in later that aren't
+        # None, which is smaller and faster to load than all of its slots
+        args = tuple([getattr(self, name) for name in self.__match_args__])
+        later = {}
+        for name in self.__slots__[len(args) :]:
+            value = getattr(self, name)
+            if value is not None:
+                later[name] = value
+        return (type(self), args, (None, later) if later else None)
+
 
 class Visitor(Generic[R]):
     def __init__(self):
         pass
 
 
-subclasses = {
-    "Assign": {"name": "Token", "value": "Expr"},
-    "Binary": {"left": "Expr", "operator": "int", "right": "Expr"},
-    "Call": {"callee": "Expr", "paren": "Token", "arguments": "List[Expr]"},
-    "Get": {"object": "Expr", "name": "Token"},
-    "Grouping": {"expression": "Expr"},
-    "Literal": {"value": "object"},
-    "Logical": {"left": "Expr", "operator": "Token", "right": "Expr"},
-    "Set": {"object": "Expr", "name": "Token", "value": "Expr"},
-    "Super": {"keyword": "Token", "method": "Token"},
-    "This": {"keyword": "Token"},
-    "Unary": {"operator": "Token", "right": "Expr"},
-    "Variable": {"name": "Token"},
-}
-
-for name, attributes in subclasses.items():
-    # Initialize the class
-    args = ""
-    instance_init = ""
-    for arg, arg_type in attributes.items():
-        args += f", {arg}: {arg_type}"
-
-    subclass_str = ""
-    subclass_str += f"class {name}(Expr):\n"
-    subclass_str += f"    def __init__(self{args}):\n"
-
-    for arg in attributes:
-        subclass_str += f"        self.{arg} = {arg}\n"
-
-    subclass_str += "\n"
-    subclass_str += "    def accept(self, visitor: Visitor[R]) -> R:\n"
-    subclass_str += f"        return visitor.visit_{name.lower()}_expr(self)\n"
-
-    # Exposes the class when module is imported
-    exec(subclass_str, globals())
+ASSIGN = 0
+BINARY = 1
+CALL = 2
+GET = 3
+GROUPING = 4
+LITERAL = 5
+LOGICAL = 6
+SET = 7
+SUPER = 8
+THIS = 9
+UNARY = 10
+VARIABLE = 11
+
+
+class Assign(Expr):
+    __slots__ = ("name", "value", "depth", "slot")
+    __match_args__ = ("name", "value")
+    kind = ASSIGN
+
+    def __init__(self, name: Token, value: Expr):
+        self.name = name
+        self.value = value
+        # Filled in by the Resolver
+        self.depth = None
+        self.slot = None
+
+    def accept(self, visitor: Visitor[R]) -> R:
+        return visitor.visit_assign_expr(self)
+
+
+class Binary(Expr):
+    __slots__ = ("left", "operator", "right")
+    __match_args__ = ("left", "operator", "right")
+    kind = BINARY
+
+    def __init__(self, left: Expr, operator: Token, right: Expr):
+        self.left = left
+        self.operator = operator
+        self.right = right
+
+    def accept(self, visitor: Visitor[R]) -> R:
+        return visitor.visit_binary_expr(self)
+
+
+class Call(Expr):
+    __slots__ = ("callee", "paren", "arguments")
+    __match_args__ = ("callee", "paren", "arguments")
+    kind = CALL
+
+    def __init__(self, callee: Expr, paren: Token, arguments: List[Expr]):
+        self.callee = callee
+        self.paren = paren
+        self.arguments = arguments
+
+    def accept(self, visitor: Visitor[R]) -> R:
+        return visitor.visit_call_expr(self)
+
+
+class Get(Expr):
+    __slots__ = ("object", "name", "cache")
+    __match_args__ = ("object", "name")
+    kind = GET
+
+    def __init__(self, object: Expr, name: Token):
+        self.object = object
+        self.name = name
+        # Kept by the Interpreter between executions
+        self.cache = None
+
+    def accept(self, visitor: Visitor[R]) -> R:
+        return visitor.visit_get_expr(self)
+
+
+class Grouping(Expr):
+    __slots__ = ("expression",)
+    __match_args__ = ("expression",)
+    kind = GROUPING
+
+    def __init__(self, expression: Expr):
+        self.expression = expression
+
+    def accept(self, visitor: Visitor[R]) -> R:
+        return visitor.visit_grouping_expr(self)
+
+
+class Literal(Expr):
+    __slots__ = ("value",)
+    __match_args__ = ("value",)
+    kind = LITERAL
+
+    def __init__(self, value: object):
+        self.value = value
+
+    def accept(self, visitor: Visitor[R]) -> R:
+        return visitor.visit_literal_expr(self)
+
+
+class Logical(Expr):
+    __slots__ = ("left", "operator", "right")
+    __match_args__ = ("left", "operator", "right")
+    kind = LOGICAL
+
+    def __init__(self, left: Expr, operator: Token, right: Expr):
+        self.left = left
+        self.operator = operator
+        self.right = right
+
+    def accept(self, visitor: Visitor[R]) -> R:
+        return visitor.visit_logical_expr(self)
+
+
+class Set(Expr):
+    __slots__ = ("object", "name", "value")
+    __match_args__ = ("object", "name", "value")
+    kind = SET
+
+    def __init__(self, object: Expr, name: Token, value: Expr):
+        self.object = object
+        self.name = name
+        self.value = value
+
+    def accept(self, visitor: Visitor[R]) -> R:
+        return visitor.visit_set_expr(self)
+
+
+class Super(Expr):
+    __slots__ = ("keyword", "method", "depth", "slot", "cache")
+    __match_args__ = ("keyword", "method")
+    kind = SUPER
+
+    def __init__(self, keyword: Token, method: Token):
+        self.keyword = keyword
+        self.method = method
+        # Filled in by the Resolver
+        self.depth = None
+        self.slot = None
+        # Kept by the Interpreter between executions
+        self.cache = None
+
+    def accept(self, visitor: Visitor[R]) -> R:
+        return visitor.visit_super_expr(self)
+
+
+class This(Expr):
+    __slots__ = ("keyword", "depth", "slot")
+    __match_args__ = ("keyword",)
+    kind = THIS
+
+    def __init__(self, keyword: Token):
+        self.keyword = keyword
+        # Filled in by the Resolver
+        self.depth = None
+        self.slot = None
+
+    def accept(self, visitor: Visitor[R]) -> R:
+        return visitor.visit_this_expr(self)
+
+
+class Unary(Expr):
+    __slots__ = ("operator", "right")
+    __match_args__ = ("operator", "right")
+    kind = UNARY
+
+    def __init__(self, operator: Token, right: Expr):
+        self.operator = operator
+        self.right = right
+
+    def accept(self, visitor: Visitor[R]) -> R:
+        return visitor.visit_unary_expr(self)
+
+
+class Variable(Expr):
+    __slots__ = ("name", "depth", "slot")
+    __match_args__ = ("name",)
+    kind = VARIABLE
+
+    def __init__(self, name: Token):
+        self.name = name
+        # Filled in by the Resolver
+        self.depth = None
+        self.slot = None
+
+    def accept(self, visitor: Visitor[R]) -> R:
+        return visitor.visit_variable_expr(self)
+
+
+# The name of the visit method for each kind of node
+visit_methods = (
+    "visit_assign_expr",
+    "visit_binary_expr",
+    "visit_call_expr",
+    "visit_get_expr",
+    "visit_grouping_expr",
+    "visit_literal_expr",
+    "visit_logical_expr",
+    "visit_set_expr",
+    "visit_super_expr",
+    "visit_this_expr",
+    "visit_unary_expr",
+    "visit_variable_expr",
+)
+
+
+def dispatch_table(visitor: Visitor[R]) -> List[Optional[Callable[[Expr], R]]]:
+    """
+    Returns the visitor's bound visit methods indexed by node kind, so
+    that "table[node.kind](node)" visits a node without calling its
+    "accept". Methods that the visitor lacks are None.
+    """
+    return [getattr(visitor, name, None) for name in visit_methods]
@@ -0,0 +1,289 @@
+"""
+Writes the "expr.py" and "stmt.py" modules holding the AST node classes.
+
+Run "python lox/generate_ast.py" after changing the node definitions below,
+and commit the modules it writes. "--check" only reports whether they are
+up to date, and exits with status 1 if they aren't.
+"""
+import argparse
+import os
+import sys
+from typing import Dict, List
+
+
+class _Module:
+    """
+    The node classes of a module, with their fields and their types. Nodes
+    also get the fields that are filled in after parsing, which start out as
+    None, with a comment on what fills them in.
+    """
+
+    def __init__(
+        self,
+        base: str,
+        imports: List[str],
+        subclasses: Dict[str, Dict[str, str]],
+        later: List[tuple],
+    ):
+        self.base = base
+        self.imports = imports
+        self.subclasses = subclasses
+        self.later = later
+
+    def later_fields(self, name: str) -> List[tuple]:
+        """
+        Returns the comment and names of each group of fields that the node
+        class gets filled in after parsing.
+        """
+        groups = []
+        for comment, fields in self.later:
+            if name in fields:
+                groups.append((comment, fields[name]))
+        return groups
+
+
+expr_module = _Module(
+    "Expr",
+    ["from token import Token"],
+    {
+        "Assign": {"name": "Token", "value": "Expr"},
+        "Binary": {"left": "Expr", "operator": "Token", "right": "Expr"},
+        "Call": {"callee": "Expr", "paren": "Token", "arguments": "List[Expr]"},
+        "Get": {"object": "Expr", "name": "Token"},
+        "Grouping": {"expression": "Expr"},
+        "Literal": {"value": "object"},
+        "Logical": {"left": "Expr", "operator": "Token", "right": "Expr"},
+        "Set": {"object": "Expr", "name": "Token", "value": "Expr"},
+        "Super": {"keyword": "Token", "method": "Token"},
+        "This": {"keyword": "Token"},
+        "Unary": {"operator": "Token", "right": "Expr"},
+        "Variable": {"name": "Token"},
+    },
+    [
+        # How many environments up the variable lives and its slot there.
+        # Both stay None for globals.
+        (
+            "Filled in by the Resolver",
+            {
+                "Assign": ["depth", "slot"],
+                "Super": ["depth", "slot"],
+                "This": ["depth", "slot"],
+                "Variable": ["depth", "slot"],
+            },
+        ),
+        (
+            "Kept by the Interpreter between executions",
+            {
+                "Get": ["cache"],
+                "Super": ["cache"],
+            },
+        ),
+    ],
+)
+
+stmt_module = _Module(
+    "Stmt",
+    ["from expr import Expr, Variable", "from token import Token"],
+    {
+        "Block": {"statements": "List[Stmt]"},
+        "Expression": {"expression": "Expr"},
+        "Function": {"name": "Token", "params": "List[Token]", "body": "List[Stmt]"},
+        "Class": {
+            "name": "Token",
+            "superclass": "Variable",
+            "methods": "List[Function]",
+        },
+        "If": {"condition": "Expr", "then_branch": "Stmt", "else_branch": "Stmt"},
+        "Print": {"expression": "Expr"},
+        "Return": {"keyword": "Token", "value": "Expr"},
+        "Var": {"name": "Token", "initializer": "Expr"},
+        "While": {"condition": "Expr", "body": "Stmt"},
+        "For": {"condition": "Expr", "increment": "Expr", "body": "Stmt"},
+        "ForRange": {
+            "name": "Token",
+            "start": "Expr",
+            "dots": "Token",
+            "end": "Expr",
+            "body": "Stmt",
+        },
+    },
+    [
+        # Declarations of locals, including the variable of a ForRange, get
+        # the depth and slot of the variable they declare, like the nodes that
+        # refer to it, and stay None for globals. Blocks get whether they need
+        # an environment of their own ("scoped"), and blocks and functions how
+        # many slots their environment has ("size"). A "return" gets whether it
+        # hands back the result of a call that the function can make in its
+        # own place, as a tail call.
+        (
+            "Filled in by the Resolver",
+            {
+                "Block": ["scoped", "size"],
+                "Class": ["depth", "slot"],
+                "ForRange": ["depth", "slot"],
+                "Function": ["depth", "slot", "size"],
+                "Return": ["tail_call"],
+                "Var": ["depth", "slot"],
+            },
+        ),
+    ],
+)
+
+
+def _kind(name: str) -> str:
+    # "ForRange" becomes "FOR_RANGE"
+    kind = ""
+    for idx, c in enumerate(name):
+        if c.isupper() and idx > 0:
+            kind += "_"
+        kind += c.upper()
+    return kind
+
+
+def generate(module: _Module) -> str:
+    base = module.base
+    suffix = base.lower()
+    lines = [
+        '"""',
+        'Generated by "generate_ast.py", which is where the nodes are defined.',
+        'Edit the definitions there and rerun it instead of editing this file.',
+        '"""',
+        "from typing import Callable, Generic, List, Optional, TypeVar",
+        *module.imports,
+        "",
+        "",
+        'R = TypeVar("R")',
+        "",
+        "",
+        f"class {base}:",
+        "    __slots__ = ()",
+        "",
+        "    # Which subclass the node is, as an index into a dispatch table",
+        "    kind: int",
+        "",
+        "    def __init__(self):",
+        "        pass",
+        "",
+        "    def __reduce__(self) -> tuple:",
+        "        # Pickles the node as a call to its class with the fields it is",
+        "        # made with, followed by the fields filled in later that aren't",
+        "        # None, which is smaller and faster to load than all of its slots",
+        "        args = tuple([getattr(self, name) for name in self.__match_args__])",
+        "        later = {}",
+        "        for name in self.__slots__[len(args) :]:",
+        "            value = getattr(self, name)",
+        "            if value is not None:",
+        "                later[name] = value",
+        "        return (type(self), args, (None, later) if later else None)",
+        "",
+        "",
+        "class Visitor(Generic[R]):",
+        "    def __init__(self):",
+        "        pass",
+        "",
+        "",
+    ]
+
+    for idx, name in enumerate(module.subclasses):
+        lines.append(f"{_kind(name)} = {idx}")
+
+    for name, attributes in module.subclasses.items():
+        groups = module.later_fields(name)
+        fields = list(attributes)
+        for _, later in groups:
+            fields.extend(later)
+
+        args = "".join([f", {arg}: {type}" for arg, type in attributes.items()])
+        signature = f"    def __init__(self{args}):"
+        if len(signature) > 88:
+            signature = "\n".join(
+                ["    def __init__(", "        self,"]
+                + [f"        {arg}: {type}," for arg, type in attributes.items()]
+                + ["    ):"]
+            )
+
+        lines += [
+            "",
+            "",
+            f"class {name}({base}):",
+            f"    __slots__ = {_tuple(fields)}",
+            f"    __match_args__ = {_tuple(list(attributes))}",
+            f"    kind = {_kind(name)}",
+            "",
+            signature,
+        ]
+        for arg in attributes:
+            lines.append(f"        self.{arg} = {arg}")
+        for comment, later in groups:
+            lines.append(f"        # {comment}")
+            for field in later:
+                lines.append(f"        self.{field} = None")
+
+        lines += [
+            "",
+            "    def accept(self, visitor: Visitor[R]) -> R:",
+            f"        return visitor.visit_{name.lower()}_{suffix}(self)",
+        ]
+
+    methods = [f'    "visit_{name.lower()}_{suffix}",' for name in module.subclasses]
+    lines += [
+        "",
+        "",
+        "# The name of the visit method for each kind of node",
+        "visit_methods = (",
+        *methods,
+        ")",
+        "",
+        "",
+        "def dispatch_table(visitor: Visitor[R]) -> "
+        f"List[Optional[Callable[[{base}], R]]]:",
+        '    """',
+        "    Returns the visitor's bound visit methods indexed by node kind, so",
+        '    that "table[node.kind](node)" visits a node without calling its',
+        '    "accept". Methods that the visitor lacks are None.',
+        '    """',
+        "    return [getattr(visitor, name, None) for name in visit_methods]",
+    ]
+    return "\n".join(lines) + "\n"
+
+
+def _tuple(names: List[str]) -> str:
+    if len(names) == 1:
+        return f'("{names[0]}",)'
+    return "(" + ", ".join([f'"{name}"' for name in names]) + ")"
+
+
+def main() -> None:
+    arg_parser = argparse.ArgumentParser(description=__doc__.strip().split("\n")[0])
+    arg_parser.add_argument(
+        "--check",
+        action="store_true",
+        help="only check that the modules are up to date",
+    )
+    args = arg_parser.parse_args()
+
+    directory = os.path.dirname(os.path.abspath(__file__))
+    stale = []
+    for file_name, module in [("expr.py", expr_module), ("stmt.py", stmt_module)]:
+        path = os.path.join(directory, file_name)
+        source = generate(module)
+
+        current = None
+        if os.path.exists(path):
+            with open(path) as file:
+                current = file.read()
+        if current == source:
+            continue
+
+        stale.append(file_name)
+        if not args.check:
+            with open(path, "w") as file:
+                file.write(source)
+
+    if args.check and stale:
+        print(f"Out of date: {', '.join(stale)}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+from typing import Dict, List, Optional
+from token import Token
+from lox_class import LoxClass
+from lox_function import LoxFunction
+
+
+class InlineCache:
+    """
+    Remembers what a property name resolved to at a single Get node, for
+    each class of instance that was seen there.
+
+    An entry is None when the name was a field of the instance, otherwise
+    the method it found, wherever it was in the superclass chain. Once
+    MAX_CLASSES classes have been seen the site is megamorphic and further
+    classes are no longer cached.
+    """
+
+    MAX_CLASSES = 4
+
+    def __init__(self, kind: str, name: Token):
+        self.kind = kind
+        self.name = name
+        self.classes: Dict[LoxClass, Optional[LoxFunction]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, klass: LoxClass, method: Optional[LoxFunction]) -> None:
+        if klass in self.classes or len(self.classes) < self.MAX_CLASSES:
+            self.classes[klass] = method
+
+
+def format_stats(caches: List[InlineCache]) -> str:
+    lines = ["line  site                  hits    misses  hit rate  classes"]
+    for cache in sorted(caches, key=lambda cache: cache.name.line):
+        total = cache.hits + cache.misses
+        rate = cache.hits / total * 100 if total else 0.0
+        site = f"{cache.kind} {cache.name.lexme}"
+        lines.append(
+            f"{cache.name.line:>4}  {site:<20}{cache.hits:>6}{cache.misses:>10}"
+            f"{rate:>9.1f}%{len(cache.classes):>9}"
+        )
+    return "\n".join(lines)
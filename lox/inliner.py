@@ -0,0 +1,161 @@
+from typing import Dict, List, Optional
+import expr
+import stmt
+from resolver import Resolver
+from optimizer import Optimizer
+
+
+class Inliner(Optimizer):
+    """
+    Optimizer that also replaces calls to small top-level functions with the
+    expression that the function returns.
+
+    A function is inlined when its body is a single "return" of at most
+    MAX_SIZE nodes that only reads its parameters and globals, so it calls,
+    assigns and captures nothing. Its name must be declared once, at the top
+    level, and never assigned to, and none of the globals it reads may share
+    a name with a local anywhere in the program, which would capture them in
+    the engines that look variables up by name. Only calls that come after
+    the declaration are inlined, and only if each argument is a literal or a
+    local variable, whose evaluation can't fail or have an effect. The
+    parameters of the copied expression are then replaced by copies of the
+    arguments, which still resolve to the caller's variables.
+
+    It relies on the Resolver that resolved the program, and assumes that it
+    is given the whole program.
+    """
+
+    MAX_SIZE = 16
+
+    def __init__(self, resolver: Resolver):
+        self._resolver = resolver
+        self._functions: Dict[str, stmt.Function] = {}
+        self.inlined = 0
+
+    def inline(self, statements: List[stmt.Stmt]) -> List[stmt.Stmt]:
+        optimized = []
+        for statement in statements:
+            statement = statement.accept(self)
+            if statement is None:
+                continue
+
+            optimized.append(statement)
+            if isinstance(statement, stmt.Function) and self._is_inlinable(
+                statement
+            ):
+                self._functions[statement.name.lexme] = statement
+        return optimized
+
+    def _is_inlinable(self, function: stmt.Function) -> bool:
+        name = function.name.lexme
+        if (
+            self._resolver.global_declarations.get(name) != 1
+            or name in self._resolver.assigned_globals
+        ):
+            return False
+
+        if len(function.body) != 1 or not isinstance(function.body[0], stmt.Return):
+            return False
+
+        value = function.body[0].value
+        if value is None:
+            return False
+        size = self._size(value)
+        return size is not None and size <= self.MAX_SIZE
+
+    def _size(self, _expr: expr.Expr) -> Optional[int]:
+        """
+        Number of nodes in an expression that can be inlined, or None if it
+        has any that can't.
+        """
+        if isinstance(_expr, expr.Literal):
+            return 1
+        if isinstance(_expr, expr.Variable):
+            if _expr.depth is None and _expr.name.lexme in self._resolver.local_names:
+                return None
+            return 1
+
+        if isinstance(_expr, (expr.Binary, expr.Logical)):
+            children = [_expr.left, _expr.right]
+        elif isinstance(_expr, expr.Unary):
+            children = [_expr.right]
+        elif isinstance(_expr, expr.Get):
+            children = [_expr.object]
+        elif isinstance(_expr, expr.Grouping):
+            children = [_expr.expression]
+        else:
+            return None
+
+        size = 1
+        for child in children:
+            child_size = self._size(child)
+            if child_size is None:
+                return None
+            size += child_size
+        return size
+
+    def _is_trivial(self, argument: expr.Expr) -> bool:
+        if isinstance(argument, expr.Literal):
+            return True
+        return isinstance(argument, (expr.Variable, expr.This)) and (
+            argument.depth is not None
+        )
+
+    def _copy(self, _expr: expr.Expr, arguments: List[expr.Expr]) -> expr.Expr:
+        """
+        Copies an expression of the inlined function, replacing its
+        parameters with copies of the arguments.
+        """
+        if isinstance(_expr, expr.Literal):
+            return expr.Literal(_expr.value)
+        if isinstance(_expr, expr.Variable):
+            # Parameters are the only locals of the function
+            if _expr.depth is not None:
+                return self._copy_argument(arguments[_expr.slot])
+            return expr.Variable(_expr.name)
+        if isinstance(_expr, expr.Binary):
+            return expr.Binary(
+                self._copy(_expr.left, arguments),
+                _expr.operator,
+                self._copy(_expr.right, arguments),
+            )
+        if isinstance(_expr, expr.Logical):
+            return expr.Logical(
+                self._copy(_expr.left, arguments),
+                _expr.operator,
+                self._copy(_expr.right, arguments),
+            )
+        if isinstance(_expr, expr.Unary):
+            return expr.Unary(_expr.operator, self._copy(_expr.right, arguments))
+        if isinstance(_expr, expr.Get):
+            return expr.Get(self._copy(_expr.object, arguments), _expr.name)
+        return expr.Grouping(self._copy(_expr.expression, arguments))
+
+    def _copy_argument(self, argument: expr.Expr) -> expr.Expr:
+        if isinstance(argument, expr.Literal):
+            return expr.Literal(argument.value)
+
+        if isinstance(argument, expr.Variable):
+            copy = expr.Variable(argument.name)
+        else:
+            copy = expr.This(argument.keyword)
+        copy.depth = argument.depth
+        copy.slot = argument.slot
+        return copy
+
+    def visit_call_expr(self, _expr: expr.Call) -> expr.Expr:
+        _expr = super().visit_call_expr(_expr)
+
+        callee = _expr.callee
+        if not isinstance(callee, expr.Variable) or callee.depth is not None:
+            return _expr
+
+        function = self._functions.get(callee.name.lexme)
+        if function is None or len(_expr.arguments) != len(function.params):
+            return _expr
+        if not all([self._is_trivial(argument) for argument in _expr.arguments]):
+            return _expr
+
+        self.inlined += 1
+        # Folds what the arguments made constant
+        return self._expr(self._copy(function.body[0].value, _expr.arguments))
@@ -1,6 +1,5 @@
 from time import time
-from typing import List, Self
-from types import MethodType
+from typing import List, Optional, Union
 import expr
 import stmt
 from token_type import TokenType
@@ -12,30 +11,30 @@ from lox_callable import LoxCallable
 from lox_function import LoxFunction
 from lox_class import LoxClass
 from lox_instance import LoxInstance
-from _return import Return
+from inline_cache import InlineCache
+from _return import Return, TailCall
 
 
-class Interpreter(expr.Visitor[object], stmt.Visitor[None]):
-    def __init__(self):
-        self.globals = Environment()
-        self._environment = self.globals
-        self._locals = {}
+class _Clock(LoxCallable):
+    # A class rather than a LoxCallable with its methods set on the instance,
+    # which LoxCallable's empty "__slots__" rules out
+    def arity(self) -> int:
+        return 0
 
-        def _arity(self) -> int:
-            return 0
+    def call(self, interpreter: "Interpreter", arguments: List[object]) -> object:
+        return float(time())
 
-        def _call(self, interpreter: Self, arguments: List[object]) -> object:
-            return float(time())
+    def to_string(self) -> str:
+        return "<native fn>"
 
-        def _to_string(self) -> str:
-            return "<native fn>"
 
-        clock = LoxCallable()
-        clock.arity = MethodType(_arity, clock)
-        clock.call = MethodType(_call, clock)
-        clock.to_string = MethodType(_to_string, clock)
+class Interpreter(expr.Visitor[object], stmt.Visitor[Optional[Return]]):
+    def __init__(self):
+        self.globals = Environment()
+        self._environment = self.globals
+        self.inline_caches: List[InlineCache] = []
 
-        self.globals.define("clock", clock)
+        self.globals.define("clock", _Clock())
 
     def interpret(self, statements: List[stmt.Stmt]) -> None:
         try:
@@ -69,11 +68,23 @@ class Interpreter(expr.Visitor[object], stmt.Visitor[None]):
         _object.set(_expr.name, value)
         return value
 
+    def _new_inline_cache(self, kind: str, name: Token) -> InlineCache:
+        cache = InlineCache(kind, name)
+        self.inline_caches.append(cache)
+        return cache
+
     def visit_super_expr(self, _expr: expr.Super) -> object:
-        distance = self._locals.get(_expr)
-        superclass = self._environment.get_at(distance, "super")
+        _object = self._environment.get_at(_expr.depth - 1, 0)
+        return self._super_method(_expr).bind(_object)
 
-        _object = self._environment.get_at(distance - 1, "this")
+    def _super_method(self, _expr: expr.Super) -> LoxFunction:
+        superclass = self._environment.get_at(_expr.depth, _expr.slot)
+
+        # The same class declaration can run again with another superclass,
+        # so the cached method is only used for the superclass it came from
+        cache = _expr.cache
+        if cache is not None and cache[0] is superclass:
+            return cache[1]
 
         method = superclass.find_method(_expr.method.lexme)
 
@@ -82,7 +93,8 @@ class Interpreter(expr.Visitor[object], stmt.Visitor[None]):
                 _expr.method, f"Undefined property '{_expr.method.lexme}'."
             )
 
-        return method.bind(_object)
+        _expr.cache = (superclass, method)
+        return method
 
     def visit_this_expr(self, _expr: expr.This) -> object:
         return self._look_up_variable(_expr.keyword, _expr)
@@ -103,9 +115,8 @@ class Interpreter(expr.Visitor[object], stmt.Visitor[None]):
         return self._look_up_variable(_expr.name, _expr)
 
     def _look_up_variable(self, name: Token, _expr: expr.Expr) -> object:
-        if _expr in self._locals:
-            distance = self._locals[_expr]
-            return self._environment.get_at(distance, name.lexme)
+        if _expr.depth is not None:
+            return self._environment.get_at(_expr.depth, _expr.slot)
         else:
             return self.globals.get(name)
 
@@ -153,26 +164,39 @@ class Interpreter(expr.Visitor[object], stmt.Visitor[None]):
     def _evaluate(self, _expr: expr.Expr) -> object:
         return _expr.accept(self)
 
-    def _execute(self, _stmt: stmt.Stmt) -> None:
-        _stmt.accept(self)
-
-    def resolve(self, _expr: expr.Expr, depth: int) -> None:
-        self._locals[_expr] = depth
+    def _execute(self, _stmt: stmt.Stmt) -> Optional[Return]:
+        return _stmt.accept(self)
 
     def execute_block(
         self, statements: List[stmt.Stmt], environment: Environment
-    ) -> None:
+    ) -> Optional[Return]:
+        """
+        Executes the statements in order. Stops at the first statement that
+        completes with a Return and hands it back.
+        """
         previous = self._environment
         try:
             self._environment = environment
 
             for statement in statements:
-                self._execute(statement)
+                completion = statement.accept(self)
+                if completion is not None:
+                    return completion
         finally:
             self._environment = previous
 
-    def visit_block_stmt(self, _stmt: stmt.Block) -> None:
-        self.execute_block(_stmt.statements, Environment(self._environment))
+        return None
+
+    def visit_block_stmt(self, _stmt: stmt.Block) -> Optional[Return]:
+        if _stmt.scoped:
+            return self.execute_block(
+                _stmt.statements, Environment(self._environment, [None] * _stmt.size)
+            )
+
+        for statement in _stmt.statements:
+            completion = statement.accept(self)
+            if completion is not None:
+                return completion
         return None
 
     def visit_class_stmt(self, _stmt: stmt.Class) -> None:
@@ -182,11 +206,8 @@ class Interpreter(expr.Visitor[object], stmt.Visitor[None]):
             if not isinstance(superclass, LoxClass):
                 raise RuntimeError(_stmt.superclass.name, "Superclass must be a class.")
 
-        self._environment.define(_stmt.name.lexme, None)
-
         if _stmt.superclass is not None:
-            self._environment = Environment(self._environment)
-            self._environment.define("super", superclass)
+            self._environment = Environment(self._environment, [superclass])
 
         methods = {}
         for method in _stmt.methods:
@@ -200,7 +221,9 @@ class Interpreter(expr.Visitor[object], stmt.Visitor[None]):
         if superclass is not None:
             self._environment = self._environment.enclosing
 
-        self._environment.assign(_stmt.name, klass)
+        # Nothing can observe the class before it is complete, so it is
+        # defined once instead of as nil and then assigned
+        self._define(_stmt, klass)
         return None
 
     def visit_expression_stmt(self, _stmt: stmt.Stmt) -> None:
@@ -209,14 +232,14 @@ class Interpreter(expr.Visitor[object], stmt.Visitor[None]):
 
     def visit_function_stmt(self, _stmt: stmt.Function) -> None:
         function = LoxFunction(_stmt, self._environment, False)
-        self._environment.define(_stmt.name.lexme, function)
+        self._define(_stmt, function)
         return None
 
-    def visit_if_stmt(self, _stmt: stmt.If) -> None:
+    def visit_if_stmt(self, _stmt: stmt.If) -> Optional[Return]:
         if self._is_truthy(self._evaluate(_stmt.condition)):
-            self._execute(_stmt.then_branch)
+            return self._execute(_stmt.then_branch)
         elif _stmt.else_branch is not None:
-            self._execute(_stmt.else_branch)
+            return self._execute(_stmt.else_branch)
         return None
 
     def visit_print_stmt(self, _stmt: stmt.Stmt) -> None:
@@ -224,32 +247,77 @@ class Interpreter(expr.Visitor[object], stmt.Visitor[None]):
         print(self._stringify(value))
         return None
 
-    def visit_return_stmt(self, _stmt: stmt.Return) -> None:
+    def visit_return_stmt(self, _stmt: stmt.Return) -> Optional[Return]:
+        if _stmt.tail_call:
+            return self._tail_call(_stmt.value)
+
         value = None
         if _stmt.value is not None:
             value = self._evaluate(_stmt.value)
 
-        raise Return(value)
+        return Return(value)
 
     def visit_var_stmt(self, _stmt: stmt.Var) -> None:
         value = None
         if _stmt.initializer is not None:
             value = self._evaluate(_stmt.initializer)
 
-        self._environment.define(_stmt.name.lexme, value)
+        self._define(_stmt, value)
         return None
 
-    def visit_while_stmt(self, _stmt: stmt.While) -> None:
+    def _define(self, declaration: stmt.Stmt, value: object) -> None:
+        """
+        Stores the value of the variable that a Var, Function or Class
+        statement declares.
+        """
+        if declaration.depth is not None:
+            self._environment.assign_at(declaration.depth, declaration.slot, value)
+        else:
+            self.globals.define(declaration.name.lexme, value)
+
+    def visit_while_stmt(self, _stmt: stmt.While) -> Optional[Return]:
         while self._is_truthy(self._evaluate(_stmt.condition)):
-            self._execute(_stmt.body)
+            completion = self._execute(_stmt.body)
+            if completion is not None:
+                return completion
+        return None
+
+    def visit_for_stmt(self, _stmt: stmt.For) -> Optional[Return]:
+        condition = _stmt.condition
+        increment = _stmt.increment
+        body = _stmt.body
+        while self._is_truthy(self._evaluate(condition)):
+            completion = body.accept(self)
+            if completion is not None:
+                return completion
+            if increment is not None:
+                self._evaluate(increment)
+        return None
+
+    def visit_forrange_stmt(self, _stmt: stmt.ForRange) -> Optional[Return]:
+        start = self._evaluate(_stmt.start)
+        end = self._evaluate(_stmt.end)
+        self._check_number_operands(_stmt.dots, start, end)
+
+        # The loop counts in Python and gives the variable each value, so
+        # assigning to the variable in the body doesn't change the iterations
+        values = self._environment.ancestor(_stmt.depth)._values
+        slot = _stmt.slot
+        body = _stmt.body
+        value = start
+        while value < end:
+            values[slot] = value
+            completion = body.accept(self)
+            if completion is not None:
+                return completion
+            value += 1
         return None
 
     def visit_assign_expr(self, _expr: expr.Assign) -> object:
         value = self._evaluate(_expr.value)
 
-        if _expr in self._locals:
-            distance = self._locals[_expr]
-            self._environment.assign_at(distance, _expr.name, value)
+        if _expr.depth is not None:
+            self._environment.assign_at(_expr.depth, _expr.slot, value)
         else:
             self.globals.assign(_expr.name, value)
 
@@ -296,12 +364,22 @@ class Interpreter(expr.Visitor[object], stmt.Visitor[None]):
         return None
 
     def visit_call_expr(self, _expr: expr.Call) -> object:
+        if isinstance(_expr.callee, expr.Get):
+            return self._invoke(_expr, _expr.callee)
+        if isinstance(_expr.callee, expr.Super):
+            return self._invoke_super(_expr, _expr.callee)
+
         callee = self._evaluate(_expr.callee)
 
         arguments = []
         for argument in _expr.arguments:
             arguments.append(self._evaluate(argument))
 
+        return self._call(_expr, callee, arguments)
+
+    def _call(
+        self, _expr: expr.Call, callee: object, arguments: List[object]
+    ) -> object:
         if not isinstance(callee, LoxCallable):
             raise RuntimeError(_expr.paren, "Can only call functions and classes.")
 
@@ -315,8 +393,137 @@ class Interpreter(expr.Visitor[object], stmt.Visitor[None]):
         return function.call(self, arguments)
 
     def visit_get_expr(self, _expr: expr.Get) -> object:
-        _object = self._evaluate(_expr.object)
-        if isinstance(_object, LoxInstance):
-            return _object.get(_expr.name)
+        return self._get(_expr, self._evaluate(_expr.object))
+
+    def _invoke(self, _expr: expr.Call, callee: expr.Get) -> object:
+        """
+        Calls "object.name(...)" without creating a bound method when the
+        name is a method, by handing the instance to the method as the first
+        slot of its environment.
+        """
+        _object = self._evaluate(callee.object)
+        if not isinstance(_object, LoxInstance):
+            raise RuntimeError(callee.name, "Only instances have properties.")
+
+        method = self._find_method(callee, _object)
+        if method is None:
+            function = _object._fields[callee.name.lexme]
+            values = []
+        else:
+            function = method
+            values = [_object]
+
+        for argument in _expr.arguments:
+            values.append(self._evaluate(argument))
+
+        if method is None:
+            return self._call(_expr, function, values)
+
+        if len(values) - 1 != method.arity():
+            raise RuntimeError(
+                _expr.paren,
+                f"Expected {method.arity()} arguments but got {len(values) - 1}.",
+            )
+
+        return method.invoke(self, values)
+
+    def _invoke_super(self, _expr: expr.Call, callee: expr.Super) -> object:
+        method = self._super_method(callee)
+
+        values = [self._environment.get_at(callee.depth - 1, 0)]
+        for argument in _expr.arguments:
+            values.append(self._evaluate(argument))
+
+        if len(values) - 1 != method.arity():
+            raise RuntimeError(
+                _expr.paren,
+                f"Expected {method.arity()} arguments but got {len(values) - 1}.",
+            )
+
+        return method.invoke(self, values)
+
+    def _tail_call(self, _expr: expr.Call) -> Union[Return, TailCall]:
+        """
+        Evaluates the callee and arguments of a call in tail position. A Lox
+        function is handed back as a TailCall, to be run in place of the
+        function that is returning, while anything else is called right away.
+        """
+        callee = _expr.callee
+        instance = None
+        if isinstance(callee, expr.Get):
+            instance = self._evaluate(callee.object)
+            if not isinstance(instance, LoxInstance):
+                raise RuntimeError(callee.name, "Only instances have properties.")
+
+            function = self._find_method(callee, instance)
+            if function is None:
+                function = instance._fields[callee.name.lexme]
+                instance = None
+        elif isinstance(callee, expr.Super):
+            function = self._super_method(callee)
+            instance = self._environment.get_at(callee.depth - 1, 0)
+        else:
+            function = self._evaluate(callee)
+
+        arguments = []
+        for argument in _expr.arguments:
+            arguments.append(self._evaluate(argument))
+
+        if not isinstance(function, LoxCallable):
+            raise RuntimeError(_expr.paren, "Can only call functions and classes.")
+
+        if len(arguments) != function.arity():
+            raise RuntimeError(
+                _expr.paren,
+                f"Expected {function.arity()} arguments but got {len(arguments)}.",
+            )
+
+        if isinstance(function, LoxFunction):
+            if instance is None:
+                instance = function._instance
+            if instance is not None:
+                arguments.insert(0, instance)
+            return TailCall(function, arguments)
+
+        if isinstance(function, LoxClass) and function._initializer is not None:
+            return TailCall(function._initializer, [LoxInstance(function), *arguments])
+
+        return Return(function.call(self, arguments))
+
+    def _get(self, _expr: expr.Get, _object: object) -> object:
+        if not isinstance(_object, LoxInstance):
+            raise RuntimeError(_expr.name, "Only instances have properties.")
+
+        method = self._find_method(_expr, _object)
+        if method is None:
+            return _object._fields[_expr.name.lexme]
+        return method.bind(_object)
 
-        raise RuntimeError(_expr.name, "Only instances have properties.")
+    def _find_method(self, _expr: expr.Get, _object: LoxInstance) -> LoxFunction:
+        """
+        Returns the method the property names, or None if it names a field of
+        the instance.
+        """
+        cache = _expr.cache
+        if cache is None:
+            cache = _expr.cache = self._new_inline_cache("get", _expr.name)
+
+        # A cached method still has to check that no field shadows it
+        klass = _object._klass
+        lexme = _expr.name.lexme
+        is_field = lexme in _object._fields
+        if klass in cache.classes:
+            method = cache.classes[klass]
+            if (method is None) == is_field:
+                cache.hits += 1
+                return method
+
+        cache.misses += 1
+        method = None
+        if not is_field:
+            method = klass.find_method(lexme)
+            if method is None:
+                raise RuntimeError(_expr.name, f"Undefined property '{lexme}'.")
+
+        cache.record(klass, method)
+        return method
@@ -1,16 +1,62 @@
+import os
 import sys
+import mmap
 import argparse
+from typing import Optional, TextIO
 
-from scanner import Scanner
+from scanner import (
+    Scanner,
+    RegexScanner,
+    StreamScanner,
+    ByteScanner,
+    BufferScanner,
+)
 from parser import Parser
 from error_reporter import error_reporter
 from interpreter import Interpreter
+from closure_interpreter import ClosureInterpreter
+from quickening_interpreter import QuickeningInterpreter
+from stackless_interpreter import StacklessInterpreter
+from vm import VM
+from transpiler import TranspiledInterpreter
 from resolver import Resolver
+from optimizer import Optimizer
+from inliner import Inliner
+from inline_cache import format_stats
+from program_cache import Program, ProgramCache, default_directory
+
+
+ENGINES = {
+    "tree": Interpreter,
+    "closure": ClosureInterpreter,
+    "quicken": QuickeningInterpreter,
+    "stackless": StacklessInterpreter,
+    "vm": VM,
+    "python": TranspiledInterpreter,
+}
+
+# Engines that look properties up through the inline caches of the nodes
+IC_STATS_ENGINES = ["tree", "quicken", "stackless"]
+
+# Engines that bound calls themselves, rather than by Python's recursion limit
+MAX_CALL_DEPTH_ENGINES = ["stackless", "vm"]
+
+SCANNERS = {
+    "regex": RegexScanner,
+    "char": Scanner,
+    "bytes": ByteScanner,
+    "buffer": BufferScanner,
+}
 
 
 class Lox:
-    def __init__(self):
-        self._interpreter = Interpreter()
+    def __init__(self, engine: str = "tree"):
+        self._interpreter = ENGINES[engine]()
+        self._scanner = RegexScanner
+        self._ic_stats = False
+        self._optimize = 0
+        self._stream = False
+        self._cache: Optional[ProgramCache] = None
 
     def main(self) -> None:
         parser = argparse.ArgumentParser(description="Interprets Lox scripts")
@@ -23,8 +69,102 @@ class Lox:
             nargs=1,
             help="Lox script to be interpreted",
         )
+        parser.add_argument(
+            "--engine",
+            choices=ENGINES.keys(),
+            default="tree",
+            help="Execution engine used to run the script",
+        )
+        parser.add_argument(
+            "--scanner",
+            choices=SCANNERS.keys(),
+            default="regex",
+            help="Scanner used to split the source into tokens: a single regular "
+            "expression, Python code a character at a time, a regular "
+            "expression over the bytes of the memory-mapped script, or a regular "
+            "expression filling a compact token buffer",
+        )
+        parser.add_argument(
+            "--max-call-depth",
+            type=int,
+            help="Number of nested calls allowed before a stack overflow "
+            "(stackless and vm engines)",
+        )
+        parser.add_argument(
+            "-O",
+            dest="optimize",
+            type=int,
+            nargs="?",
+            const=1,
+            default=0,
+            metavar="level",
+            help="Fold constant expressions and remove dead code before running, "
+            "and at level 2 also inline calls to small functions",
+        )
+        parser.add_argument(
+            "--ic-stats",
+            action="store_true",
+            help="Print hit and miss counts of every property inline cache "
+            "(tree, quicken and stackless engines)",
+        )
+        parser.add_argument(
+            "--stream",
+            action="store_true",
+            help="Read, parse and run the script a top-level declaration at a "
+            "time instead of all at once, so that memory use doesn't grow with "
+            "its size (regex scanner, and at most -O1)",
+        )
+        parser.add_argument(
+            "--no-cache",
+            action="store_true",
+            help="Compile the script even if it was cached, and don't cache it",
+        )
+        parser.add_argument(
+            "--cache-dir",
+            metavar="directory",
+            help="Directory of compiled scripts (default: $XDG_CACHE_HOME/lox or "
+            "~/.cache/lox)",
+        )
+        parser.add_argument(
+            "--cache-size",
+            type=float,
+            default=ProgramCache.MAX_SIZE / 2**20,
+            metavar="MiB",
+            help="Size the compiled scripts can take before the least recently "
+            "used are deleted",
+        )
 
         args = parser.parse_args()
+        if args.ic_stats and args.engine not in IC_STATS_ENGINES:
+            parser.error(f"--ic-stats is not supported by the {args.engine} engine")
+        if args.max_call_depth is not None and args.max_call_depth < 1:
+            parser.error("--max-call-depth must be a positive integer")
+        if (
+            args.max_call_depth is not None
+            and args.engine not in MAX_CALL_DEPTH_ENGINES
+        ):
+            parser.error(
+                f"--max-call-depth is not supported by the {args.engine} engine"
+            )
+        # Streamed scripts are scanned by a StreamScanner, which works like the
+        # regex scanner, and the Inliner needs to see the whole program
+        if args.stream and args.scanner != "regex":
+            parser.error(f"--stream is not supported by the {args.scanner} scanner")
+        if args.stream and args.optimize >= 2:
+            parser.error("--stream is not supported with -O2")
+
+        self._interpreter = ENGINES[args.engine]()
+        self._scanner = SCANNERS[args.scanner]
+        self._ic_stats = args.ic_stats
+        self._optimize = args.optimize
+        self._stream = args.stream
+        # Scripts run a declaration at a time are never compiled whole
+        if args.script and not args.no_cache and not args.stream:
+            self._cache = ProgramCache(
+                args.cache_dir or default_directory(), int(args.cache_size * 2**20)
+            )
+        if args.max_call_depth is not None:
+            self._interpreter.max_call_depth = args.max_call_depth
 
         if args.script:
             self._run_file(args.script[0])
@@ -32,15 +172,40 @@ class Lox:
             self._run_prompt()
 
     def _run_file(self, path: str) -> None:
-        with open(path, "r") as f:
-            self._run(f.read())
+        if self._stream:
+            with open(path, "r") as f:
+                self._run_stream(f)
+        elif self._scanner is ByteScanner:
+            self._run_mapped(path)
+        else:
+            with open(path, "r") as f:
+                self._run(f.read())
 
-            if error_reporter.had_error:
-                sys.exit(65)
-            if error_reporter.had_runtime_error:
-                sys.exit(70)
+        if self._ic_stats:
+            print(format_stats(self._interpreter.inline_caches), file=sys.stderr)
+
+        if error_reporter.had_error:
+            sys.exit(65)
+        if error_reporter.had_runtime_error:
+            sys.exit(70)
+
+    def _run_mapped(self, path: str) -> None:
+        """
+        Maps the file into memory for the ByteScanner to scan, instead of
+        reading and decoding a copy of it.
+        """
+        with open(path, "rb") as f:
+            # Empty files can't be mapped
+            if os.fstat(f.fileno()).st_size == 0:
+                self._run(b"")
+                return
+
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as src:
+                self._run(src)
 
     def _run_prompt(self) -> None:
+        # The Inliner needs to see the whole program, not a line at a time
+        self._optimize = min(self._optimize, 1)
         while True:
             line = input("> ")
             # Interpreter exits when user does not enter any input
@@ -52,22 +217,80 @@ class Lox:
             error_reporter.had_error = False
 
     def _run(self, src: str) -> None:
-        scanner = Scanner(src)
+        key = None
+        program = None
+        if self._cache is not None:
+            key = self._cache.key(src, self._optimize)
+            program = self._cache.load(key)
+
+        if program is None:
+            program = self._compile(src)
+            if program is None:
+                return
+            if key is not None:
+                self._cache.store(key, program)
+
+        statements, inlined = program
+        if inlined is not None:
+            print(f"Inlined {inlined} call sites.", file=sys.stderr)
+        self._interpreter.interpret(statements)
+
+    def _compile(self, src: str) -> Optional[Program]:
+        """
+        Returns the statements of the program ready to run, and how many
+        call sites were inlined at -O2, or None if it has errors.
+        """
+        scanner = self._scanner(src)
         tokens = scanner.scan_tokens()
         parser = Parser(tokens)
         statements = parser.parse()
 
         if error_reporter.had_error:
-            return
+            return None
 
-        resolver = Resolver(self._interpreter)
+        resolver = Resolver()
         resolver._resolve(statements)
 
         # Stop if there was a resolution error
         if error_reporter.had_error:
-            return
+            return None
 
-        self._interpreter.interpret(statements)
+        inlined = None
+        if self._optimize >= 2:
+            inliner = Inliner(resolver)
+            statements = inliner.inline(statements)
+            inlined = inliner.inlined
+        elif self._optimize:
+            statements = Optimizer().optimize(statements)
+
+        return statements, inlined
+
+    def _run_stream(self, reader: TextIO) -> None:
+        """
+        Runs each top-level declaration as soon as it has been parsed, like
+        the prompt does with each line, so that neither the source nor its
+        tokens and statements are ever held whole. Unlike "_run", this means
+        that the declarations before a syntax or resolution error still run.
+        After an error, the rest of the script is only parsed, to report any
+        other syntax errors, and it stops at a runtime error.
+        """
+        tokens = StreamScanner(reader).scan_tokens()
+        resolver = Resolver()
+
+        for statement in Parser(tokens).declarations():
+            if error_reporter.had_error:
+                continue
+
+            resolver._resolve(statement)
+            if error_reporter.had_error:
+                continue
+
+            statements = [statement]
+            if self._optimize:
+                statements = Optimizer().optimize(statements)
+            self._interpreter.interpret(statements)
+            if error_reporter.had_runtime_error:
+                break
 
 
 if __name__ == "__main__":
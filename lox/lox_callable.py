@@ -2,6 +2,8 @@ from typing import List
 
 
 class LoxCallable:
+    __slots__ = ()
+
     def __init__(self):
         pass
 
@@ -5,33 +5,45 @@ from typing import List, Dict, Self
 
 
 class LoxClass(LoxCallable):
+    __slots__ = (
+        "_superclass",
+        "_name",
+        "_methods",
+        "_method_table",
+        "_initializer",
+        "_arity",
+    )
+
     def __init__(self, name: str, superclass: Self, methods: Dict[str, LoxFunction]):
         self._superclass = superclass
         self._name = name
         self._methods = methods
 
-    def find_method(self, name: str) -> LoxFunction:
-        if name in self._methods:
-            return self._methods[name]
+        # A class never changes once it is defined, so the methods it inherits
+        # are copied down into a single table up front, and its initializer
+        # and arity are looked up only once
+        self._method_table = {}
+        if superclass is not None:
+            self._method_table.update(superclass._method_table)
+        self._method_table.update(methods)
 
-        if self._superclass is not None:
-            return self._superclass.find_method(name)
+        self._initializer = self._method_table.get("init")
+        self._arity = 0
+        if self._initializer is not None:
+            self._arity = self._initializer.arity()
 
-        return None
+    def find_method(self, name: str) -> LoxFunction:
+        return self._method_table.get(name)
 
     def __str__(self) -> str:
         return self._name
 
     def call(self, interpreter: "Interpreter", arguments: List[object]) -> object:
         instance = LoxInstance(self)
-        initializer = self.find_method("init")
-        if initializer is not None:
-            initializer.bind(instance).call(interpreter, arguments)
+        if self._initializer is not None:
+            self._initializer.invoke(interpreter, [instance, *arguments])
 
         return instance
 
     def arity(self) -> int:
-        initializer = self.find_method("init")
-        if initializer is None:
-            return 0
-        return initializer.arity()
+        return self._arity
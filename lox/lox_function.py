@@ -1,23 +1,31 @@
 from typing import List, Self
-from _return import Return
 from environment import Environment
 from lox_callable import LoxCallable
 from lox_instance import LoxInstance
+from _return import TailCall
 from stmt import Function
 
 
 class LoxFunction(LoxCallable):
+    __slots__ = ("_is_initializer", "_closure", "_declaration", "_instance")
+
     def __init__(
-        self, declaration: Function, closure: Environment, is_initializer: bool
+        self,
+        declaration: Function,
+        closure: Environment,
+        is_initializer: bool,
+        instance: LoxInstance = None,
     ):
         self._is_initializer = is_initializer
         self._closure = closure
         self._declaration = declaration
+        # The instance a method is bound to, which it sees as "this"
+        self._instance = instance
 
     def bind(self, instance: LoxInstance) -> Self:
-        environment = Environment(self._closure)
-        environment.define("this", instance)
-        return LoxFunction(self._declaration, environment, self._is_initializer)
+        return LoxFunction(
+            self._declaration, self._closure, self._is_initializer, instance
+        )
 
     def to_string(self) -> str:
         return f"fn {self._declaration.name.lexme}>"
@@ -26,18 +34,42 @@ class LoxFunction(LoxCallable):
         return len(self._declaration.params)
 
     def call(self, interpreter: "Interpreter", arguments: List[object]) -> object:
-        environment = Environment(self._closure)
-        for idx, param in enumerate(self._declaration.params):
-            environment.define(param.lexme, arguments[idx])
+        if self._instance is not None:
+            arguments = [self._instance, *arguments]
+        return self.invoke(interpreter, arguments)
+
+    def frame(self, values: List[object]) -> Environment:
+        """
+        Returns the environment that a call runs in, which starts with
+        "values" and has room after them for the locals of the body.
+        """
+        size = self._declaration.size
+        if len(values) < size:
+            values.extend([None] * (size - len(values)))
+        return Environment(self._closure, values)
+
+    def invoke(self, interpreter: "Interpreter", values: List[object]) -> object:
+        """
+        Runs the function with "values" as the first slots of its
+        environment: the arguments, preceded for a method by the instance
+        "this" refers to. Methods can be called this way without binding them
+        first.
 
-        try:
-            interpreter.execute_block(self._declaration.body, environment)
-        except Return as return_value:
-            if self._is_initializer:
-                return self._closure.get_at(0, "this")
+        A tail call the function makes runs here in its place, so a chain of
+        tail calls takes up no more of the stack than a single call.
+        """
+        function = self
+        while True:
+            completion = interpreter.execute_block(
+                function._declaration.body, function.frame(values)
+            )
 
-            return return_value.value
+            if function._is_initializer:
+                return values[0]
+            if completion is None:
+                return None
+            if completion.__class__ is not TailCall:
+                return completion.value
 
-        if self._is_initializer:
-            return self._closure.get_at(0, "this")
-        return None
+            function = completion.function
+            values = completion.values
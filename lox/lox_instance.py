@@ -3,6 +3,8 @@ from runtime_error import RuntimeError
 
 
 class LoxInstance:
+    __slots__ = ("_klass", "_fields")
+
     def __init__(self, klass: "LoxClass"):
         self._klass = klass
         self._fields = {}
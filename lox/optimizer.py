@@ -0,0 +1,235 @@
+import operator
+from typing import List, Optional
+import expr
+import stmt
+from token_type import TokenType
+
+
+# Binary operators that are folded when both operands are numbers
+number_operators = {
+    TokenType.GREATER: operator.gt,
+    TokenType.GREATER_EQUAL: operator.ge,
+    TokenType.LESS: operator.lt,
+    TokenType.LESS_EQUAL: operator.le,
+    TokenType.MINUS: operator.sub,
+    TokenType.PLUS: operator.add,
+    TokenType.SLASH: operator.truediv,
+    TokenType.STAR: operator.mul,
+}
+
+
+class Optimizer(expr.Visitor[expr.Expr], stmt.Visitor[Optional[stmt.Stmt]]):
+    """
+    Folds constant expressions and removes code that can never run, once the
+    Resolver is done with the program.
+
+    Binary, Unary and Logical nodes whose operands are literals are replaced
+    by a Literal of their value, and Grouping nodes by the expression they
+    wrap. Operations that would fail at runtime, such as "a" - 1, are left
+    alone so that the error is still reported, on the same line, when they
+    run. An "if" whose condition is a literal is replaced by the branch that
+    it takes, while "while" and "for" loops whose condition is a falsey
+    literal, and expression statements that are just a literal, are removed.
+
+    Visit methods return the node that replaces the one visited, which is
+    the node itself when it only had its children optimized. Statement visit
+    methods return None for statements that are removed.
+    """
+
+    def optimize(self, statements: List[stmt.Stmt]) -> List[stmt.Stmt]:
+        optimized = []
+        for statement in statements:
+            statement = statement.accept(self)
+            if statement is not None:
+                optimized.append(statement)
+        return optimized
+
+    def _expr(self, _expr: expr.Expr) -> expr.Expr:
+        return _expr.accept(self)
+
+    def _stmt(self, _stmt: stmt.Stmt) -> stmt.Stmt:
+        """
+        Optimizes a statement that has to stay in place, such as the body of
+        a loop, which becomes an empty block if it is removed.
+        """
+        optimized = _stmt.accept(self)
+        if optimized is None:
+            return stmt.Block([])
+        return optimized
+
+    def _is_truthy(self, value: object) -> bool:
+        return value is not None and value is not False
+
+    def visit_assign_expr(self, _expr: expr.Assign) -> expr.Expr:
+        _expr.value = self._expr(_expr.value)
+        return _expr
+
+    def visit_binary_expr(self, _expr: expr.Binary) -> expr.Expr:
+        _expr.left = self._expr(_expr.left)
+        _expr.right = self._expr(_expr.right)
+        if not (
+            isinstance(_expr.left, expr.Literal)
+            and isinstance(_expr.right, expr.Literal)
+        ):
+            return _expr
+
+        left = _expr.left.value
+        right = _expr.right.value
+        operator_type = _expr.operator.type
+
+        if operator_type == TokenType.EQUAL_EQUAL:
+            return expr.Literal(left.__class__ is right.__class__ and left == right)
+        if operator_type == TokenType.BANG_EQUAL:
+            return expr.Literal(
+                not (left.__class__ is right.__class__ and left == right)
+            )
+
+        if left.__class__ is float and right.__class__ is float:
+            # Division by zero is left for the Interpreter to report
+            if operator_type == TokenType.SLASH and right == 0:
+                return _expr
+            return expr.Literal(number_operators[operator_type](left, right))
+
+        if (
+            operator_type == TokenType.PLUS
+            and left.__class__ is str
+            and right.__class__ is str
+        ):
+            return expr.Literal(left + right)
+
+        return _expr
+
+    def visit_call_expr(self, _expr: expr.Call) -> expr.Expr:
+        _expr.callee = self._expr(_expr.callee)
+        _expr.arguments = [self._expr(argument) for argument in _expr.arguments]
+        return _expr
+
+    def visit_get_expr(self, _expr: expr.Get) -> expr.Expr:
+        _expr.object = self._expr(_expr.object)
+        return _expr
+
+    def visit_grouping_expr(self, _expr: expr.Grouping) -> expr.Expr:
+        return self._expr(_expr.expression)
+
+    def visit_literal_expr(self, _expr: expr.Literal) -> expr.Expr:
+        return _expr
+
+    def visit_logical_expr(self, _expr: expr.Logical) -> expr.Expr:
+        _expr.left = self._expr(_expr.left)
+        _expr.right = self._expr(_expr.right)
+        if not isinstance(_expr.left, expr.Literal):
+            return _expr
+
+        # The left operand decides whether the right one is the value
+        if _expr.operator.type == TokenType.OR:
+            if self._is_truthy(_expr.left.value):
+                return _expr.left
+        else:
+            if not self._is_truthy(_expr.left.value):
+                return _expr.left
+        return _expr.right
+
+    def visit_set_expr(self, _expr: expr.Set) -> expr.Expr:
+        _expr.object = self._expr(_expr.object)
+        _expr.value = self._expr(_expr.value)
+        return _expr
+
+    def visit_super_expr(self, _expr: expr.Super) -> expr.Expr:
+        return _expr
+
+    def visit_this_expr(self, _expr: expr.This) -> expr.Expr:
+        return _expr
+
+    def visit_unary_expr(self, _expr: expr.Unary) -> expr.Expr:
+        _expr.right = self._expr(_expr.right)
+        if not isinstance(_expr.right, expr.Literal):
+            return _expr
+
+        right = _expr.right.value
+        if _expr.operator.type == TokenType.BANG:
+            return expr.Literal(not self._is_truthy(right))
+        if right.__class__ is float:
+            return expr.Literal(-right)
+        return _expr
+
+    def visit_variable_expr(self, _expr: expr.Variable) -> expr.Expr:
+        return _expr
+
+    def visit_block_stmt(self, _stmt: stmt.Block) -> Optional[stmt.Stmt]:
+        _stmt.statements = self.optimize(_stmt.statements)
+        return _stmt
+
+    def visit_class_stmt(self, _stmt: stmt.Class) -> Optional[stmt.Stmt]:
+        for method in _stmt.methods:
+            method.accept(self)
+        return _stmt
+
+    def visit_expression_stmt(self, _stmt: stmt.Expression) -> Optional[stmt.Stmt]:
+        _stmt.expression = self._expr(_stmt.expression)
+        if isinstance(_stmt.expression, expr.Literal):
+            return None
+        return _stmt
+
+    def visit_function_stmt(self, _stmt: stmt.Function) -> Optional[stmt.Stmt]:
+        _stmt.body = self.optimize(_stmt.body)
+        return _stmt
+
+    def visit_if_stmt(self, _stmt: stmt.If) -> Optional[stmt.Stmt]:
+        _stmt.condition = self._expr(_stmt.condition)
+        if isinstance(_stmt.condition, expr.Literal):
+            if self._is_truthy(_stmt.condition.value):
+                return _stmt.then_branch.accept(self)
+            if _stmt.else_branch is not None:
+                return _stmt.else_branch.accept(self)
+            return None
+
+        _stmt.then_branch = self._stmt(_stmt.then_branch)
+        if _stmt.else_branch is not None:
+            _stmt.else_branch = _stmt.else_branch.accept(self)
+        return _stmt
+
+    def visit_print_stmt(self, _stmt: stmt.Print) -> Optional[stmt.Stmt]:
+        _stmt.expression = self._expr(_stmt.expression)
+        return _stmt
+
+    def visit_return_stmt(self, _stmt: stmt.Return) -> Optional[stmt.Stmt]:
+        if _stmt.value is not None:
+            _stmt.value = self._expr(_stmt.value)
+            # The call may have been replaced
+            _stmt.tail_call = _stmt.tail_call and isinstance(_stmt.value, expr.Call)
+        return _stmt
+
+    def visit_var_stmt(self, _stmt: stmt.Var) -> Optional[stmt.Stmt]:
+        if _stmt.initializer is not None:
+            _stmt.initializer = self._expr(_stmt.initializer)
+        return _stmt
+
+    def visit_while_stmt(self, _stmt: stmt.While) -> Optional[stmt.Stmt]:
+        _stmt.condition = self._expr(_stmt.condition)
+        if isinstance(_stmt.condition, expr.Literal) and not self._is_truthy(
+            _stmt.condition.value
+        ):
+            return None
+
+        _stmt.body = self._stmt(_stmt.body)
+        return _stmt
+
+    def visit_for_stmt(self, _stmt: stmt.For) -> Optional[stmt.Stmt]:
+        _stmt.condition = self._expr(_stmt.condition)
+        if isinstance(_stmt.condition, expr.Literal) and not self._is_truthy(
+            _stmt.condition.value
+        ):
+            return None
+
+        if _stmt.increment is not None:
+            _stmt.increment = self._expr(_stmt.increment)
+            if isinstance(_stmt.increment, expr.Literal):
+                _stmt.increment = None
+        _stmt.body = self._stmt(_stmt.body)
+        return _stmt
+
+    def visit_forrange_stmt(self, _stmt: stmt.ForRange) -> Optional[stmt.Stmt]:
+        _stmt.start = self._expr(_stmt.start)
+        _stmt.end = self._expr(_stmt.end)
+        _stmt.body = self._stmt(_stmt.body)
+        return _stmt
@@ -1,4 +1,5 @@
-from typing import List
+from itertools import islice
+from typing import Iterable, Iterator, List, Optional
 from token import Token
 from token_type import TokenType
 from error_reporter import error_reporter
@@ -17,16 +18,67 @@ from expr import (
     This,
     Super,
 )
-from stmt import Stmt, Print, Expression, Var, Block, If, While, Function, Return, Class
+from stmt import (
+    Stmt,
+    Print,
+    Expression,
+    Var,
+    Block,
+    If,
+    While,
+    For,
+    ForRange,
+    Function,
+    Return,
+    Class,
+)
 
 
 class _ParseError(Exception):
     pass
 
 
+# The precedence of each binary operator, from loosest to tightest, and the
+# node it makes. Assignment binds more loosely than any of them, and unary
+# operators, calls and property accesses more tightly.
+_infix = {
+    TokenType.OR: (1, Logical),
+    TokenType.AND: (2, Logical),
+    TokenType.BANG_EQUAL: (3, Binary),
+    TokenType.EQUAL_EQUAL: (3, Binary),
+    TokenType.GREATER: (4, Binary),
+    TokenType.GREATER_EQUAL: (4, Binary),
+    TokenType.LESS: (4, Binary),
+    TokenType.LESS_EQUAL: (4, Binary),
+    TokenType.MINUS: (5, Binary),
+    TokenType.PLUS: (5, Binary),
+    TokenType.SLASH: (6, Binary),
+    TokenType.STAR: (6, Binary),
+}
+_LOWEST = 1
+
+# The values of the literals that are keywords
+_constants = {
+    TokenType.FALSE: False,
+    TokenType.TRUE: True,
+    TokenType.NIL: None,
+}
+
+
 class Parser:
-    def __init__(self, tokens: List[Token]):
-        self._tokens = tokens
+    # How many tokens at a time are read from an iterator of tokens, and how
+    # many that were parsed are kept before they are dropped
+    BATCH = 4096
+
+    def __init__(self, tokens: Iterable[Token]):
+        if isinstance(tokens, list):
+            self._tokens = tokens
+            self._more = None
+        else:
+            # Tokens are read from the iterator, such as the one of a
+            # StreamScanner or a TokenBuffer, as parsing reaches them
+            self._tokens = []
+            self._more = iter(tokens)
         self._current = 0
 
     def parse(self) -> List[Stmt]:
@@ -34,9 +86,27 @@ class Parser:
 
         while not self._is_at_end():
             statements.append(self._declaration())
+            self._drop_parsed()
 
         return statements
 
+    def declarations(self) -> Iterator[Optional[Stmt]]:
+        """
+        Yields each top-level declaration as soon as it is parsed, or None for
+        one with a syntax error, so that it can be run before the rest of the
+        tokens are read.
+        """
+        while not self._is_at_end():
+            yield self._declaration()
+            self._drop_parsed()
+
+    def _drop_parsed(self) -> None:
+        # Tokens read from an iterator are only looked at again as the
+        # previous token, so the ones before it can go
+        if self._more is not None and self._current > self.BATCH:
+            del self._tokens[: self._current - 1]
+            self._current = 1
+
     def _expression(self) -> Expr:
         return self._assignment()
 
@@ -99,6 +169,10 @@ class Parser:
         if self._match(TokenType.SEMICOLON):
             initializer = None
         elif self._match(TokenType.VAR):
+            if self._check(TokenType.IDENTIFIER) and self._is_in(
+                self._token(self._current + 1)
+            ):
+                return self._for_range_statement()
             initializer = self._var_declaration()
         else:
             initializer = self._expression_statement()
@@ -114,18 +188,32 @@ class Parser:
         self._consume(TokenType.RIGHT_PAREN, "Expect ')' after for clauses.")
         body = self._statement()
 
-        if increment is not None:
-            body = Block([body, Expression(increment)])
-
         if condition is None:
             condition = Literal(True)
-        body = While(condition, body)
+        body = For(condition, increment, body)
 
         if initializer is not None:
             body = Block([initializer, body])
 
         return body
 
+    def _is_in(self, token: Token) -> bool:
+        # "in" is only a keyword right after the variable of a range loop
+        return token.type == TokenType.IDENTIFIER and token.lexme == "in"
+
+    def _for_range_statement(self) -> Stmt:
+        name = self._advance()
+        self._advance()
+
+        start = self._expression()
+        dots = self._consume(TokenType.DOT_DOT, "Expect '..' after range start.")
+        end = self._expression()
+        self._consume(TokenType.RIGHT_PAREN, "Expect ')' after for clauses.")
+        body = self._statement()
+
+        # The block is the scope of the loop variable
+        return Block([ForRange(name, start, dots, end, body)])
+
     def _if_statement(self) -> Stmt:
         self._consume(TokenType.LEFT_PAREN, "Expect '(' after 'if'.")
         condition = self._expression()
@@ -208,7 +296,7 @@ class Parser:
         return statements
 
     def _assignment(self) -> Expr:
-        expr = self._or()
+        expr = self._binary(_LOWEST)
 
         if self._match(TokenType.EQUAL):
             equals = self._previous()
@@ -225,74 +313,29 @@ class Parser:
 
         return expr
 
-    def _or(self) -> Expr:
-        expr = self._and()
-
-        while self._match(TokenType.OR):
-            operator = self._previous()
-            right = self._and()
-            expr = Logical(expr, operator, right)
-
-        return expr
-
-    def _and(self) -> Expr:
-        expr = self._equality()
-
-        while self._match(TokenType.AND):
-            operator = self._previous()
-            right = self._equality()
-            expr = Logical(expr, operator, right)
-
-        return expr
-
-    def _equality(self) -> Expr:
-        expr = self._comparison()
-
-        while self._match(TokenType.BANG_EQUAL, TokenType.EQUAL_EQUAL):
-            operator = self._previous()
-            right = self._comparison()
-            expr = Binary(expr, operator, right)
-
-        return expr
-
-    def _comparison(self) -> Expr:
-        expr = self._term()
-
-        while self._match(
-            TokenType.GREATER,
-            TokenType.GREATER_EQUAL,
-            TokenType.LESS,
-            TokenType.LESS_EQUAL,
-        ):
-            operator = self._previous()
-            right = self._term()
-            expr = Binary(expr, operator, right)
-
-        return expr
-
-    def _term(self) -> Expr:
-        expr = self._factor()
-
-        while self._match(TokenType.MINUS, TokenType.PLUS):
-            operator = self._previous()
-            right = self._factor()
-            expr = Binary(expr, operator, right)
-
-        return expr
-
-    def _factor(self) -> Expr:
+    def _binary(self, precedence: int) -> Expr:
+        """
+        Parses the operators that bind at least as tightly as "precedence",
+        looking each up in "_infix" rather than descending through a method
+        per level. Their right operand only takes operators that bind more
+        tightly, which makes them left-associative.
+        """
         expr = self._unary()
 
-        while self._match(TokenType.SLASH, TokenType.STAR):
-            operator = self._previous()
-            right = self._unary()
-            expr = Binary(expr, operator, right)
+        while True:
+            operator = self._peek()
+            rule = _infix.get(operator.type)
+            if rule is None or rule[0] < precedence:
+                return expr
 
-        return expr
+            self._current += 1
+            right = self._binary(rule[0] + 1)
+            expr = rule[1](expr, operator, right)
 
     def _unary(self) -> Expr:
-        if self._match(TokenType.BANG, TokenType.MINUS):
-            operator = self._previous()
+        operator = self._peek()
+        if operator.type == TokenType.BANG or operator.type == TokenType.MINUS:
+            self._current += 1
             right = self._unary()
             return Unary(operator, right)
 
@@ -319,49 +362,55 @@ class Parser:
         expr = self._primary()
 
         while True:
-            if self._match(TokenType.LEFT_PAREN):
+            type = self._peek().type
+            if type == TokenType.LEFT_PAREN:
+                self._current += 1
                 expr = self._finish_call(expr)
-            elif self._match(TokenType.DOT):
+            elif type == TokenType.DOT:
+                self._current += 1
                 name = self._consume(
                     TokenType.IDENTIFIER, "Expect property name after '.'."
                 )
                 expr = Get(expr, name)
             else:
-                break
-
-        return expr
+                return expr
 
     def _primary(self) -> Expr:
-        if self._match(TokenType.FALSE):
-            return Literal(False)
-        if self._match(TokenType.TRUE):
-            return Literal(True)
-        if self._match(TokenType.NIL):
-            return Literal(None)
-
-        if self._match(TokenType.NUMBER, TokenType.STRING):
-            return Literal(self._previous().literal)
-
-        if self._match(TokenType.SUPER):
-            keyword = self._previous()
-            self._consume(TokenType.DOT, "Expect '.' after 'super'.")
-            method = self._consume(
-                TokenType.IDENTIFIER, "Expect superclass method name."
-            )
-            return Super(keyword, method)
+        token = self._peek()
+        type = token.type
 
-        if self._match(TokenType.THIS):
-            return This(self._previous())
+        # The most common first
+        if type == TokenType.IDENTIFIER:
+            self._current += 1
+            return Variable(token)
 
-        if self._match(TokenType.IDENTIFIER):
-            return Variable(self._previous())
+        if type == TokenType.NUMBER or type == TokenType.STRING:
+            self._current += 1
+            return Literal(token.literal)
+
+        if type in _constants:
+            self._current += 1
+            return Literal(_constants[type])
+
+        if type == TokenType.THIS:
+            self._current += 1
+            return This(token)
 
-        if self._match(TokenType.LEFT_PAREN):
+        if type == TokenType.LEFT_PAREN:
+            self._current += 1
             expr = self._expression()
             self._consume(TokenType.RIGHT_PAREN, "Expect ')' after expression.")
             return Grouping(expr)
 
-        raise self._error(self._peek(), "Expect expression.")
+        if type == TokenType.SUPER:
+            self._current += 1
+            self._consume(TokenType.DOT, "Expect '.' after 'super'.")
+            method = self._consume(
+                TokenType.IDENTIFIER, "Expect superclass method name."
+            )
+            return Super(token, method)
+
+        raise self._error(token, "Expect expression.")
 
     def _match(self, *types: TokenType) -> bool:
         for type in types:
@@ -391,7 +440,31 @@ class Parser:
         return self._peek().type == TokenType.EOF
 
     def _peek(self) -> Token:
-        return self._tokens[self._current]
+        try:
+            return self._tokens[self._current]
+        except IndexError:
+            return self._read(self._current)
+
+    def _token(self, idx: int) -> Token:
+        try:
+            return self._tokens[idx]
+        except IndexError:
+            return self._read(idx)
+
+    def _read(self, idx: int) -> Token:
+        """
+        Reads tokens from the iterator until there is one at "idx". Only
+        called once the tokens read so far run out.
+        """
+        if self._more is None:
+            raise IndexError("Read past the end of the tokens")
+
+        while idx >= len(self._tokens):
+            batch = list(islice(self._more, self.BATCH))
+            if not batch:
+                raise IndexError("Read past the end of the tokens")
+            self._tokens.extend(batch)
+        return self._tokens[idx]
 
     def _previous(self) -> Token:
         return self._tokens[self._current - 1]
@@ -0,0 +1,189 @@
+import gc
+import hashlib
+import os
+import pickle
+import sys
+import tempfile
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
+
+from stmt import Stmt
+
+
+# The modules that decide what program a source becomes. A change to any of
+# them changes the version, which makes every program cached before it stale.
+_COMPILER_MODULES = [
+    "token.py",
+    "token_type.py",
+    "scanner.py",
+    "token_buffer.py",
+    "parser.py",
+    "expr.py",
+    "stmt.py",
+    "resolver.py",
+    "optimizer.py",
+    "inliner.py",
+    "program_cache.py",
+]
+
+
+def _version() -> bytes:
+    version = hashlib.sha256(sys.version.encode())
+    directory = os.path.dirname(os.path.abspath(__file__))
+    for name in _COMPILER_MODULES:
+        with open(os.path.join(directory, name), "rb") as file:
+            version.update(file.read())
+    return version.digest()
+
+
+# The statements of a program ready to run, and how many call sites the
+# Inliner inlined, if it ran
+Program = Tuple[List[Stmt], Optional[int]]
+
+
+@contextmanager
+def _no_gc() -> Iterator[None]:
+    """
+    Turns off the cyclic garbage collector, which would otherwise run over
+    and over while a program's many nodes are made or pickled, and more than
+    triple the time it takes, though none of them can be garbage yet.
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+def default_directory() -> str:
+    cache_home = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(cache_home, "lox")
+
+
+class ProgramCache:
+    """
+    Directory of programs that were scanned, parsed, resolved and optimized,
+    pickled so that running an unchanged script again can skip all of that,
+    much like CPython's ".pyc" files.
+
+    A program is stored under a hash of its source, of how it was optimized
+    and of the version of the code that compiled it, so changing any of them
+    simply misses the cache. Only programs without errors are stored. Each
+    is written to a temporary file that is then renamed, so that a run never
+    reads one that is half written, even with other runs writing it at the
+    same time. An entry that can't be read is deleted and compiled again.
+    Once the entries take more than MAX_SIZE bytes, the least recently used
+    are deleted, going by their modification times, which a hit refreshes.
+    """
+
+    MAX_SIZE = 256 * 1024 * 1024
+    SUFFIX = ".loxc"
+
+    def __init__(self, directory: str, max_size: int = MAX_SIZE):
+        self.directory = directory
+        self.max_size = max_size
+        self._version = _version()
+
+    def key(self, src: object, optimize: int) -> str:
+        """
+        Key of the program compiled from "src", given as a str or as its
+        UTF-8 bytes, at the optimization level "optimize".
+        """
+        if isinstance(src, str):
+            src = src.encode()
+        key = hashlib.sha256(self._version)
+        key.update(f"-O{optimize}\0".encode())
+        key.update(src)
+        return key.hexdigest()
+
+    def load(self, key: str) -> Optional[Program]:
+        path = self._path(key)
+        try:
+            with open(path, "rb") as file, _no_gc():
+                count, inlined = pickle.load(file)
+                statements = [pickle.load(file) for _ in range(count)]
+        except FileNotFoundError:
+            return None
+        except Exception:
+            # Corrupt, or written by a version that pickled differently
+            self._remove(path)
+            return None
+
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return statements, inlined
+
+    def store(self, key: str, program: Program) -> None:
+        """
+        Stores a program, unless it can't be pickled, which very deeply
+        nested ones can't be, or the directory can't be written to. Either
+        only costs the next run the time to compile the program again.
+        """
+        statements, inlined = program
+        try:
+            os.makedirs(self.directory, exist_ok=True)
+            fd, temp_path = tempfile.mkstemp(
+                dir=self.directory, prefix=".tmp-", suffix=self.SUFFIX
+            )
+        except OSError:
+            return
+
+        try:
+            with os.fdopen(fd, "wb") as file, _no_gc():
+                # Each statement is pickled on its own, since unpickling
+                # keeps everything it has made until it is done, including
+                # the arguments of each node
+                pickle.dump((len(statements), inlined), file)
+                for statement in statements:
+                    pickle.dump(statement, file, pickle.HIGHEST_PROTOCOL)
+            os.replace(temp_path, self._path(key))
+        except (OSError, RecursionError):
+            self._remove(temp_path)
+            return
+
+        self._evict()
+
+    def _evict(self) -> None:
+        entries = []
+        total = 0
+        for entry in self._entries():
+            try:
+                stat = os.stat(entry)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, entry))
+            total += stat.st_size
+
+        # Oldest first
+        entries.sort()
+        for _, size, entry in entries:
+            if total <= self.max_size:
+                break
+            self._remove(entry)
+            total -= size
+
+    def _entries(self) -> List[str]:
+        try:
+            names = os.listdir(self.directory)
+        except OSError:
+            return []
+        return [
+            os.path.join(self.directory, name)
+            for name in names
+            if name.endswith(self.SUFFIX) and not name.startswith(".tmp-")
+        ]
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + self.SUFFIX)
+
+    def _remove(self, path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
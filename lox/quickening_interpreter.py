@@ -0,0 +1,313 @@
+from typing import Type
+import expr
+from token_type import TokenType
+from token import Token
+from interpreter import Interpreter
+from lox_instance import LoxInstance
+
+
+# Nodes are quickened by swapping their class for a subclass whose "accept"
+# evaluates the node directly. These subclasses add no slots, so the swap is
+# always allowed, and they assume that they are visited by a
+# QuickeningInterpreter, which holds since quickening only happens once the
+# Resolver is done with the program.
+
+
+class _GenericBinary(expr.Binary):
+    __slots__ = ()
+
+    def accept(self, visitor: "QuickeningInterpreter") -> object:
+        return Interpreter.visit_binary_expr(visitor, self)
+
+
+class _GenericUnary(expr.Unary):
+    __slots__ = ()
+
+    def accept(self, visitor: "QuickeningInterpreter") -> object:
+        return Interpreter.visit_unary_expr(visitor, self)
+
+
+class _GenericGet(expr.Get):
+    __slots__ = ()
+
+    def accept(self, visitor: "QuickeningInterpreter") -> object:
+        return Interpreter.visit_get_expr(visitor, self)
+
+
+def _deoptimize_binary(
+    node: expr.Binary, visitor: "QuickeningInterpreter", left: object, right: object
+) -> object:
+    node.__class__ = _GenericBinary
+    return visitor._binary(node.operator, left, right)
+
+
+# Binary operators specialized for two numbers
+class _FloatGreater(expr.Binary):
+    __slots__ = ()
+
+    def accept(self, visitor: "QuickeningInterpreter") -> object:
+        left = self.left.accept(visitor)
+        right = self.right.accept(visitor)
+        if left.__class__ is float and right.__class__ is float:
+            return left > right
+        return _deoptimize_binary(self, visitor, left, right)
+
+
+class _FloatGreaterEqual(expr.Binary):
+    __slots__ = ()
+
+    def accept(self, visitor: "QuickeningInterpreter") -> object:
+        left = self.left.accept(visitor)
+        right = self.right.accept(visitor)
+        if left.__class__ is float and right.__class__ is float:
+            return left >= right
+        return _deoptimize_binary(self, visitor, left, right)
+
+
+class _FloatLess(expr.Binary):
+    __slots__ = ()
+
+    def accept(self, visitor: "QuickeningInterpreter") -> object:
+        left = self.left.accept(visitor)
+        right = self.right.accept(visitor)
+        if left.__class__ is float and right.__class__ is float:
+            return left < right
+        return _deoptimize_binary(self, visitor, left, right)
+
+
+class _FloatLessEqual(expr.Binary):
+    __slots__ = ()
+
+    def accept(self, visitor: "QuickeningInterpreter") -> object:
+        left = self.left.accept(visitor)
+        right = self.right.accept(visitor)
+        if left.__class__ is float and right.__class__ is float:
+            return left <= right
+        return _deoptimize_binary(self, visitor, left, right)
+
+
+class _FloatSubtract(expr.Binary):
+    __slots__ = ()
+
+    def accept(self, visitor: "QuickeningInterpreter") -> object:
+        left = self.left.accept(visitor)
+        right = self.right.accept(visitor)
+        if left.__class__ is float and right.__class__ is float:
+            return left - right
+        return _deoptimize_binary(self, visitor, left, right)
+
+
+class _FloatAdd(expr.Binary):
+    __slots__ = ()
+
+    def accept(self, visitor: "QuickeningInterpreter") -> object:
+        left = self.left.accept(visitor)
+        right = self.right.accept(visitor)
+        if left.__class__ is float and right.__class__ is float:
+            return left + right
+        return _deoptimize_binary(self, visitor, left, right)
+
+
+class _FloatDivide(expr.Binary):
+    __slots__ = ()
+
+    def accept(self, visitor: "QuickeningInterpreter") -> object:
+        left = self.left.accept(visitor)
+        right = self.right.accept(visitor)
+        if left.__class__ is float and right.__class__ is float:
+            return left / right
+        return _deoptimize_binary(self, visitor, left, right)
+
+
+class _FloatMultiply(expr.Binary):
+    __slots__ = ()
+
+    def accept(self, visitor: "QuickeningInterpreter") -> object:
+        left = self.left.accept(visitor)
+        right = self.right.accept(visitor)
+        if left.__class__ is float and right.__class__ is float:
+            return left * right
+        return _deoptimize_binary(self, visitor, left, right)
+
+
+_float_binaries = {
+    TokenType.GREATER: _FloatGreater,
+    TokenType.GREATER_EQUAL: _FloatGreaterEqual,
+    TokenType.LESS: _FloatLess,
+    TokenType.LESS_EQUAL: _FloatLessEqual,
+    TokenType.MINUS: _FloatSubtract,
+    TokenType.PLUS: _FloatAdd,
+    TokenType.SLASH: _FloatDivide,
+    TokenType.STAR: _FloatMultiply,
+}
+
+
+class _StrAdd(expr.Binary):
+    __slots__ = ()
+
+    def accept(self, visitor: "QuickeningInterpreter") -> object:
+        left = self.left.accept(visitor)
+        right = self.right.accept(visitor)
+        if left.__class__ is str and right.__class__ is str:
+            return left + right
+        return _deoptimize_binary(self, visitor, left, right)
+
+
+# Equality is defined for every pair of types, so these never deoptimize
+class _Equal(expr.Binary):
+    __slots__ = ()
+
+    def accept(self, visitor: "QuickeningInterpreter") -> object:
+        left = self.left.accept(visitor)
+        right = self.right.accept(visitor)
+        return left.__class__ is right.__class__ and left == right
+
+
+class _NotEqual(expr.Binary):
+    __slots__ = ()
+
+    def accept(self, visitor: "QuickeningInterpreter") -> object:
+        left = self.left.accept(visitor)
+        right = self.right.accept(visitor)
+        return not (left.__class__ is right.__class__ and left == right)
+
+
+class _FloatNegate(expr.Unary):
+    __slots__ = ()
+
+    def accept(self, visitor: "QuickeningInterpreter") -> object:
+        right = self.right.accept(visitor)
+        if right.__class__ is float:
+            return -right
+
+        self.__class__ = _GenericUnary
+        return visitor._unary(self.operator, right)
+
+
+class _Not(expr.Unary):
+    __slots__ = ()
+
+    def accept(self, visitor: "QuickeningInterpreter") -> object:
+        right = self.right.accept(visitor)
+        return right is None or right is False
+
+
+class _Or(expr.Logical):
+    __slots__ = ()
+
+    def accept(self, visitor: "QuickeningInterpreter") -> object:
+        left = self.left.accept(visitor)
+        if left is None or left is False:
+            return self.right.accept(visitor)
+        return left
+
+
+class _And(expr.Logical):
+    __slots__ = ()
+
+    def accept(self, visitor: "QuickeningInterpreter") -> object:
+        left = self.left.accept(visitor)
+        if left is None or left is False:
+            return left
+        return self.right.accept(visitor)
+
+
+class _FieldGet(expr.Get):
+    __slots__ = ()
+
+    def accept(self, visitor: "QuickeningInterpreter") -> object:
+        _object = self.object.accept(visitor)
+        if _object.__class__ is LoxInstance:
+            fields = _object._fields
+            if self.name.lexme in fields:
+                # Still counts in the inline cache of the node, as the
+                # lookup that it would have done, for "--ic-stats"
+                cache = self.cache
+                if cache.classes.get(_object._klass, cache) is None:
+                    cache.hits += 1
+                else:
+                    cache.misses += 1
+                    cache.record(_object._klass, None)
+                return fields[self.name.lexme]
+
+        self.__class__ = _GenericGet
+        return visitor._get(self, _object)
+
+
+def _specialize_binary(operator: Token, left: object, right: object) -> Type:
+    if operator.type == TokenType.EQUAL_EQUAL:
+        return _Equal
+    if operator.type == TokenType.BANG_EQUAL:
+        return _NotEqual
+    if left.__class__ is float and right.__class__ is float:
+        return _float_binaries[operator.type]
+    if (
+        operator.type == TokenType.PLUS
+        and left.__class__ is str
+        and right.__class__ is str
+    ):
+        return _StrAdd
+    return _GenericBinary
+
+
+class QuickeningInterpreter(Interpreter):
+    """
+    Tree-walker whose Binary, Unary, Logical and Get nodes specialize
+    themselves on first execution.
+
+    The first time such a node runs it goes through the generic visit method
+    below, which evaluates it and then swaps the node's class for a variant
+    specialized to its operator and to the operand types it just saw, such as
+    "float + float" or "str + str". A specialized node only checks that its
+    operands still have those types, and if they do not, it deoptimizes for
+    good back to the generic Interpreter code.
+    """
+
+    def _binary(self, operator: Token, left: object, right: object) -> object:
+        # Runs the generic code on operands that were already evaluated
+        return Interpreter.visit_binary_expr(
+            self, expr.Binary(expr.Literal(left), operator, expr.Literal(right))
+        )
+
+    def _unary(self, operator: Token, right: object) -> object:
+        return Interpreter.visit_unary_expr(
+            self, expr.Unary(operator, expr.Literal(right))
+        )
+
+    def visit_binary_expr(self, _expr: expr.Binary) -> object:
+        left = self._evaluate(_expr.left)
+        right = self._evaluate(_expr.right)
+
+        value = self._binary(_expr.operator, left, right)
+        _expr.__class__ = _specialize_binary(_expr.operator, left, right)
+        return value
+
+    def visit_unary_expr(self, _expr: expr.Unary) -> object:
+        right = self._evaluate(_expr.right)
+
+        value = self._unary(_expr.operator, right)
+        if _expr.operator.type == TokenType.BANG:
+            _expr.__class__ = _Not
+        elif right.__class__ is float:
+            _expr.__class__ = _FloatNegate
+        else:
+            _expr.__class__ = _GenericUnary
+        return value
+
+    def visit_logical_expr(self, _expr: expr.Logical) -> object:
+        value = super().visit_logical_expr(_expr)
+        if _expr.operator.type == TokenType.OR:
+            _expr.__class__ = _Or
+        else:
+            _expr.__class__ = _And
+        return value
+
+    def visit_get_expr(self, _expr: expr.Get) -> object:
+        _object = self._evaluate(_expr.object)
+
+        value = self._get(_expr, _object)
+        if _object.__class__ is LoxInstance and _expr.name.lexme in _object._fields:
+            _expr.__class__ = _FieldGet
+        else:
+            _expr.__class__ = _GenericGet
+        return value
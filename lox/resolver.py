@@ -1,10 +1,9 @@
 import expr
 import stmt
 from token import Token
-from interpreter import Interpreter
 from error_reporter import error_reporter
 from enum import Enum
-from typing import List, overload
+from typing import Dict, List, Optional, Set, Tuple, overload
 from functools import singledispatchmethod
 
 
@@ -21,12 +20,67 @@ class ClassType(Enum):
     SUBCLASS = 3
 
 
+class _Local:
+    """
+    A local variable, with every node that refers to it and the scope that
+    node is in. It is captured if a function other than the one declaring it
+    refers to it.
+    """
+
+    def __init__(self, scope: "_Scope"):
+        self.scope = scope
+        self.captured = False
+        self.slot: Optional[int] = None
+        self.references: List[Tuple[object, "_Scope"]] = []
+
+
+class _Scope:
+    """
+    A scope of the program: a block, the body of a function ("node" is then
+    the Function), or the scope holding "super" ("node" is None).
+
+    Functions and "super" always get an environment at runtime, and so do
+    blocks outside of any function. Any other block only gets one if a
+    closure captures one of its locals, since each execution of the block
+    then needs fresh ones. The locals of a block without an environment live
+    in the nearest enclosing scope that has one, which is usually the frame
+    of the function.
+    """
+
+    def __init__(self, enclosing: Optional["_Scope"], node: object):
+        self.enclosing = enclosing
+        self.node = node
+        if isinstance(node, stmt.Function):
+            self.function = self
+        elif enclosing is not None:
+            self.function = enclosing.function
+        else:
+            self.function = None
+        # Whether each local is defined yet, besides being declared
+        self.defined: Dict[str, bool] = {}
+        self.locals: Dict[str, _Local] = {}
+        self.has_environment = False
+        self.size = 0
+
+
 class Resolver(expr.Visitor[None], stmt.Visitor[None]):
-    def __init__(self, interpreter: Interpreter):
-        self._interpreter = interpreter
-        self._scopes = []
+    def __init__(self):
+        self._scopes: List[_Scope] = []
+        # Locals and scopes seen since the outermost scope began, in order.
+        # They get their slots once it ends, when it is known which locals
+        # are captured.
+        self._locals: List[_Local] = []
+        self._ended: List[_Scope] = []
         self._current_function = FunctionType.NONE
         self._current_class = ClassType.NONE
+        # What the Inliner needs to know about names across the program: how
+        # many times each global is declared, which globals are assigned to
+        # and the names of every local, which could shadow a global
+        self.global_declarations: Dict[str, int] = {}
+        self.assigned_globals: Set[str] = set()
+        self.local_names: Set[str] = set()
+        self._visit_stmt = stmt.dispatch_table(self)
+        self._visit_expr = expr.dispatch_table(self)
 
     @singledispatchmethod
     def _overloaded_resolve(self, arg) -> None:
@@ -39,11 +93,11 @@ class Resolver(expr.Visitor[None], stmt.Visitor[None]):
 
     @_overloaded_resolve.register
     def _(self, _stmt: stmt.Stmt) -> None:
-        _stmt.accept(self)
+        self._visit_stmt[_stmt.kind](_stmt)
 
     @_overloaded_resolve.register
     def _(self, _expr: expr.Expr) -> None:
-        _expr.accept(self)
+        self._visit_expr[_expr.kind](_expr)
 
     @overload
     def _resolve(self, statements: List[stmt.Stmt]) -> None:
@@ -64,7 +118,10 @@ class Resolver(expr.Visitor[None], stmt.Visitor[None]):
         enclosing_function = self._current_function
         self._current_function = type
 
-        self._begin_scope()
+        self._begin_scope(function)
+        # Methods find "this" in the first slot of their own environment
+        if type in (FunctionType.METHOD, FunctionType.INTIALIZER):
+            self._add_local("this")
         for param in function.params:
             self._declare(param)
             self._define(param)
@@ -72,36 +129,108 @@ class Resolver(expr.Visitor[None], stmt.Visitor[None]):
         self._end_scope()
         self._current_function = enclosing_function
 
-    def _begin_scope(self) -> None:
-        self._scopes.append({})
+    def _begin_scope(self, node: object = None) -> None:
+        enclosing = self._scopes[-1] if self._scopes else None
+        self._scopes.append(_Scope(enclosing, node))
 
     def _end_scope(self) -> None:
-        self._scopes.pop()
+        self._ended.append(self._scopes.pop())
+        if len(self._scopes) == 0:
+            self._allocate()
+
+    def _allocate(self) -> None:
+        """
+        Decides which scopes get an environment and gives every local a slot
+        in the environment that holds it, in declaration order. Nodes that
+        refer to a local, or declare it, are then told how many environments
+        up it is and its slot.
+        """
+        for scope in self._ended:
+            if scope.node is None or isinstance(scope.node, stmt.Function):
+                scope.has_environment = True
+            elif scope.locals:
+                scope.has_environment = scope.enclosing is None or any(
+                    [local.captured for local in scope.locals.values()]
+                )
 
-    def _declare(self, name: Token) -> None:
+        for local in self._locals:
+            holder = local.scope
+            while not holder.has_environment:
+                holder = holder.enclosing
+
+            local.slot = holder.size
+            holder.size += 1
+
+            for node, scope in local.references:
+                depth = 0
+                while scope is not holder:
+                    if scope.has_environment:
+                        depth += 1
+                    scope = scope.enclosing
+                node.depth = depth
+                node.slot = local.slot
+
+        for scope in self._ended:
+            if isinstance(scope.node, stmt.Block):
+                scope.node.scoped = scope.has_environment
+            if scope.node is not None:
+                scope.node.size = scope.size
+
+        self._locals = []
+        self._ended = []
+
+    def _add_local(self, name: str) -> _Local:
+        scope = self._scopes[-1]
+        scope.defined[name] = True
+        local = _Local(scope)
+        scope.locals[name] = local
+        self._locals.append(local)
+        return local
+
+    def _declare(self, name: Token, declaration: object = None) -> None:
         if len(self._scopes) == 0:
+            self.global_declarations[name.lexme] = (
+                self.global_declarations.get(name.lexme, 0) + 1
+            )
             return
 
-        if name.lexme in self._scopes[-1]:
+        self.local_names.add(name.lexme)
+
+        scope = self._scopes[-1]
+        if name.lexme in scope.defined:
             error_reporter.error(
                 name, "Already a variable with this name in this scope."
             )
+            return
 
-        self._scopes[-1][name.lexme] = False
+        local = self._add_local(name.lexme)
+        scope.defined[name.lexme] = False
+        # The statement declaring the local stores its value by slot too
+        if declaration is not None:
+            local.references.append((declaration, scope))
 
     def _define(self, name: Token) -> None:
         if len(self._scopes) == 0:
             return
-        self._scopes[-1][name.lexme] = True
-
-    def _resolve_local(self, _expr: expr.Expr, name: Token) -> None:
+        self._scopes[-1].defined[name.lexme] = True
+
+    def _resolve_local(self, _expr: expr.Expr, name: Token) -> bool:
+        """
+        Records that the node refers to the innermost local of that name, if
+        there is one, and returns whether there is.
+        """
+        scope = self._scopes[-1] if self._scopes else None
         for idx in range(len(self._scopes) - 1, -1, -1):
-            if name.lexme in self._scopes[idx]:
-                self._interpreter.resolve(_expr, len(self._scopes) - 1 - idx)
-                return
+            if name.lexme in self._scopes[idx].locals:
+                local = self._scopes[idx].locals[name.lexme]
+                local.references.append((_expr, scope))
+                if scope.function is not local.scope.function:
+                    local.captured = True
+                return True
+        return False
 
     def visit_block_stmt(self, _stmt: stmt.Block) -> None:
-        self._begin_scope()
+        self._begin_scope(_stmt)
         self._resolve(_stmt.statements)
         self._end_scope()
         return None
@@ -114,7 +243,7 @@ class Resolver(expr.Visitor[None], stmt.Visitor[None]):
         enclosing_class = self._current_class
         self._current_class = ClassType.CLASS
 
-        self._declare(_stmt.name)
+        self._declare(_stmt.name, _stmt)
         self._define(_stmt.name)
 
         if (
@@ -131,10 +260,7 @@ class Resolver(expr.Visitor[None], stmt.Visitor[None]):
 
         if _stmt.superclass is not None:
             self._begin_scope()
-            self._scopes[-1]["super"] = True
-
-        self._begin_scope()
-        self._scopes[-1]["this"] = True
+            self._add_local("super")
 
         for method in _stmt.methods:
             declaration = FunctionType.METHOD
@@ -143,8 +269,6 @@ class Resolver(expr.Visitor[None], stmt.Visitor[None]):
 
             self._resolve_function(method, declaration)
 
-        self._end_scope()
-
         if _stmt.superclass is not None:
             self._end_scope()
 
@@ -174,17 +298,21 @@ class Resolver(expr.Visitor[None], stmt.Visitor[None]):
 
             self._resolve(_stmt.value)
 
+            # A function has nothing left to do once the call returns
+            if self._current_function != FunctionType.NONE:
+                _stmt.tail_call = isinstance(_stmt.value, expr.Call)
+
         return None
 
     def visit_function_stmt(self, _stmt: stmt.Function) -> None:
-        self._declare(_stmt.name)
+        self._declare(_stmt.name, _stmt)
         self._define(_stmt.name)
 
         self._resolve_function(_stmt, FunctionType.FUNCTION)
         return None
 
     def visit_var_stmt(self, _stmt: stmt.Var) -> None:
-        self._declare(_stmt.name)
+        self._declare(_stmt.name, _stmt)
         if _stmt.initializer is not None:
             self._resolve(_stmt.initializer)
         self._define(_stmt.name)
@@ -195,9 +323,26 @@ class Resolver(expr.Visitor[None], stmt.Visitor[None]):
         self._resolve(_stmt.body)
         return None
 
+    def visit_for_stmt(self, _stmt: stmt.For) -> None:
+        self._resolve(_stmt.condition)
+        if _stmt.increment is not None:
+            self._resolve(_stmt.increment)
+        self._resolve(_stmt.body)
+        return None
+
+    def visit_forrange_stmt(self, _stmt: stmt.ForRange) -> None:
+        # The bounds are evaluated before the loop variable exists
+        self._resolve(_stmt.start)
+        self._resolve(_stmt.end)
+        self._declare(_stmt.name, _stmt)
+        self._define(_stmt.name)
+        self._resolve(_stmt.body)
+        return None
+
     def visit_assign_expr(self, _expr: expr.Assign) -> None:
         self._resolve(_expr.value)
-        self._resolve_local(_expr, _expr.name)
+        if not self._resolve_local(_expr, _expr.name):
+            self.assigned_globals.add(_expr.name.lexme)
         return None
 
     def visit_binary_expr(self, _expr: expr.Binary) -> None:
@@ -260,8 +405,8 @@ class Resolver(expr.Visitor[None], stmt.Visitor[None]):
     def visit_variable_expr(self, _expr: expr.Variable) -> None:
         if (
             len(self._scopes) > 0
-            and _expr.name.lexme in self._scopes[-1]
-            and not self._scopes[-1][_expr.name.lexme]
+            and _expr.name.lexme in self._scopes[-1].defined
+            and not self._scopes[-1].defined[_expr.name.lexme]
         ):
             error_reporter.error(
                 _expr.name, "Can't read local variable in its own initializer."
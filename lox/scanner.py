@@ -1,8 +1,31 @@
+import re
+import sys
 from token_type import TokenType
 from token import Token
+from token_buffer import TokenBuffer
 from error_reporter import error_reporter
 
-from typing import List, Optional
+from typing import Iterator, List, Optional, TextIO, Tuple, Union
+
+
+keywords = {
+    "and": TokenType.AND,
+    "class": TokenType.CLASS,
+    "else": TokenType.ELSE,
+    "false": TokenType.FALSE,
+    "for": TokenType.FOR,
+    "fun": TokenType.FUN,
+    "if": TokenType.IF,
+    "nil": TokenType.NIL,
+    "or": TokenType.OR,
+    "print": TokenType.PRINT,
+    "return": TokenType.RETURN,
+    "super": TokenType.SUPER,
+    "this": TokenType.THIS,
+    "true": TokenType.TRUE,
+    "var": TokenType.VAR,
+    "while": TokenType.WHILE,
+}
 
 
 class Scanner:
@@ -12,24 +35,7 @@ class Scanner:
         self._start = 0
         self._current = 0
         self._line = 1
-        self._keywords = {
-            "and": TokenType.AND,
-            "class": TokenType.CLASS,
-            "else": TokenType.ELSE,
-            "false": TokenType.FALSE,
-            "for": TokenType.FOR,
-            "fun": TokenType.FUN,
-            "if": TokenType.IF,
-            "nil": TokenType.NIL,
-            "or": TokenType.OR,
-            "print": TokenType.PRINT,
-            "return": TokenType.RETURN,
-            "super": TokenType.SUPER,
-            "this": TokenType.THIS,
-            "true": TokenType.TRUE,
-            "var": TokenType.VAR,
-            "while": TokenType.WHILE,
-        }
+        self._keywords = keywords
 
     def scan_tokens(self) -> List[Token]:
         while not self._is_at_end():
@@ -65,7 +71,7 @@ class Scanner:
         elif c == ",":
             self._add_token(TokenType.COMMA)
         elif c == ".":
-            self._add_token(TokenType.DOT)
+            self._add_token(TokenType.DOT_DOT if self._match(".") else TokenType.DOT)
         elif c == "-":
             self._add_token(TokenType.MINUS)
         elif c == "+":
@@ -182,3 +188,278 @@ class Scanner:
 
     def _is_digit(self, c: str) -> bool:
         return c >= "0" and c <= "9"
+
+
+# Matches the next lexeme of the source along with the spaces before it, with
+# the kind of lexeme given by the group that matched. Newlines and comments
+# are matched as a lexeme of their own, since they are rarer and the line has
+# to be counted. The spaces are matched possessively, so that they can't be
+# given back to the last alternative. Every character is matched by some
+# alternative, so the matches cover the whole source but for spaces at its
+# very end. Letters and digits are ASCII only, like Scanner's.
+_lexme = re.compile(
+    r"""
+    [ \t\r]*+
+    (?:
+        ((?:\n|//[^\n]*)(?:[ \t\r\n]|//[^\n]*)*)  # 1: newlines and comments
+        | ([A-Za-z_][A-Za-z_0-9]*)                # 2: identifier or keyword
+        | (!=|==|<=|>=|\.\.|[(){},.\-+;*!=<>/])    # 3: punctuation
+        | ([0-9]+(?:\.[0-9]+)?)                   # 4: number
+        | ("[^"]*")                               # 5: string
+        | ("[^"]*)                                # 6: string missing its "
+        | (.)                                     # 7: anything else
+    )
+    """,
+    re.VERBOSE,
+)
+
+punctuation = {
+    "(": TokenType.LEFT_PAREN,
+    ")": TokenType.RIGHT_PAREN,
+    "{": TokenType.LEFT_BRACE,
+    "}": TokenType.RIGHT_BRACE,
+    ",": TokenType.COMMA,
+    ".": TokenType.DOT,
+    "..": TokenType.DOT_DOT,
+    "-": TokenType.MINUS,
+    "+": TokenType.PLUS,
+    ";": TokenType.SEMICOLON,
+    "/": TokenType.SLASH,
+    "*": TokenType.STAR,
+    "!": TokenType.BANG,
+    "!=": TokenType.BANG_EQUAL,
+    "=": TokenType.EQUAL,
+    "==": TokenType.EQUAL_EQUAL,
+    ">": TokenType.GREATER,
+    ">=": TokenType.GREATER_EQUAL,
+    "<": TokenType.LESS,
+    "<=": TokenType.LESS_EQUAL,
+}
+
+
+class RegexScanner:
+    """
+    Scanner that splits the source with a single compiled regular expression,
+    so that the regular expression engine rather than Python code steps
+    through the characters of each lexeme. It produces the same tokens,
+    lines and errors as Scanner.
+    """
+
+    def __init__(self, src: str):
+        self._src = src
+
+    def scan_tokens(self) -> List[Token]:
+        tokens = []
+        _, line = self._scan(self._src, 1, tokens, True)
+        tokens.append(Token(TokenType.EOF, "", None, line))
+        return tokens
+
+    def _scan(
+        self, src: str, line: int, tokens: List[Token], final: bool
+    ) -> Tuple[int, int]:
+        """
+        Appends the tokens of "src" to "tokens", and returns how much of it
+        was scanned and the line that scanning stopped on. Unless "src" is
+        "final", the rest of the source follows it, so scanning stops before a
+        lexeme ending less than two characters from the end of "src", which
+        the characters that follow could still extend or change.
+        """
+        limit = len(src) if final else len(src) - 2
+        append = tokens.append
+        for match in _lexme.finditer(src):
+            if match.end() > limit:
+                return match.start(), line
+
+            # Tests the most common kinds first
+            kind = match.lastindex
+            if kind == 2:
+                text = match.group(2)
+                type = keywords.get(text, TokenType.IDENTIFIER)
+                append(Token(type, text, None, line))
+            elif kind == 3:
+                text = match.group(3)
+                append(Token(punctuation[text], text, None, line))
+            elif kind == 1:
+                line += match.group(1).count("\n")
+            elif kind == 4:
+                text = match.group(4)
+                append(Token(TokenType.NUMBER, text, float(text), line))
+            elif kind == 5:
+                # Strings can span lines, and the token is on the last one
+                text = match.group(5)
+                line += text.count("\n")
+                append(Token(TokenType.STRING, text, text[1:-1], line))
+            elif kind == 6:
+                line += match.group(6).count("\n")
+                error_reporter.error(line, "Unterminated string.")
+            else:
+                error_reporter.error(line, "Unexpected character.")
+
+        return len(src), line
+
+
+class StreamScanner(RegexScanner):
+    """
+    RegexScanner that reads the source from a file a chunk at a time, and
+    yields its tokens as they are scanned rather than returning a list of
+    them, so that only a chunk of the source is held at once. The part of a
+    chunk that might belong to a lexeme continuing in the next chunk is
+    scanned again along with it.
+    """
+
+    CHUNK_SIZE = 1 << 16
+
+    def __init__(self, reader: TextIO):
+        self._reader = reader
+
+    def scan_tokens(self) -> Iterator[Token]:
+        src = ""
+        line = 1
+        while True:
+            chunk = self._reader.read(self.CHUNK_SIZE)
+            src += chunk
+            final = chunk == ""
+
+            tokens = []
+            scanned, line = self._scan(src, line, tokens, final)
+            yield from tokens
+            if final:
+                break
+            src = src[scanned:]
+
+        yield Token(TokenType.EOF, "", None, line)
+
+
+# The same lexemes as "_lexme", in the bytes of UTF-8 source. Files are read
+# in text mode otherwise, where "\r\n" and a lone "\r" become "\n", so both
+# count as newlines here, and a character outside of the ASCII range is one
+# lexeme however many bytes it takes.
+_byte_lexme = re.compile(
+    rb"""
+    [ \t]*+
+    (?:
+        ((?:\r|\n|//[^\r\n]*)(?:[ \t\r\n]|//[^\r\n]*)*)  # 1: newlines and comments
+        | ([A-Za-z_][A-Za-z_0-9]*)                      # 2: identifier or keyword
+        | (!=|==|<=|>=|\.\.|[(){},.\-+;*!=<>/])          # 3: punctuation
+        | ([0-9]+(?:\.[0-9]+)?)                         # 4: number
+        | ("[^"]*")                                     # 5: string
+        | ("[^"]*)                                      # 6: string missing its "
+        | ([\xc0-\xff][\x80-\xbf]*|.)                   # 7: anything else
+    )
+    """,
+    re.VERBOSE,
+)
+
+
+# The type and lexeme of each keyword and punctuation lexeme, by its bytes
+byte_keywords = {word.encode(): (type, word) for word, type in keywords.items()}
+byte_punctuation = {
+    symbol.encode(): (type, symbol) for symbol, type in punctuation.items()
+}
+
+
+def _newlines(text: bytes) -> int:
+    return text.count(b"\n") + text.count(b"\r") - text.count(b"\r\n")
+
+
+class ByteScanner(RegexScanner):
+    """
+    RegexScanner that scans the bytes of UTF-8 source, such as a memory-mapped
+    file, rather than a decoded copy of it. Only the lexemes of tokens become
+    strings: the ones of keywords and punctuation are shared, each distinct
+    identifier is decoded once, as ASCII, and only strings are decoded as
+    UTF-8. It produces the same tokens, lines and errors as Scanner does with
+    the source read from a file in text mode.
+    """
+
+    def __init__(self, src: Union[bytes, str]):
+        if isinstance(src, str):
+            src = src.encode()
+        self._src = src
+
+    def _scan(
+        self, src: bytes, line: int, tokens: List[Token], final: bool
+    ) -> Tuple[int, int]:
+        # Identifiers join the keywords once they are seen
+        words = dict(byte_keywords)
+
+        limit = len(src) if final else len(src) - 2
+        append = tokens.append
+        for match in _byte_lexme.finditer(src):
+            if match.end() > limit:
+                return match.start(), line
+
+            kind = match.lastindex
+            if kind == 2:
+                raw = match.group(2)
+                word = words.get(raw)
+                if word is None:
+                    word = (TokenType.IDENTIFIER, raw.decode("ascii"))
+                    words[raw] = word
+                append(Token(word[0], word[1], None, line))
+            elif kind == 3:
+                type, text = byte_punctuation[match.group(3)]
+                append(Token(type, text, None, line))
+            elif kind == 1:
+                line += _newlines(match.group(1))
+            elif kind == 4:
+                raw = match.group(4)
+                append(Token(TokenType.NUMBER, raw.decode("ascii"), float(raw), line))
+            elif kind == 5:
+                raw = match.group(5)
+                line += _newlines(raw)
+                text = raw.decode().replace("\r\n", "\n").replace("\r", "\n")
+                append(Token(TokenType.STRING, text, text[1:-1], line))
+            elif kind == 6:
+                line += _newlines(match.group(6))
+                error_reporter.error(line, "Unterminated string.")
+            else:
+                error_reporter.error(line, "Unexpected character.")
+
+        return len(src), line
+
+
+class BufferScanner(RegexScanner):
+    """
+    RegexScanner that puts the tokens in a TokenBuffer instead of making a
+    Token for each, with identifiers interned, so that the names that the
+    Parser and the engines look up are the same strings.
+    """
+
+    def scan_tokens(self) -> TokenBuffer:
+        src = self._src
+        tokens = TokenBuffer(src)
+        append = tokens.append
+        # Interns each identifier once, and gives keywords their type
+        words = {word: (type, word) for word, type in keywords.items()}
+        symbols = {symbol: (type, symbol) for symbol, type in punctuation.items()}
+
+        line = 1
+        for match in _lexme.finditer(src):
+            kind = match.lastindex
+            if kind == 2:
+                text = match.group(2)
+                word = words.get(text)
+                if word is None:
+                    word = (TokenType.IDENTIFIER, sys.intern(text))
+                    words[text] = word
+                append(word[0], word[1], match.start(2))
+            elif kind == 3:
+                type, text = symbols[match.group(3)]
+                append(type, text, match.start(3))
+            elif kind == 1:
+                line += match.group(1).count("\n")
+            elif kind == 4:
+                append(TokenType.NUMBER, match.group(4), match.start(4))
+            elif kind == 5:
+                text = match.group(5)
+                line += text.count("\n")
+                append(TokenType.STRING, text, match.start(5))
+            elif kind == 6:
+                line += match.group(6).count("\n")
+                error_reporter.error(line, "Unterminated string.")
+            else:
+                error_reporter.error(line, "Unexpected character.")
+
+        append(TokenType.EOF, "", len(src))
+        return tokens
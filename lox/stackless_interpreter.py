@@ -0,0 +1,452 @@
+from typing import Dict, Generator, List
+import expr
+import stmt
+from token_type import TokenType
+from token import Token
+from runtime_error import RuntimeError
+from environment import Environment
+from interpreter import Interpreter
+from lox_callable import LoxCallable
+from lox_function import LoxFunction
+from lox_class import LoxClass
+from lox_instance import LoxInstance
+from _return import Return, TailCall
+
+
+# A step of the stackless evaluation. It yields the generator of every Lox
+# call it makes to the driver loop in StacklessInterpreter._run, which sends
+# back the call's result, and returns its own value when it is done.
+Step = Generator[Generator, object, object]
+
+
+class _CallFinder(expr.Visitor[bool], stmt.Visitor[bool]):
+    """
+    Works out whether executing a node can call into Lox code. Bodies of
+    functions and methods don't count, since declaring them runs nothing.
+    """
+
+    def __init__(self):
+        self._results: Dict[object, bool] = {}
+
+    def has_call(self, node: object) -> bool:
+        if node is None:
+            return False
+        if node not in self._results:
+            self._results[node] = node.accept(self)
+        return self._results[node]
+
+    def _any(self, nodes: List[object]) -> bool:
+        return any([self.has_call(node) for node in nodes])
+
+    def visit_assign_expr(self, _expr: expr.Assign) -> bool:
+        return self.has_call(_expr.value)
+
+    def visit_binary_expr(self, _expr: expr.Binary) -> bool:
+        return self._any([_expr.left, _expr.right])
+
+    def visit_call_expr(self, _expr: expr.Call) -> bool:
+        return True
+
+    def visit_get_expr(self, _expr: expr.Get) -> bool:
+        return self.has_call(_expr.object)
+
+    def visit_grouping_expr(self, _expr: expr.Grouping) -> bool:
+        return self.has_call(_expr.expression)
+
+    def visit_literal_expr(self, _expr: expr.Literal) -> bool:
+        return False
+
+    def visit_logical_expr(self, _expr: expr.Logical) -> bool:
+        return self._any([_expr.left, _expr.right])
+
+    def visit_set_expr(self, _expr: expr.Set) -> bool:
+        return self._any([_expr.object, _expr.value])
+
+    def visit_super_expr(self, _expr: expr.Super) -> bool:
+        return False
+
+    def visit_this_expr(self, _expr: expr.This) -> bool:
+        return False
+
+    def visit_unary_expr(self, _expr: expr.Unary) -> bool:
+        return self.has_call(_expr.right)
+
+    def visit_variable_expr(self, _expr: expr.Variable) -> bool:
+        return False
+
+    def visit_block_stmt(self, _stmt: stmt.Block) -> bool:
+        return self._any(_stmt.statements)
+
+    def visit_class_stmt(self, _stmt: stmt.Class) -> bool:
+        return False
+
+    def visit_expression_stmt(self, _stmt: stmt.Expression) -> bool:
+        return self.has_call(_stmt.expression)
+
+    def visit_function_stmt(self, _stmt: stmt.Function) -> bool:
+        return False
+
+    def visit_if_stmt(self, _stmt: stmt.If) -> bool:
+        return self._any([_stmt.condition, _stmt.then_branch, _stmt.else_branch])
+
+    def visit_print_stmt(self, _stmt: stmt.Print) -> bool:
+        return self.has_call(_stmt.expression)
+
+    def visit_return_stmt(self, _stmt: stmt.Return) -> bool:
+        return self.has_call(_stmt.value)
+
+    def visit_var_stmt(self, _stmt: stmt.Var) -> bool:
+        return self.has_call(_stmt.initializer)
+
+    def visit_while_stmt(self, _stmt: stmt.While) -> bool:
+        return self._any([_stmt.condition, _stmt.body])
+
+    def visit_for_stmt(self, _stmt: stmt.For) -> bool:
+        return self._any([_stmt.condition, _stmt.increment, _stmt.body])
+
+    def visit_forrange_stmt(self, _stmt: stmt.ForRange) -> bool:
+        return self._any([_stmt.start, _stmt.end, _stmt.body])
+
+
+class _Stackless(expr.Visitor[Step], stmt.Visitor[Step]):
+    """
+    Evaluates nodes as generators, so that a Lox call suspends its caller
+    instead of nesting Python frames.
+
+    Only nodes that can call into Lox code are evaluated this way, so there
+    are no visit methods for the others. They are handed to the Interpreter,
+    which can only recurse as deep as the node itself is nested. All state,
+    such as the current environment, stays on the Interpreter.
+    """
+
+    def __init__(self, interpreter: "StacklessInterpreter"):
+        self._interpreter = interpreter
+        self._calls = _CallFinder()
+
+    def evaluate(self, _expr: expr.Expr) -> Step:
+        if self._calls.has_call(_expr):
+            return (yield from _expr.accept(self))
+        return _expr.accept(self._interpreter)
+
+    def execute(self, _stmt: stmt.Stmt) -> Step:
+        if self._calls.has_call(_stmt):
+            return (yield from _stmt.accept(self))
+        return _stmt.accept(self._interpreter)
+
+    def execute_block(
+        self, statements: List[stmt.Stmt], environment: Environment
+    ) -> Step:
+        interpreter = self._interpreter
+        previous = interpreter._environment
+        interpreter._environment = environment
+
+        for statement in statements:
+            completion = yield from self.execute(statement)
+            if completion is not None:
+                interpreter._environment = previous
+                return completion
+
+        interpreter._environment = previous
+        return None
+
+    def invoke(
+        self, function: LoxFunction, values: List[object], paren: Token
+    ) -> Step:
+        interpreter = self._interpreter
+        if interpreter._depth >= interpreter.max_call_depth:
+            raise RuntimeError(paren, "Stack overflow.")
+
+        interpreter._depth += 1
+        while True:
+            completion = yield from self.execute_block(
+                function._declaration.body, function.frame(values)
+            )
+
+            if function._is_initializer:
+                value = values[0]
+            elif completion is None:
+                value = None
+            elif completion.__class__ is TailCall:
+                function = completion.function
+                values = completion.values
+                continue
+            else:
+                value = completion.value
+            break
+        interpreter._depth -= 1
+
+        return value
+
+    def visit_assign_expr(self, _expr: expr.Assign) -> Step:
+        value = yield from self.evaluate(_expr.value)
+
+        interpreter = self._interpreter
+        if _expr.depth is not None:
+            interpreter._environment.assign_at(_expr.depth, _expr.slot, value)
+        else:
+            interpreter.globals.assign(_expr.name, value)
+
+        return value
+
+    def visit_binary_expr(self, _expr: expr.Binary) -> Step:
+        left = yield from self.evaluate(_expr.left)
+        right = yield from self.evaluate(_expr.right)
+
+        # Runs the Interpreter's code on the operands that were evaluated here
+        return Interpreter.visit_binary_expr(
+            self._interpreter,
+            expr.Binary(expr.Literal(left), _expr.operator, expr.Literal(right)),
+        )
+
+    def visit_call_expr(self, _expr: expr.Call) -> Step:
+        callee, arguments = yield from self._evaluate_call(_expr)
+
+        if isinstance(callee, LoxFunction):
+            if callee._instance is not None:
+                arguments.insert(0, callee._instance)
+            return (yield self.invoke(callee, arguments, _expr.paren))
+
+        if isinstance(callee, LoxClass):
+            instance = LoxInstance(callee)
+            if callee._initializer is not None:
+                yield self.invoke(
+                    callee._initializer, [instance, *arguments], _expr.paren
+                )
+            return instance
+
+        return callee.call(self._interpreter, arguments)
+
+    def _tail_call(self, _expr: expr.Call) -> Step:
+        callee, arguments = yield from self._evaluate_call(_expr)
+
+        if isinstance(callee, LoxFunction):
+            if callee._instance is not None:
+                arguments.insert(0, callee._instance)
+            return TailCall(callee, arguments)
+
+        if isinstance(callee, LoxClass) and callee._initializer is not None:
+            return TailCall(callee._initializer, [LoxInstance(callee), *arguments])
+
+        return Return(callee.call(self._interpreter, arguments))
+
+    def _evaluate_call(self, _expr: expr.Call) -> Step:
+        """
+        Evaluates the callee and arguments of a call and checks that they can
+        be called together.
+        """
+        callee = yield from self.evaluate(_expr.callee)
+
+        arguments = []
+        for argument in _expr.arguments:
+            arguments.append((yield from self.evaluate(argument)))
+
+        if not isinstance(callee, LoxCallable):
+            raise RuntimeError(_expr.paren, "Can only call functions and classes.")
+
+        if len(arguments) != callee.arity():
+            raise RuntimeError(
+                _expr.paren,
+                f"Expected {callee.arity()} arguments but got {len(arguments)}.",
+            )
+
+        return callee, arguments
+
+    def visit_get_expr(self, _expr: expr.Get) -> Step:
+        _object = yield from self.evaluate(_expr.object)
+        return self._interpreter._get(_expr, _object)
+
+    def visit_grouping_expr(self, _expr: expr.Grouping) -> Step:
+        return (yield from self.evaluate(_expr.expression))
+
+    def visit_logical_expr(self, _expr: expr.Logical) -> Step:
+        left = yield from self.evaluate(_expr.left)
+
+        if _expr.operator.type == TokenType.OR:
+            if self._interpreter._is_truthy(left):
+                return left
+        else:
+            if not self._interpreter._is_truthy(left):
+                return left
+
+        return (yield from self.evaluate(_expr.right))
+
+    def visit_set_expr(self, _expr: expr.Set) -> Step:
+        _object = yield from self.evaluate(_expr.object)
+
+        if not isinstance(_object, LoxInstance):
+            raise RuntimeError(_expr.name, "Only instances have fields.")
+
+        value = yield from self.evaluate(_expr.value)
+        _object.set(_expr.name, value)
+        return value
+
+    def visit_unary_expr(self, _expr: expr.Unary) -> Step:
+        right = yield from self.evaluate(_expr.right)
+        return Interpreter.visit_unary_expr(
+            self._interpreter, expr.Unary(_expr.operator, expr.Literal(right))
+        )
+
+    def visit_block_stmt(self, _stmt: stmt.Block) -> Step:
+        if _stmt.scoped:
+            environment = Environment(
+                self._interpreter._environment, [None] * _stmt.size
+            )
+            return (yield from self.execute_block(_stmt.statements, environment))
+
+        for statement in _stmt.statements:
+            completion = yield from self.execute(statement)
+            if completion is not None:
+                return completion
+        return None
+
+    def visit_expression_stmt(self, _stmt: stmt.Expression) -> Step:
+        yield from self.evaluate(_stmt.expression)
+        return None
+
+    def visit_if_stmt(self, _stmt: stmt.If) -> Step:
+        condition = yield from self.evaluate(_stmt.condition)
+        if self._interpreter._is_truthy(condition):
+            return (yield from self.execute(_stmt.then_branch))
+        elif _stmt.else_branch is not None:
+            return (yield from self.execute(_stmt.else_branch))
+        return None
+
+    def visit_print_stmt(self, _stmt: stmt.Print) -> Step:
+        value = yield from self.evaluate(_stmt.expression)
+        print(self._interpreter._stringify(value))
+        return None
+
+    def visit_return_stmt(self, _stmt: stmt.Return) -> Step:
+        if _stmt.tail_call:
+            return (yield from self._tail_call(_stmt.value))
+
+        value = None
+        if _stmt.value is not None:
+            value = yield from self.evaluate(_stmt.value)
+
+        return Return(value)
+
+    def visit_var_stmt(self, _stmt: stmt.Var) -> Step:
+        value = None
+        if _stmt.initializer is not None:
+            value = yield from self.evaluate(_stmt.initializer)
+
+        self._interpreter._define(_stmt, value)
+        return None
+
+    def visit_while_stmt(self, _stmt: stmt.While) -> Step:
+        interpreter = self._interpreter
+        while interpreter._is_truthy((yield from self.evaluate(_stmt.condition))):
+            completion = yield from self.execute(_stmt.body)
+            if completion is not None:
+                return completion
+        return None
+
+    def visit_for_stmt(self, _stmt: stmt.For) -> Step:
+        interpreter = self._interpreter
+        while interpreter._is_truthy((yield from self.evaluate(_stmt.condition))):
+            completion = yield from self.execute(_stmt.body)
+            if completion is not None:
+                return completion
+            if _stmt.increment is not None:
+                yield from self.evaluate(_stmt.increment)
+        return None
+
+    def visit_forrange_stmt(self, _stmt: stmt.ForRange) -> Step:
+        interpreter = self._interpreter
+        start = yield from self.evaluate(_stmt.start)
+        end = yield from self.evaluate(_stmt.end)
+        interpreter._check_number_operands(_stmt.dots, start, end)
+
+        values = interpreter._environment.ancestor(_stmt.depth)._values
+        value = start
+        while value < end:
+            values[_stmt.slot] = value
+            completion = yield from self.execute(_stmt.body)
+            if completion is not None:
+                return completion
+            value += 1
+        return None
+
+
+class StacklessInterpreter(Interpreter):
+    """
+    Tree-walker that runs deep Lox recursion on a stack of its own instead
+    of Python's.
+
+    Calls are evaluated recursively, like the Interpreter does, until
+    RECURSION_THRESHOLD of them are nested. A call made deeper than that is
+    evaluated by generators instead, and run by a loop that keeps one
+    suspended generator per Lox call in a list. Recursion is then bounded by
+    max_call_depth, past which a "Stack overflow." runtime error is reported,
+    rather than by Python's recursion limit. Code that never recurses that
+    deep runs just as it does in the Interpreter.
+    """
+
+    RECURSION_THRESHOLD = 50
+
+    def __init__(self):
+        super().__init__()
+        self.max_call_depth = 100000
+        self._stackless_depth = self.RECURSION_THRESHOLD
+        self._depth = 0
+        self._stackless = _Stackless(self)
+
+    def interpret(self, statements: List[stmt.Stmt]) -> None:
+        # Deeper calls than this are evaluated stackless, which is also where
+        # stack overflows are reported. Resetting the depth matters to the
+        # prompt, since a runtime error leaves the depth of the calls it
+        # unwound through behind.
+        self._stackless_depth = min(self.RECURSION_THRESHOLD, self.max_call_depth)
+        self._depth = 0
+        super().interpret(statements)
+
+    def visit_call_expr(self, _expr: expr.Call) -> object:
+        # Does the same as Interpreter.visit_call_expr rather than calling it,
+        # since the extra Python call would slow down every Lox call
+        depth = self._depth
+        if depth >= self._stackless_depth:
+            return self._run(self._stackless.visit_call_expr(_expr))
+
+        self._depth = depth + 1
+        if isinstance(_expr.callee, expr.Get):
+            value = self._invoke(_expr, _expr.callee)
+        elif isinstance(_expr.callee, expr.Super):
+            value = self._invoke_super(_expr, _expr.callee)
+        else:
+            callee = self._evaluate(_expr.callee)
+
+            arguments = []
+            for argument in _expr.arguments:
+                arguments.append(self._evaluate(argument))
+
+            value = self._call(_expr, callee, arguments)
+        self._depth = depth
+        return value
+
+    def _run(self, step: Step) -> object:
+        """
+        Runs a step along with every call it makes, keeping the suspended
+        callers in "stack" until their callee returns.
+        """
+        environment = self._environment
+        depth = self._depth
+        stack = []
+        value = None
+        try:
+            while True:
+                try:
+                    callee = step.send(value)
+                except StopIteration as stop:
+                    if len(stack) == 0:
+                        return stop.value
+                    step, self._environment = stack.pop()
+                    value = stop.value
+                    continue
+
+                stack.append((step, self._environment))
+                step = callee
+                value = None
+        finally:
+            self._environment = environment
+            self._depth = depth
@@ -1,50 +1,240 @@
+"""
+Generated by "generate_ast.py", which is where the nodes are defined.
+Edit the definitions there and rerun it instead of editing this file.
+"""
+from typing import Callable, Generic, List, Optional, TypeVar
 from expr import Expr, Variable
 from token import Token
-from typing import Generic, TypeVar, List
 
 
 R = TypeVar("R")
 
 
 class Stmt:
+    __slots__ = ()
+
+    # Which subclass the node is, as an index into a dispatch table
+    kind: int
+
     def __init__(self):
         pass
 
+    def __reduce__(self) -> tuple:
+        # Pickles the node as a call to its class with the fields it is
+        # made with, followed by the fields filled in later that aren't
+        # None, which is smaller and faster to load than all of its slots
+        args = tuple([getattr(self, name) for name in self.__match_args__])
+        later = {}
+        for name in self.__slots__[len(args) :]:
+            value = getattr(self, name)
+            if value is not None:
+                later[name] = value
+        return (type(self), args, (None, later) if later else None)
+
 
 class Visitor(Generic[R]):
     def __init__(self):
         pass
 
 
-subclasses = {
-    "Block": {"statements": "List[Stmt]"},
-    "Expression": {"expression": "Expr"},
-    "Function": {"name": "Token", "params": "List[Token]", "body": "List[Stmt]"},
-    "Class": {"name": "Token", "superclass": "Variable", "methods": "List[Function]"},
-    "If": {"condition": "Expr", "then_branch": "Stmt", "else_branch": "Stmt"},
-    "Print": {"expression": "Expr"},
-    "Return": {"keyword": "Token", "value": "Expr"},
-    "Var": {"name": "Token", "initializer": "Expr"},
-    "While": {"condition": "Expr", "body": "Stmt"},
-}
-
-for name, attributes in subclasses.items():
-    # Initialize the class
-    args = ""
-    instance_init = ""
-    for arg, arg_type in attributes.items():
-        args += f", {arg}: {arg_type}"
-
-    subclass_str = ""
-    subclass_str += f"class {name}(Stmt):\n"
-    subclass_str += f"    def __init__(self{args}):\n"
-
-    for arg in attributes:
-        subclass_str += f"        self.{arg} = {arg}\n"
-
-    subclass_str += "\n"
-    subclass_str += "    def accept(self, visitor: Visitor[R]) -> R:\n"
-    subclass_str += f"        return visitor.visit_{name.lower()}_stmt(self)\n"
-
-    # Exposes the class when module is imported
-    exec(subclass_str, globals())
+BLOCK = 0
+EXPRESSION = 1
+FUNCTION = 2
+CLASS = 3
+IF = 4
+PRINT = 5
+RETURN = 6
+VAR = 7
+WHILE = 8
+FOR = 9
+FOR_RANGE = 10
+
+
+class Block(Stmt):
+    __slots__ = ("statements", "scoped", "size")
+    __match_args__ = ("statements",)
+    kind = BLOCK
+
+    def __init__(self, statements: List[Stmt]):
+        self.statements = statements
+        # Filled in by the Resolver
+        self.scoped = None
+        self.size = None
+
+    def accept(self, visitor: Visitor[R]) -> R:
+        return visitor.visit_block_stmt(self)
+
+
+class Expression(Stmt):
+    __slots__ = ("expression",)
+    __match_args__ = ("expression",)
+    kind = EXPRESSION
+
+    def __init__(self, expression: Expr):
+        self.expression = expression
+
+    def accept(self, visitor: Visitor[R]) -> R:
+        return visitor.visit_expression_stmt(self)
+
+
+class Function(Stmt):
+    __slots__ = ("name", "params", "body", "depth", "slot", "size")
+    __match_args__ = ("name", "params", "body")
+    kind = FUNCTION
+
+    def __init__(self, name: Token, params: List[Token], body: List[Stmt]):
+        self.name = name
+        self.params = params
+        self.body = body
+        # Filled in by the Resolver
+        self.depth = None
+        self.slot = None
+        self.size = None
+
+    def accept(self, visitor: Visitor[R]) -> R:
+        return visitor.visit_function_stmt(self)
+
+
+class Class(Stmt):
+    __slots__ = ("name", "superclass", "methods", "depth", "slot")
+    __match_args__ = ("name", "superclass", "methods")
+    kind = CLASS
+
+    def __init__(self, name: Token, superclass: Variable, methods: List[Function]):
+        self.name = name
+        self.superclass = superclass
+        self.methods = methods
+        # Filled in by the Resolver
+        self.depth = None
+        self.slot = None
+
+    def accept(self, visitor: Visitor[R]) -> R:
+        return visitor.visit_class_stmt(self)
+
+
+class If(Stmt):
+    __slots__ = ("condition", "then_branch", "else_branch")
+    __match_args__ = ("condition", "then_branch", "else_branch")
+    kind = IF
+
+    def __init__(self, condition: Expr, then_branch: Stmt, else_branch: Stmt):
+        self.condition = condition
+        self.then_branch = then_branch
+        self.else_branch = else_branch
+
+    def accept(self, visitor: Visitor[R]) -> R:
+        return visitor.visit_if_stmt(self)
+
+
+class Print(Stmt):
+    __slots__ = ("expression",)
+    __match_args__ = ("expression",)
+    kind = PRINT
+
+    def __init__(self, expression: Expr):
+        self.expression = expression
+
+    def accept(self, visitor: Visitor[R]) -> R:
+        return visitor.visit_print_stmt(self)
+
+
+class Return(Stmt):
+    __slots__ = ("keyword", "value", "tail_call")
+    __match_args__ = ("keyword", "value")
+    kind = RETURN
+
+    def __init__(self, keyword: Token, value: Expr):
+        self.keyword = keyword
+        self.value = value
+        # Filled in by the Resolver
+        self.tail_call = None
+
+    def accept(self, visitor: Visitor[R]) -> R:
+        return visitor.visit_return_stmt(self)
+
+
+class Var(Stmt):
+    __slots__ = ("name", "initializer", "depth", "slot")
+    __match_args__ = ("name", "initializer")
+    kind = VAR
+
+    def __init__(self, name: Token, initializer: Expr):
+        self.name = name
+        self.initializer = initializer
+        # Filled in by the Resolver
+        self.depth = None
+        self.slot = None
+
+    def accept(self, visitor: Visitor[R]) -> R:
+        return visitor.visit_var_stmt(self)
+
+
+class While(Stmt):
+    __slots__ = ("condition", "body")
+    __match_args__ = ("condition", "body")
+    kind = WHILE
+
+    def __init__(self, condition: Expr, body: Stmt):
+        self.condition = condition
+        self.body = body
+
+    def accept(self, visitor: Visitor[R]) -> R:
+        return visitor.visit_while_stmt(self)
+
+
+class For(Stmt):
+    __slots__ = ("condition", "increment", "body")
+    __match_args__ = ("condition", "increment", "body")
+    kind = FOR
+
+    def __init__(self, condition: Expr, increment: Expr, body: Stmt):
+        self.condition = condition
+        self.increment = increment
+        self.body = body
+
+    def accept(self, visitor: Visitor[R]) -> R:
+        return visitor.visit_for_stmt(self)
+
+
+class ForRange(Stmt):
+    __slots__ = ("name", "start", "dots", "end", "body", "depth", "slot")
+    __match_args__ = ("name", "start", "dots", "end", "body")
+    kind = FOR_RANGE
+
+    def __init__(self, name: Token, start: Expr, dots: Token, end: Expr, body: Stmt):
+        self.name = name
+        self.start = start
+        self.dots = dots
+        self.end = end
+        self.body = body
+        # Filled in by the Resolver
+        self.depth = None
+        self.slot = None
+
+    def accept(self, visitor: Visitor[R]) -> R:
+        return visitor.visit_forrange_stmt(self)
+
+
+# The name of the visit method for each kind of node
+visit_methods = (
+    "visit_block_stmt",
+    "visit_expression_stmt",
+    "visit_function_stmt",
+    "visit_class_stmt",
+    "visit_if_stmt",
+    "visit_print_stmt",
+    "visit_return_stmt",
+    "visit_var_stmt",
+    "visit_while_stmt",
+    "visit_for_stmt",
+    "visit_forrange_stmt",
+)
+
+
+def dispatch_table(visitor: Visitor[R]) -> List[Optional[Callable[[Stmt], R]]]:
+    """
+    Returns the visitor's bound visit methods indexed by node kind, so
+    that "table[node.kind](node)" visits a node without calling its
+    "accept". Methods that the visitor lacks are None.
+    """
+    return [getattr(visitor, name, None) for name in visit_methods]
@@ -0,0 +1,8 @@
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def cache_home(tmp_path, monkeypatch):
+    # Runs of lox.py cache what they compile, which must not end up in the
+    # cache of whoever runs the tests
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
@@ -25,3 +25,16 @@ def test_scope():
         capture_output=True,
     )
     assert res.stdout == b"inner\nouter\n"
+
+
+def test_no_declarations():
+    res = subprocess.run(
+        [
+            "python",
+            "lox/lox.py",
+            "-s",
+            "lox/tests/block_scripts/no_declarations.lox",
+        ],
+        capture_output=True,
+    )
+    assert res.stdout == b"local!\n4\n"
@@ -155,4 +155,29 @@ def test_unused_later_closure():
         ],
         capture_output=True,
     )
-    assert res.stdout == b"a\n"
\ No newline at end of file
+    assert res.stdout == b"a\n"
+
+def test_capture_in_loop():
+    res = subprocess.run(
+        [
+            "python",
+            "lox/lox.py",
+            "-s",
+            "lox/tests/closure_scripts/capture_in_loop.lox",
+        ],
+        capture_output=True,
+    )
+    assert res.stdout == b"2\n11\n"
+
+
+def test_hoisted_locals():
+    res = subprocess.run(
+        [
+            "python",
+            "lox/lox.py",
+            "-s",
+            "lox/tests/closure_scripts/hoisted_locals.lox",
+        ],
+        capture_output=True,
+    )
+    assert res.stdout == b"10\ninner\nouter\nnil\nnil\n"
@@ -0,0 +1,43 @@
+import glob
+import subprocess
+
+import pytest
+
+
+# Scripts that recurse deeper than some of the engines can are left out
+DEEP_SCRIPTS = ["stackless_scripts/", "tail_call_scripts/deep_"]
+
+SCRIPTS = sorted(
+    script
+    for script in glob.glob("lox/tests/*_scripts/*.lox")
+    if not any(deep in script for deep in DEEP_SCRIPTS)
+)
+
+ENGINES = ["closure", "quicken", "stackless", "vm", "python"]
+
+
+def run(script, *flags):
+    return subprocess.run(
+        ["python", "lox/lox.py", *flags, "-s", script],
+        capture_output=True,
+    )
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+@pytest.mark.parametrize("script", SCRIPTS)
+def test_engine(engine, script):
+    expected = run(script)
+    res = run(script, f"--engine={engine}")
+    assert res.stdout == expected.stdout
+    assert res.stderr == expected.stderr
+    assert res.returncode == expected.returncode
+
+
+@pytest.mark.parametrize("flags", [[], ["--stream"]])
+def test_python_fallback(flags):
+    # CPython can't compile it once transpiled, so the tree-walker runs it and
+    # has to call functions, constructors and methods that may have been
+    # transpiled, and the other way around
+    res = run("lox/tests/engine_scripts/deep_nesting.lox", "--engine=python", *flags)
+    assert res.stdout == b"0\n-2\n5\n12\n10\n-12\n"
+    assert res.returncode == 0
@@ -0,0 +1,40 @@
+import subprocess
+
+
+def test_call_function_field():
+    res = subprocess.run(
+        [
+            "python",
+            "lox/lox.py",
+            "-s",
+            "lox/tests/field_scripts/call_function_field.lox",
+        ],
+        capture_output=True,
+    )
+    assert res.stdout == b"bar\n1\n2\n"
+
+
+def test_call_nonfunction_field():
+    res = subprocess.run(
+        [
+            "python",
+            "lox/lox.py",
+            "-s",
+            "lox/tests/field_scripts/call_nonfunction_field.lox",
+        ],
+        capture_output=True,
+    )
+    assert b"Can only call functions and classes." in res.stderr
+
+
+def test_method_binds_this():
+    res = subprocess.run(
+        [
+            "python",
+            "lox/lox.py",
+            "-s",
+            "lox/tests/field_scripts/method_binds_this.lox",
+        ],
+        capture_output=True,
+    )
+    assert res.stdout == b"foo1\n1\n"
@@ -0,0 +1,61 @@
+import subprocess
+
+import pytest
+
+
+ENGINES = ["tree", "closure", "quicken", "stackless", "vm", "python"]
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_range(engine):
+    res = subprocess.run(
+        [
+            "python",
+            "lox/lox.py",
+            f"--engine={engine}",
+            "-s",
+            "lox/tests/for_scripts/range.lox",
+        ],
+        capture_output=True,
+    )
+    assert res.stdout == b"0\n1\n2\n2\n3\n2\n6\n0.5\n1.5\n5\n2\n0\n"
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_c_style(engine):
+    res = subprocess.run(
+        [
+            "python",
+            "lox/lox.py",
+            f"--engine={engine}",
+            "-s",
+            "lox/tests/for_scripts/c_style.lox",
+        ],
+        capture_output=True,
+    )
+    assert res.stdout == b"aaa\n4\n8\n1\n2\n"
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_range_error(engine):
+    res = subprocess.run(
+        [
+            "python",
+            "lox/lox.py",
+            f"--engine={engine}",
+            "-s",
+            "lox/tests/for_scripts/range_error.lox",
+        ],
+        capture_output=True,
+    )
+    assert res.stdout == b"0\n1\n"
+    assert b"Operands must be numbers.')\n[line 3]" in res.stderr
+
+
+def test_missing_dots():
+    res = subprocess.run(
+        ["python", "lox/lox.py", "-s", "lox/tests/for_scripts/missing_dots.lox"],
+        capture_output=True,
+    )
+    assert res.stdout == b""
+    assert b"Error at '3': Expect '..' after range start." in res.stderr
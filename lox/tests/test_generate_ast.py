@@ -0,0 +1,9 @@
+import subprocess
+
+
+def test_modules_up_to_date():
+    res = subprocess.run(
+        ["python", "lox/generate_ast.py", "--check"],
+        capture_output=True,
+    )
+    assert res.returncode == 0, res.stderr
@@ -0,0 +1,37 @@
+import subprocess
+
+import pytest
+
+
+ENGINES = ["tree", "quicken", "stackless"]
+
+
+def run(script, *flags):
+    return subprocess.run(
+        ["python", "lox/lox.py", *flags, "--ic-stats", "-s", script],
+        capture_output=True,
+    )
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_monomorphic(engine):
+    res = run("lox/tests/inline_cache_scripts/monomorphic.lox", f"--engine={engine}")
+    assert res.stdout == b"45\n"
+    assert b"   9  get x                    9         1     90.0%        1" in res.stderr
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_shadowed_method(engine):
+    res = run(
+        "lox/tests/inline_cache_scripts/shadowed_method.lox", f"--engine={engine}"
+    )
+    assert res.stdout == b"method\nmethod\nfield\nmethod\n"
+    assert b"   9  get name                 1         3     25.0%        2" in res.stderr
+
+
+@pytest.mark.parametrize("engine", ["closure", "vm", "python"])
+def test_unsupported_engine(engine):
+    res = run("lox/tests/inline_cache_scripts/monomorphic.lox", f"--engine={engine}")
+    assert res.stdout == b""
+    assert b"--ic-stats is not supported by the" in res.stderr
+    assert res.returncode == 2
@@ -0,0 +1,61 @@
+import glob
+import re
+import subprocess
+
+import pytest
+
+
+def test_inline():
+    res = subprocess.run(
+        ["python", "lox/lox.py", "-O2", "-s", "lox/tests/inliner_scripts/inline.lox"],
+        capture_output=True,
+    )
+    assert res.stdout == b"55\n9\n7\n"
+    assert res.stderr == b"Inlined 4 call sites.\n"
+
+
+def test_not_inlined():
+    res = subprocess.run(
+        [
+            "python",
+            "lox/lox.py",
+            "-O2",
+            "-s",
+            "lox/tests/inliner_scripts/not_inlined.lox",
+        ],
+        capture_output=True,
+    )
+    assert res.stdout == b"done\ndone\n11\n2\n"
+    assert res.stderr == b"Inlined 0 call sites.\n"
+
+
+def test_runtime_error():
+    res = subprocess.run(
+        [
+            "python",
+            "lox/lox.py",
+            "-O2",
+            "-s",
+            "lox/tests/inliner_scripts/runtime_error.lox",
+        ],
+        capture_output=True,
+    )
+    assert res.stderr == (
+        b"Inlined 1 call sites.\n"
+        b"RuntimeError('Operands must be numbers.')\n[line 2]\n"
+    )
+    assert res.returncode == 70
+
+
+@pytest.mark.parametrize("script", sorted(glob.glob("lox/tests/*_scripts/*.lox")))
+def test_same_output(script):
+    expected = subprocess.run(
+        ["python", "lox/lox.py", "-s", script], capture_output=True
+    )
+    res = subprocess.run(
+        ["python", "lox/lox.py", "-O2", "-s", script], capture_output=True
+    )
+    assert res.stdout == expected.stdout
+    # Scripts that don't compile stop before the Inliner runs
+    assert re.sub(rb"^Inlined \d+ call sites\.\n", b"", res.stderr) == expected.stderr
+    assert res.returncode == expected.returncode
@@ -0,0 +1,30 @@
+import subprocess
+
+
+def test_arity():
+    res = subprocess.run(
+        ["python", "lox/lox.py", "-s", "lox/tests/method_scripts/arity.lox"],
+        capture_output=True,
+    )
+    assert res.stdout == b"no args\n1\n3\n6\n"
+
+
+def test_extra_arguments():
+    res = subprocess.run(
+        [
+            "python",
+            "lox/lox.py",
+            "-s",
+            "lox/tests/method_scripts/extra_arguments.lox",
+        ],
+        capture_output=True,
+    )
+    assert b"Expected 2 arguments but got 4." in res.stderr
+
+
+def test_not_found():
+    res = subprocess.run(
+        ["python", "lox/lox.py", "-s", "lox/tests/method_scripts/not_found.lox"],
+        capture_output=True,
+    )
+    assert b"Undefined property 'unknown'." in res.stderr
@@ -0,0 +1,55 @@
+import glob
+import subprocess
+
+import pytest
+
+
+def test_folding():
+    res = subprocess.run(
+        ["python", "lox/lox.py", "-O", "-s", "lox/tests/optimizer_scripts/folding.lox"],
+        capture_output=True,
+    )
+    assert res.stdout == b"7\n3\nconcat\nTrue\n-3\nFalse\ndefault\nFalse\n"
+
+
+def test_dead_code():
+    res = subprocess.run(
+        [
+            "python",
+            "lox/lox.py",
+            "-O",
+            "-s",
+            "lox/tests/optimizer_scripts/dead_code.lox",
+        ],
+        capture_output=True,
+    )
+    assert res.stdout == b"else\n3\nafter\n"
+
+
+def test_runtime_error():
+    res = subprocess.run(
+        [
+            "python",
+            "lox/lox.py",
+            "-O",
+            "-s",
+            "lox/tests/optimizer_scripts/runtime_error.lox",
+        ],
+        capture_output=True,
+    )
+    assert res.stdout == b"ok\n"
+    assert res.stderr == b"RuntimeError('Operands must be numbers.')\n[line 3]\n"
+    assert res.returncode == 70
+
+
+@pytest.mark.parametrize("script", sorted(glob.glob("lox/tests/*_scripts/*.lox")))
+def test_same_output(script):
+    expected = subprocess.run(
+        ["python", "lox/lox.py", "-s", script], capture_output=True
+    )
+    res = subprocess.run(
+        ["python", "lox/lox.py", "-O", "-s", script], capture_output=True
+    )
+    assert res.stdout == expected.stdout
+    assert res.stderr == expected.stderr
+    assert res.returncode == expected.returncode
@@ -0,0 +1,30 @@
+import subprocess
+
+
+def test_precedence():
+    res = subprocess.run(
+        ["python", "lox/lox.py", "-s", "lox/tests/precedence_scripts/precedence.lox"],
+        capture_output=True,
+    )
+    assert res.stdout == (
+        b"14\n8\n4\n0\nTrue\nTrue\nTrue\nTrue\n0\n0\n0\n0\n2\n1\n4\n6\nTrue\n-1\n"
+        b"False\nyes\n"
+    )
+
+
+def test_missing_operand():
+    res = subprocess.run(
+        [
+            "python",
+            "lox/lox.py",
+            "-s",
+            "lox/tests/precedence_scripts/missing_operand.lox",
+        ],
+        capture_output=True,
+    )
+    assert res.stderr == (
+        b"[line 1] Error at ';': Expect expression.\n"
+        b"[line 2] Error at ')': Expect expression.\n"
+        b"[line 3] Error at '=': Invalid assignment target.\n"
+    )
+    assert res.returncode == 65
@@ -0,0 +1,93 @@
+import shutil
+import subprocess
+
+
+FIRST = "lox/tests/program_cache_scripts/first.lox"
+SECOND = "lox/tests/program_cache_scripts/second.lox"
+
+
+def run(script, cache, *flags):
+    return subprocess.run(
+        ["python", "lox/lox.py", f"--cache-dir={cache}", *flags, "-s", script],
+        capture_output=True,
+    )
+
+
+def entries(cache):
+    return sorted(cache.glob("*.loxc"))
+
+
+def test_hit(tmp_path):
+    res = run(FIRST, tmp_path)
+    assert res.stdout == b"Hello, first\n"
+    (first,) = entries(tmp_path)
+    run(SECOND, tmp_path)
+    (second,) = set(entries(tmp_path)) - {first}
+
+    # Runs what is cached under the key of the script, whatever it is
+    shutil.copy(second, tmp_path / "copy")
+    shutil.copy(first, second)
+    res = run(SECOND, tmp_path)
+    assert res.stdout == b"Hello, first\n"
+
+    shutil.copy(tmp_path / "copy", second)
+    res = run(SECOND, tmp_path)
+    assert res.stdout == b"6\n"
+
+
+def test_no_cache(tmp_path):
+    res = run(FIRST, tmp_path, "--no-cache")
+    assert res.stdout == b"Hello, first\n"
+    assert entries(tmp_path) == []
+
+
+def test_changed_source(tmp_path):
+    script = tmp_path / "script.lox"
+    script.write_text('print "before";')
+    assert run(str(script), tmp_path).stdout == b"before\n"
+
+    script.write_text('print "after";')
+    assert run(str(script), tmp_path).stdout == b"after\n"
+    assert len(entries(tmp_path)) == 2
+
+
+def test_optimization_level(tmp_path):
+    run(FIRST, tmp_path)
+    res = run(FIRST, tmp_path, "-O2")
+    assert res.stdout == b"Hello, first\n"
+    assert res.stderr == b"Inlined 1 call sites.\n"
+    assert len(entries(tmp_path)) == 2
+
+    res = run(FIRST, tmp_path, "-O2")
+    assert res.stderr == b"Inlined 1 call sites.\n"
+
+
+def test_errors_not_cached(tmp_path):
+    res = run("lox/tests/program_cache_scripts/syntax_error.lox", tmp_path)
+    assert res.stdout == b""
+    assert res.returncode == 65
+    assert entries(tmp_path) == []
+
+
+def test_corrupt_entry(tmp_path):
+    run(FIRST, tmp_path)
+    (entry,) = entries(tmp_path)
+    entry.write_bytes(b"not a program")
+
+    res = run(FIRST, tmp_path)
+    assert res.stdout == b"Hello, first\n"
+    assert res.returncode == 0
+    assert run(FIRST, tmp_path).stdout == b"Hello, first\n"
+    assert entry.read_bytes() != b"not a program"
+
+
+def test_eviction(tmp_path):
+    run(FIRST, tmp_path)
+    (first,) = entries(tmp_path)
+
+    # Only fits one of the scripts, so the least recently used one goes
+    size = first.stat().st_size * 1.5 / 2**20
+    run(SECOND, tmp_path, f"--cache-size={size}")
+    (second,) = entries(tmp_path)
+    assert second != first
+    assert not any(tmp_path.glob(".tmp-*"))
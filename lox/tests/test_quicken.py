@@ -0,0 +1,31 @@
+import subprocess
+
+
+def test_deoptimize():
+    res = subprocess.run(
+        [
+            "python",
+            "lox/lox.py",
+            "--engine=quicken",
+            "-s",
+            "lox/tests/quicken_scripts/deoptimize.lox",
+        ],
+        capture_output=True,
+    )
+    assert res.stdout == b"3\nab\n7\n-1\n2\n1\ntwo\n3\n"
+    assert b"Operands must be two numbers or two strings." in res.stderr
+    assert b"[line 2]" in res.stderr
+
+
+def test_logical():
+    res = subprocess.run(
+        [
+            "python",
+            "lox/lox.py",
+            "--engine=quicken",
+            "-s",
+            "lox/tests/quicken_scripts/logical.lox",
+        ],
+        capture_output=True,
+    )
+    assert res.stdout == b"1\nnil\nb\na\nFalse\n"
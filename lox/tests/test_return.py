@@ -0,0 +1,59 @@
+import subprocess
+
+
+def test_after_else():
+    res = subprocess.run(
+        ["python", "lox/lox.py", "-s", "lox/tests/return_scripts/after_else.lox"],
+        capture_output=True,
+    )
+    assert res.stdout == b"ok\n"
+
+
+def test_after_if():
+    res = subprocess.run(
+        ["python", "lox/lox.py", "-s", "lox/tests/return_scripts/after_if.lox"],
+        capture_output=True,
+    )
+    assert res.stdout == b"ok\n"
+
+
+def test_after_while():
+    res = subprocess.run(
+        ["python", "lox/lox.py", "-s", "lox/tests/return_scripts/after_while.lox"],
+        capture_output=True,
+    )
+    assert res.stdout == b"ok\n"
+
+
+def test_in_nested_loop():
+    res = subprocess.run(
+        [
+            "python",
+            "lox/lox.py",
+            "-s",
+            "lox/tests/return_scripts/in_nested_loop.lox",
+        ],
+        capture_output=True,
+    )
+    assert res.stdout == b"8\nnil\n"
+
+
+def test_in_method():
+    res = subprocess.run(
+        ["python", "lox/lox.py", "-s", "lox/tests/return_scripts/in_method.lox"],
+        capture_output=True,
+    )
+    assert res.stdout == b"ok\n"
+
+
+def test_return_nil_if_no_value():
+    res = subprocess.run(
+        [
+            "python",
+            "lox/lox.py",
+            "-s",
+            "lox/tests/return_scripts/return_nil_if_no_value.lox",
+        ],
+        capture_output=True,
+    )
+    assert res.stdout == b"nil\n"
@@ -0,0 +1,85 @@
+import glob
+import subprocess
+
+import pytest
+
+
+# Scripts that recurse deeper than the default engine can are left out
+DEEP_SCRIPTS = ["stackless_scripts/", "tail_call_scripts/deep_"]
+
+SCRIPTS = sorted(
+    script
+    for script in glob.glob("lox/tests/*_scripts/*.lox")
+    if not any(deep in script for deep in DEEP_SCRIPTS)
+)
+
+
+def run(script, *flags):
+    return subprocess.run(
+        ["python", "lox/lox.py", *flags, "-s", script],
+        capture_output=True,
+    )
+
+
+@pytest.mark.parametrize("script", SCRIPTS)
+def test_regex_scanner(script):
+    expected = run(script, "--scanner=char")
+    res = run(script, "--scanner=regex")
+    assert res.stdout == expected.stdout
+    assert res.stderr == expected.stderr
+    assert res.returncode == expected.returncode
+
+
+@pytest.mark.parametrize("scanner", ["bytes", "buffer"])
+@pytest.mark.parametrize("script", SCRIPTS)
+def test_other_scanners(script, scanner):
+    expected = run(script, "--scanner=char")
+    res = run(script, f"--scanner={scanner}")
+    assert res.stdout == expected.stdout
+    assert res.stderr == expected.stderr
+    assert res.returncode == expected.returncode
+
+
+def test_byte_scanner_newlines(tmp_path):
+    # Text mode turns "\r\n" and "\r" into "\n", which the ByteScanner
+    # has to match, and it reports one error for each character that isn't
+    # ASCII outside of a string
+    script = tmp_path / "newlines.lox"
+    script.write_bytes(
+        b'print "caf\xc3\xa9\r\nna\xc3\xafve";\r\n'
+        b"// comment\rprint 1;\r\n"
+        b"\xe2\x82\xac \xc3\xa9;\n"
+        b'print "\r";'
+    )
+
+    expected = run(str(script), "--scanner=char")
+    res = run(str(script), "--scanner=bytes")
+    assert res.stderr == expected.stderr == (
+        b"[line 5] Error: Unexpected character.\n"
+        b"[line 5] Error: Unexpected character.\n"
+        b"[line 5] Error at ';': Expect expression.\n"
+    )
+    assert res.returncode == expected.returncode == 65
+
+    script.write_bytes(script.read_bytes().replace(b"\xe2\x82\xac \xc3\xa9;", b""))
+    expected = run(str(script), "--scanner=char")
+    res = run(str(script), "--scanner=bytes")
+    assert res.stdout == expected.stdout == "café\nnaïve\n1\n\n\n".encode()
+
+
+def test_errors():
+    res = run("lox/tests/scanner_scripts/errors.lox")
+    assert res.stderr == (
+        b"[line 2] Error: Unexpected character.\n"
+        b"[line 4] Error: Unexpected character.\n"
+        b"[line 9] Error: Unterminated string.\n"
+        b"[line 2] Error at '2': Expected ';' after variable declaration.\n"
+        b"[line 5] Error at '..': Expect ';' after value.\n"
+    )
+    assert res.returncode == 65
+
+
+def test_lines():
+    res = run("lox/tests/scanner_scripts/lines.lox")
+    assert res.stdout == b"a\n\nb\n"
+    assert b"[line 8]" in res.stderr
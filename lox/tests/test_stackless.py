@@ -0,0 +1,83 @@
+import subprocess
+
+import pytest
+
+
+def test_deep_recursion():
+    res = subprocess.run(
+        [
+            "python",
+            "lox/lox.py",
+            "--engine=stackless",
+            "-s",
+            "lox/tests/stackless_scripts/deep_recursion.lox",
+        ],
+        capture_output=True,
+    )
+    assert res.stdout == b"5000\n2001000\nFalse\n"
+
+
+def test_stack_overflow():
+    res = subprocess.run(
+        [
+            "python",
+            "lox/lox.py",
+            "--engine=stackless",
+            "--max-call-depth=1000",
+            "-s",
+            "lox/tests/stackless_scripts/stack_overflow.lox",
+        ],
+        capture_output=True,
+    )
+    assert b"Stack overflow.\')\n[line 5]" in res.stderr
+    assert res.returncode == 70
+
+
+def test_shallow_max_call_depth():
+    res = subprocess.run(
+        [
+            "python",
+            "lox/lox.py",
+            "--engine=stackless",
+            "--max-call-depth=10",
+            "-s",
+            "lox/tests/stackless_scripts/deep_recursion.lox",
+        ],
+        capture_output=True,
+    )
+    assert b"Stack overflow." in res.stderr
+
+
+def test_max_call_depth_unsupported():
+    res = subprocess.run(
+        [
+            "python",
+            "lox/lox.py",
+            "--engine=tree",
+            "--max-call-depth=10",
+            "-s",
+            "lox/tests/stackless_scripts/deep_recursion.lox",
+        ],
+        capture_output=True,
+    )
+    assert res.stdout == b""
+    assert b"--max-call-depth is not supported by the tree engine" in res.stderr
+    assert res.returncode == 2
+
+
+@pytest.mark.parametrize("depth", ["0", "-5"])
+def test_max_call_depth_not_positive(depth):
+    res = subprocess.run(
+        [
+            "python",
+            "lox/lox.py",
+            "--engine=stackless",
+            f"--max-call-depth={depth}",
+            "-s",
+            "lox/tests/stackless_scripts/deep_recursion.lox",
+        ],
+        capture_output=True,
+    )
+    assert res.stdout == b""
+    assert b"--max-call-depth must be a positive integer" in res.stderr
+    assert res.returncode == 2
@@ -0,0 +1,92 @@
+import glob
+import subprocess
+
+import pytest
+
+
+ENGINES = ["tree", "closure", "quicken", "stackless", "vm", "python"]
+
+# Scripts that recurse deeper than the default engine can are left out, and
+# so are those with a syntax error after statements that stream mode runs
+SKIPPED_SCRIPTS = [
+    "stackless_scripts/",
+    "tail_call_scripts/deep_",
+    "stream_scripts/",
+    "for_scripts/missing_dots",
+]
+
+SCRIPTS = sorted(
+    script
+    for script in glob.glob("lox/tests/*_scripts/*.lox")
+    if not any(skipped in script for skipped in SKIPPED_SCRIPTS)
+)
+
+
+def run(script, *flags):
+    return subprocess.run(
+        ["python", "lox/lox.py", *flags, "-s", script],
+        capture_output=True,
+    )
+
+
+@pytest.mark.parametrize("script", SCRIPTS)
+def test_same_as_whole(script):
+    expected = run(script)
+    res = run(script, "--stream")
+    assert res.stdout == expected.stdout
+    assert res.stderr == expected.stderr
+    assert res.returncode == expected.returncode
+
+
+@pytest.mark.parametrize("engine", ENGINES)
+def test_declarations(engine):
+    res = run(
+        "lox/tests/stream_scripts/declarations.lox", "--stream", f"--engine={engine}"
+    )
+    assert res.stdout == b"11\n12\nHello, stream\n13\n15\n17\n19\nremembered\n"
+
+
+def test_late_error():
+    res = run("lox/tests/stream_scripts/late_error.lox", "--stream")
+    assert res.stdout == b"runs\n2\n"
+    assert res.stderr == (
+        b"[line 6] Error at ';': Expect expression.\n"
+        b"[line 8] Error at '=': Expected variable name.\n"
+    )
+    assert res.returncode == 65
+
+
+def test_chunks(tmp_path):
+    # Spans several chunks of the StreamScanner, with lexemes that can be
+    # cut in two where a chunk ends
+    script = tmp_path / "chunks.lox"
+    lines = []
+    for idx in range(5000):
+        lines.append(
+            f"var v{idx} = {idx}.25 * 2; // comment {idx}\n"
+            f'if (v{idx} != {idx}) print "line\n{idx}";\n'
+            f"for (var i in {idx}..{idx + 1}) print i >= {idx};\n"
+        )
+    script.write_text("".join(lines))
+
+    expected = run(str(script))
+    res = run(str(script), "--stream")
+    assert res.stdout == expected.stdout
+    assert res.stderr == expected.stderr
+    assert res.returncode == expected.returncode == 0
+
+
+@pytest.mark.parametrize(
+    "flags, error",
+    [
+        (["--scanner=char"], b"--stream is not supported by the char scanner"),
+        (["--scanner=bytes"], b"--stream is not supported by the bytes scanner"),
+        (["--scanner=buffer"], b"--stream is not supported by the buffer scanner"),
+        (["-O2"], b"--stream is not supported with -O2"),
+    ],
+)
+def test_unsupported(flags, error):
+    res = run("lox/tests/stream_scripts/declarations.lox", "--stream", *flags)
+    assert res.stdout == b""
+    assert error in res.stderr
+    assert res.returncode == 2
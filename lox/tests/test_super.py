@@ -0,0 +1,49 @@
+import subprocess
+
+
+def test_indirectly_inherited():
+    res = subprocess.run(
+        [
+            "python",
+            "lox/lox.py",
+            "-s",
+            "lox/tests/super_scripts/indirectly_inherited.lox",
+        ],
+        capture_output=True,
+    )
+    assert res.stdout == b"C.foo()\nA.foo()\n"
+
+
+def test_different_superclasses():
+    res = subprocess.run(
+        [
+            "python",
+            "lox/lox.py",
+            "-s",
+            "lox/tests/super_scripts/different_superclasses.lox",
+        ],
+        capture_output=True,
+    )
+    assert res.stdout == b"Derived A\nDerived B\nDerived A\n"
+
+
+def test_bound_method():
+    res = subprocess.run(
+        ["python", "lox/lox.py", "-s", "lox/tests/super_scripts/bound_method.lox"],
+        capture_output=True,
+    )
+    assert res.stdout == b"A.method(arg)\n"
+
+
+def test_extra_arguments():
+    res = subprocess.run(
+        [
+            "python",
+            "lox/lox.py",
+            "-s",
+            "lox/tests/super_scripts/extra_arguments.lox",
+        ],
+        capture_output=True,
+    )
+    assert res.stdout == b"Derived.foo()\n"
+    assert b"Expected 2 arguments but got 4." in res.stderr
@@ -0,0 +1,32 @@
+import subprocess
+
+import pytest
+
+
+@pytest.mark.parametrize("engine", ["tree", "quicken", "stackless"])
+def test_deep_tail_call(engine):
+    res = subprocess.run(
+        [
+            "python",
+            "lox/lox.py",
+            f"--engine={engine}",
+            "-s",
+            "lox/tests/tail_call_scripts/deep_tail_call.lox",
+        ],
+        capture_output=True,
+    )
+    assert res.stdout == b"100000\nFalse\n60000\nderived\n"
+
+
+def test_tail_call_targets():
+    res = subprocess.run(
+        [
+            "python",
+            "lox/lox.py",
+            "-s",
+            "lox/tests/tail_call_scripts/tail_call_targets.lox",
+        ],
+        capture_output=True,
+    )
+    assert res.stdout == b"6\nTrue\ndone\n"
+    assert b"Can only call functions and classes.')\n[line 32]" in res.stderr
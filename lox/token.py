@@ -2,11 +2,17 @@ from token_type import TokenType
 
 
 class Token:
+    __slots__ = ("type", "lexme", "literal", "line")
+
     def __init__(self, type: TokenType, lexme: str, literal: object, line: int):
         self.type = type
         self.lexme = lexme
         self.literal = literal
         self.line = line
 
+    def __reduce__(self) -> tuple:
+        # Pickles the token as a call to its class, rather than as its slots
+        return (Token, (self.type, self.lexme, self.literal, self.line))
+
     def __str__(self):
         return f"{self.type} {self.lexme} {self.literal}"
@@ -0,0 +1,89 @@
+import re
+from array import array
+from bisect import bisect_right
+from typing import Iterator, List
+
+from token import Token
+from token_type import TokenType
+
+
+# Token types by their value, which is what the buffer keeps
+_types = [None] * (max([type.value for type in TokenType]) + 1)
+for _type in TokenType:
+    _types[_type.value] = _type
+
+
+class TokenBuffer:
+    """
+    Compact store of the tokens of a source, which keeps each token as a
+    type code and the offset of its lexeme in parallel arrays, next to a list
+    of lexemes that share the strings of keywords, punctuation and each
+    distinct identifier. Lines aren't kept either: the offset of the start of
+    each line is, which gives the line of a token when it is needed.
+
+    Tokens are made on demand, with the literal and line that Scanner would
+    have given them, by indexing the buffer or iterating over it. The Parser
+    does the latter, so that only the tokens it is at and those that end up
+    in the AST exist as Tokens at any time.
+    """
+
+    def __init__(self, src: str):
+        self.types = array("B")
+        # Offsets of lexemes in the source, which must be under 4 GiB
+        self.offsets = array("I")
+        self.lexmes: List[str] = []
+        self._line_starts = array(
+            "I", [0] + [match.end() for match in re.finditer("\n", src)]
+        )
+
+    def append(self, type: TokenType, lexme: str, offset: int) -> None:
+        self.types.append(type.value)
+        self.offsets.append(offset)
+        self.lexmes.append(lexme)
+
+    def __len__(self) -> int:
+        return len(self.types)
+
+    def __getitem__(self, idx: int) -> Token:
+        return Token(
+            _types[self.types[idx]],
+            self.lexmes[idx],
+            self._literal(idx),
+            self.line(idx),
+        )
+
+    def __iter__(self) -> Iterator[Token]:
+        # Lines only go forward, so the start of the next one is all that
+        # has to be compared with the end of each lexeme, or the offset of
+        # the empty one of EOF
+        line_starts = self._line_starts
+        line = 1
+        next_start = line_starts[1] if len(line_starts) > 1 else None
+
+        number = TokenType.NUMBER.value
+        string = TokenType.STRING.value
+        for code, offset, lexme in zip(self.types, self.offsets, self.lexmes):
+            while next_start is not None and next_start < offset + (len(lexme) or 1):
+                line += 1
+                next_start = line_starts[line] if line < len(line_starts) else None
+
+            literal = None
+            if code == number:
+                literal = float(lexme)
+            elif code == string:
+                literal = lexme[1:-1]
+            yield Token(_types[code], lexme, literal, line)
+
+    def line(self, idx: int) -> int:
+        # Strings can span lines, and the token is on the one they end on,
+        # which is where the last character of any lexeme is
+        end = self.offsets[idx] + max(len(self.lexmes[idx]) - 1, 0)
+        return bisect_right(self._line_starts, end)
+
+    def _literal(self, idx: int) -> object:
+        code = self.types[idx]
+        if code == TokenType.NUMBER.value:
+            return float(self.lexmes[idx])
+        if code == TokenType.STRING.value:
+            return self.lexmes[idx][1:-1]
+        return None
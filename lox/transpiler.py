@@ -0,0 +1,786 @@
+import math
+from functools import partial
+from types import FunctionType as PyFunction, MethodType
+from typing import Dict, List, Optional, Self, Set
+import expr
+import stmt
+from token import Token
+from token_type import TokenType
+from runtime_error import RuntimeError
+from error_reporter import error_reporter
+from interpreter import Interpreter
+from _return import Return
+from lox_callable import LoxCallable
+from lox_class import LoxClass
+from lox_instance import LoxInstance
+from resolver import FunctionType
+
+
+class TranspiledMethod(LoxCallable):
+    """
+    Wraps the Python function generated for a method so that LoxClass can
+    look it up and bind it like a LoxFunction.
+    """
+
+    def __init__(self, function: PyFunction):
+        self.function = function
+
+    def arity(self) -> int:
+        # The receiver is passed as the first parameter
+        return self.function.__code__.co_argcount - 1
+
+    def bind(self, instance: LoxInstance) -> MethodType:
+        return MethodType(self.function, instance)
+
+    def invoke(self, interpreter: Interpreter, values: List[object]) -> object:
+        # Like LoxFunction.invoke, with the instance first among "values"
+        return self.function(*values)
+
+
+def _function_name(function: PyFunction) -> str:
+    # Generated names are the Lox name followed by a unique suffix
+    return function.__name__.rsplit("_", 1)[0]
+
+
+def _error(token: Token, msg: str) -> None:
+    raise RuntimeError(token, msg)
+
+
+def _undefined(token: Token) -> None:
+    raise RuntimeError(token, f"Undefined variable '{token.lexme}'.")
+
+
+def _set_global(values: Dict[str, object], value: object, name: Token) -> object:
+    if name.lexme not in values:
+        _undefined(name)
+    values[name.lexme] = value
+    return value
+
+
+def _get(_object: object, name: Token) -> object:
+    if not isinstance(_object, LoxInstance):
+        _error(name, "Only instances have properties.")
+
+    if name.lexme in _object._fields:
+        return _object._fields[name.lexme]
+
+    method = _object._klass.find_method(name.lexme)
+    if method is None:
+        _error(name, f"Undefined property '{name.lexme}'.")
+    return method.bind(_object)
+
+
+def _set(_object: LoxInstance, name: str, value: object) -> object:
+    _object._fields[name] = value
+    return value
+
+
+def _super(superclass: LoxClass, _object: LoxInstance, method: Token) -> object:
+    function = superclass.find_method(method.lexme)
+    if function is None:
+        _error(method, f"Undefined property '{method.lexme}'.")
+    return function.bind(_object)
+
+
+def _check_superclass(superclass: object, name: Token) -> LoxClass:
+    if not isinstance(superclass, LoxClass):
+        _error(name, "Superclass must be a class.")
+    return superclass
+
+
+class _Variable:
+    def __init__(self, name: str, function: "_PyFunction"):
+        self.name = name
+        self.function = function
+
+
+class _PyFunction:
+    """
+    A Python function being generated. Besides Lox functions and methods,
+    the top-level script and some loop bodies become Python functions too.
+    """
+
+    def __init__(self, enclosing: Optional[Self], type: Optional[FunctionType]):
+        self.enclosing = enclosing
+        # None for a loop body, which returns by handing back a tuple
+        self.type = type
+        self.lines: List[str] = []
+        self.nonlocals: Set[str] = set()
+        self.this: Optional[str] = None
+        self.loop_depth = 0
+
+        if type is None:
+            self.this = enclosing.this
+
+
+class Transpiler(expr.Visitor[str], stmt.Visitor[None]):
+    """
+    Translates a resolved AST into the source of a Python function named
+    "_script".
+
+    Lox locals become Python locals and Lox closures Python closures, so
+    CPython's own bytecode does the work. Every local gets a unique Python
+    name, which takes care of shadowing. Globals live in the "_G" dict, like
+    they do in the Interpreter's global Environment. Operations that can fail
+    check their operands inline and raise the same RuntimeError as the
+    Interpreter, with tokens made available to the generated code as "_k*"
+    constants.
+    """
+
+    def __init__(self):
+        self._scopes: List[Dict[str, _Variable]] = []
+        self._function: _PyFunction = None
+        self._indent = 0
+        self._count = 0
+        self.constants: Dict[str, object] = {}
+        self._constant_names: Dict[int, str] = {}
+
+    def transpile(self, statements: List[stmt.Stmt]) -> str:
+        self._function = _PyFunction(None, FunctionType.NONE)
+        for statement in statements:
+            self._stmt(statement)
+
+        return "\n".join(["def _script():"] + self._body(self._function)) + "\n"
+
+    def _expr(self, _expr: expr.Expr) -> str:
+        return _expr.accept(self)
+
+    def _stmt(self, _stmt: stmt.Stmt) -> None:
+        _stmt.accept(self)
+
+    def _emit(self, line: str) -> None:
+        self._function.lines.append("    " * self._indent + line)
+
+    def _body(self, function: _PyFunction) -> List[str]:
+        lines = []
+        if function.nonlocals:
+            lines.append(f"nonlocal {', '.join(sorted(function.nonlocals))}")
+        lines.extend(function.lines)
+        if not lines:
+            lines.append("pass")
+        return ["    " + line for line in lines]
+
+    def _emit_body(self, statements: List[stmt.Stmt]) -> None:
+        self._indent += 1
+        start = len(self._function.lines)
+        for statement in statements:
+            self._stmt(statement)
+        if len(self._function.lines) == start:
+            self._emit("pass")
+        self._indent -= 1
+
+    def _unique(self, name: str) -> str:
+        self._count += 1
+        return f"{name}_{self._count}"
+
+    def _temp(self) -> str:
+        self._count += 1
+        return f"_t{self._count}"
+
+    def _constant(self, value: object) -> str:
+        if id(value) not in self._constant_names:
+            name = f"_k{len(self._constant_names)}"
+            self._constant_names[id(value)] = name
+            self.constants[name] = value
+        return self._constant_names[id(value)]
+
+    def _begin_scope(self) -> None:
+        self._scopes.append({})
+
+    def _end_scope(self) -> None:
+        self._scopes.pop()
+
+    def _declare(self, name: str) -> Optional[str]:
+        """
+        Declares a variable in the innermost scope and returns its Python
+        name, or None if it is a global.
+        """
+        if len(self._scopes) == 0:
+            return None
+
+        variable = _Variable(self._unique(name), self._function)
+        self._scopes[-1][name] = variable
+        return variable.name
+
+    def _define(self, name: Token, value: str) -> None:
+        self._store(name, self._declare(name.lexme), value)
+
+    def _store(self, name: Token, python_name: Optional[str], value: str) -> None:
+        if python_name is None:
+            self._emit(f"_G[{name.lexme!r}] = {value}")
+        else:
+            self._emit(f"{python_name} = {value}")
+
+    def _look_up(self, _expr: expr.Expr, name: str) -> Optional[_Variable]:
+        # The Resolver's depths count environments, which not every scope
+        # has, so the local is found by name like the Resolver found it
+        if _expr.depth is None:
+            return None
+        for scope in reversed(self._scopes):
+            if name in scope:
+                return scope[name]
+
+    def _assignable(self, _expr: expr.Assign) -> Optional[str]:
+        variable = self._look_up(_expr, _expr.name.lexme)
+        if variable is None:
+            return None
+
+        # Assigning to a variable of an enclosing function needs "nonlocal"
+        # for Python to find it
+        if variable.function is not self._function:
+            self._function.nonlocals.add(variable.name)
+        return variable.name
+
+    def _is_pure(self, _expr: expr.Expr) -> bool:
+        """
+        Whether evaluating the expression can't change any variable, so that
+        variables evaluated before it can be read after it.
+        """
+        if isinstance(_expr, (expr.Literal, expr.Variable, expr.This, expr.Super)):
+            return True
+        if isinstance(_expr, expr.Grouping):
+            return self._is_pure(_expr.expression)
+        if isinstance(_expr, expr.Unary):
+            return self._is_pure(_expr.right)
+        if isinstance(_expr, expr.Get):
+            return self._is_pure(_expr.object)
+        if isinstance(_expr, (expr.Binary, expr.Logical)):
+            return self._is_pure(_expr.left) and self._is_pure(_expr.right)
+        return False
+
+    def _is_local(self, _expr: expr.Expr) -> bool:
+        return isinstance(_expr, (expr.Variable, expr.This)) and _expr.depth is not None
+
+    def _operand(self, _expr: expr.Expr, reuse: bool) -> tuple:
+        """
+        Returns the code that evaluates an operand and the code that reads
+        its value afterwards. Locals can be read again directly when
+        nothing evaluated in between can change them.
+        """
+        code = self._expr(_expr)
+        if isinstance(_expr, expr.Literal) or (reuse and self._is_local(_expr)):
+            return code, code
+
+        temp = self._temp()
+        return f"({temp} := {code})", temp
+
+    def _is_number(self, _expr: expr.Expr) -> bool:
+        return isinstance(_expr, expr.Literal) and isinstance(_expr.value, float)
+
+    def _is_boolean(self, _expr: expr.Expr) -> bool:
+        if isinstance(_expr, expr.Grouping):
+            return self._is_boolean(_expr.expression)
+        if isinstance(_expr, expr.Binary):
+            return _expr.operator.type not in (
+                TokenType.PLUS,
+                TokenType.MINUS,
+                TokenType.STAR,
+                TokenType.SLASH,
+            )
+        if isinstance(_expr, expr.Unary):
+            return _expr.operator.type == TokenType.BANG
+        return isinstance(_expr, expr.Literal) and isinstance(_expr.value, bool)
+
+    def _condition(self, _expr: expr.Expr) -> str:
+        if self._is_boolean(_expr):
+            return self._expr(_expr)
+
+        temp = self._temp()
+        return f"({temp} := {self._expr(_expr)}) is not None and {temp} is not False"
+
+    def visit_assign_expr(self, _expr: expr.Assign) -> str:
+        value = self._expr(_expr.value)
+        name = self._assignable(_expr)
+        if name is None:
+            return f"_set_global(_G, {value}, {self._constant(_expr.name)})"
+        return f"({name} := {value})"
+
+    def visit_binary_expr(self, _expr: expr.Binary) -> str:
+        type = _expr.operator.type
+        operator = self._constant(_expr.operator)
+
+        if type == TokenType.SLASH:
+            # Mirrors Interpreter.visit_binary_expr, which does not check
+            # the operands of a division
+            left = self._expr(_expr.left)
+            return f"(float({left}) / float({self._expr(_expr.right)}))"
+
+        left, left_value = self._operand(_expr.left, self._is_pure(_expr.right))
+        right, right_value = self._operand(_expr.right, True)
+
+        if type in (TokenType.EQUAL_EQUAL, TokenType.BANG_EQUAL):
+            equal = (
+                f"({left}.__class__ is {right}.__class__ "
+                f"and {left_value} == {right_value})"
+            )
+            if type == TokenType.BANG_EQUAL:
+                return f"(not {equal})"
+            return equal
+
+        if type == TokenType.PLUS:
+            if self._is_number(_expr.left) or self._is_number(_expr.right):
+                check = self._number_check(_expr, left, right)
+            else:
+                check = (
+                    f"{left}.__class__ is {right}.__class__ is float "
+                    f"or {left_value}.__class__ is {right_value}.__class__ is str"
+                )
+            error = (
+                f"_error({operator}, 'Operands must be two numbers or two strings.')"
+            )
+            return f"({left_value} + {right_value} if {check} else {error})"
+
+        check = self._number_check(_expr, left, right)
+        error = f"_error({operator}, 'Operands must be numbers.')"
+        op = _BINARY_OPS[type]
+        return f"({left_value} {op} {right_value} if {check} else {error})"
+
+    def _number_check(self, _expr: expr.Binary, left: str, right: str) -> str:
+        # Number literals don't need to be checked
+        if self._is_number(_expr.left) and self._is_number(_expr.right):
+            return "True"
+        if self._is_number(_expr.right):
+            return f"{left}.__class__ is float"
+        if self._is_number(_expr.left):
+            return f"{right}.__class__ is float"
+        return f"{left}.__class__ is {right}.__class__ is float"
+
+    def visit_call_expr(self, _expr: expr.Call) -> str:
+        callee = self._expr(_expr.callee)
+        arguments = ", ".join(self._expr(argument) for argument in _expr.arguments)
+        paren = self._constant(_expr.paren)
+        temp = self._temp()
+
+        # Generated functions taking the right number of arguments are called
+        # directly. Anything else is called through _py_call, which also
+        # reports errors once the arguments have been evaluated.
+        return (
+            f"({temp} if ({temp} := {callee}).__class__ is _function "
+            f"and {temp}.__code__.co_argcount == {len(_expr.arguments)} "
+            f"else _partial(_py_call, {temp}, {paren}))({arguments})"
+        )
+
+    def visit_get_expr(self, _expr: expr.Get) -> str:
+        temp = self._temp()
+        name = _expr.name.lexme
+        return (
+            f"({temp}._fields[{name!r}] if ({temp} := {self._expr(_expr.object)})"
+            f".__class__ is _LoxInstance and {name!r} in {temp}._fields "
+            f"else _get({temp}, {self._constant(_expr.name)}))"
+        )
+
+    def visit_grouping_expr(self, _expr: expr.Grouping) -> str:
+        return self._expr(_expr.expression)
+
+    def visit_literal_expr(self, _expr: expr.Literal) -> str:
+        value = _expr.value
+        if isinstance(value, float) and not math.isfinite(value):
+            return self._constant(value)
+        return repr(value)
+
+    def visit_logical_expr(self, _expr: expr.Logical) -> str:
+        temp = self._temp()
+        left = self._expr(_expr.left)
+        right = self._expr(_expr.right)
+        falsey = f"({temp} := {left}) is None or {temp} is False"
+
+        if _expr.operator.type == TokenType.OR:
+            return f"({right} if {falsey} else {temp})"
+        return f"({temp} if {falsey} else {right})"
+
+    def visit_set_expr(self, _expr: expr.Set) -> str:
+        temp = self._temp()
+        _object = self._expr(_expr.object)
+        value = self._expr(_expr.value)
+        name = self._constant(_expr.name)
+
+        # The value is only evaluated once the object is known to be an
+        # instance
+        return (
+            f"(_set({temp}, {_expr.name.lexme!r}, {value}) "
+            f"if isinstance(({temp} := {_object}), _LoxInstance) "
+            f"else _error({name}, 'Only instances have fields.'))"
+        )
+
+    def visit_super_expr(self, _expr: expr.Super) -> str:
+        superclass = self._look_up(_expr, "super").name
+        this = self._look_up(_expr, "this").name
+        return f"_super({superclass}, {this}, {self._constant(_expr.method)})"
+
+    def visit_this_expr(self, _expr: expr.This) -> str:
+        return self._look_up(_expr, "this").name
+
+    def visit_unary_expr(self, _expr: expr.Unary) -> str:
+        if _expr.operator.type == TokenType.BANG:
+            if self._is_boolean(_expr.right):
+                return f"(not {self._expr(_expr.right)})"
+            temp = self._temp()
+            return f"(({temp} := {self._expr(_expr.right)}) is None or {temp} is False)"
+
+        if self._is_number(_expr.right):
+            return f"(-{self._expr(_expr.right)})"
+
+        right, right_value = self._operand(_expr.right, True)
+        operator = self._constant(_expr.operator)
+        return (
+            f"(-{right_value} if {right}.__class__ is float "
+            f"else _error({operator}, 'Operand must be a number.'))"
+        )
+
+    def visit_variable_expr(self, _expr: expr.Variable) -> str:
+        variable = self._look_up(_expr, _expr.name.lexme)
+        if variable is not None:
+            return variable.name
+
+        name = _expr.name.lexme
+        return (
+            f"(_G[{name!r}] if {name!r} in _G "
+            f"else _undefined({self._constant(_expr.name)}))"
+        )
+
+    def visit_block_stmt(self, _stmt: stmt.Block) -> None:
+        self._begin_scope()
+
+        # Python only creates fresh variables on each call, so a loop body
+        # whose variables might be captured by a closure gets its own
+        # function, called once per iteration
+        if self._function.loop_depth > 0 and _declares_closure(_stmt.statements):
+            self._loop_body_function(_stmt.statements)
+        else:
+            for statement in _stmt.statements:
+                self._stmt(statement)
+
+        self._end_scope()
+
+    def _loop_body_function(self, statements: List[stmt.Stmt]) -> None:
+        name = self._unique("block")
+        enclosing = self._function
+        indent = self._indent
+
+        self._function = _PyFunction(enclosing, None)
+        self._indent = 0
+        for statement in statements:
+            self._stmt(statement)
+        body = self._body(self._function)
+        self._function = enclosing
+        self._indent = indent
+
+        self._emit(f"def {name}():")
+        for line in body:
+            self._emit(line)
+
+        if enclosing.type == FunctionType.NONE:
+            self._emit(f"{name}()")
+            return
+
+        completion = self._temp()
+        self._emit(f"{completion} = {name}()")
+        self._emit(f"if {completion} is not None:")
+        if enclosing.type is None:
+            self._emit(f"    return {completion}")
+        else:
+            self._emit(f"    return {completion}[0]")
+
+    def _function_def(
+        self, function: stmt.Function, python_name: str, type: FunctionType
+    ) -> None:
+        enclosing = self._function
+        indent = self._indent
+
+        self._function = _PyFunction(enclosing, type)
+        self._indent = 0
+
+        params = []
+        self._begin_scope()
+        if type in (FunctionType.METHOD, FunctionType.INTIALIZER):
+            self._function.this = self._declare("this")
+            params.append(self._function.this)
+        for param in function.params:
+            params.append(self._declare(param.lexme))
+        for statement in function.body:
+            self._stmt(statement)
+        self._end_scope()
+
+        if type == FunctionType.INTIALIZER:
+            self._emit(f"return {self._function.this}")
+
+        body = self._body(self._function)
+        self._function = enclosing
+        self._indent = indent
+
+        self._emit(f"def {python_name}({', '.join(params)}):")
+        for line in body:
+            self._emit(line)
+
+    def visit_class_stmt(self, _stmt: stmt.Class) -> None:
+        superclass = "None"
+        if _stmt.superclass is not None:
+            superclass = (
+                f"_check_superclass({self._expr(_stmt.superclass)}, "
+                f"{self._constant(_stmt.superclass.name)})"
+            )
+            superclass_name = self._unique("super")
+            self._emit(f"{superclass_name} = {superclass}")
+            superclass = superclass_name
+
+        self._define(_stmt.name, "None")
+
+        if _stmt.superclass is not None:
+            self._begin_scope()
+            self._scopes[-1]["super"] = _Variable(superclass, self._function)
+
+        methods = []
+        for method in _stmt.methods:
+            python_name = self._unique(method.name.lexme)
+            type = FunctionType.METHOD
+            if method.name.lexme == "init":
+                type = FunctionType.INTIALIZER
+            self._function_def(method, python_name, type)
+            methods.append(f"{method.name.lexme!r}: _TranspiledMethod({python_name})")
+
+        if _stmt.superclass is not None:
+            self._end_scope()
+
+        klass = (
+            f"_LoxClass({_stmt.name.lexme!r}, {superclass}, "
+            f"{{{', '.join(methods)}}})"
+        )
+        variable = self._look_up_declared(_stmt.name.lexme)
+        if variable is None:
+            self._emit(f"_G[{_stmt.name.lexme!r}] = {klass}")
+        else:
+            self._emit(f"{variable} = {klass}")
+
+    def _look_up_declared(self, name: str) -> Optional[str]:
+        if len(self._scopes) == 0:
+            return None
+        return self._scopes[-1][name].name
+
+    def visit_expression_stmt(self, _stmt: stmt.Expression) -> None:
+        expression = _stmt.expression
+
+        # Assignments are by far the most common expression statements and
+        # can skip producing a value
+        if isinstance(expression, expr.Assign):
+            value = self._expr(expression.value)
+            name = self._assignable(expression)
+            if name is not None:
+                self._emit(f"{name} = {value}")
+                return
+
+        self._emit(self._expr(expression))
+
+    def visit_function_stmt(self, _stmt: stmt.Function) -> None:
+        python_name = self._declare(_stmt.name.lexme)
+        if python_name is None:
+            python_name = self._unique(_stmt.name.lexme)
+            self._function_def(_stmt, python_name, FunctionType.FUNCTION)
+            self._emit(f"_G[{_stmt.name.lexme!r}] = {python_name}")
+        else:
+            self._function_def(_stmt, python_name, FunctionType.FUNCTION)
+
+    def visit_if_stmt(self, _stmt: stmt.If) -> None:
+        self._emit(f"if {self._condition(_stmt.condition)}:")
+        self._emit_body([_stmt.then_branch])
+
+        if _stmt.else_branch is not None:
+            self._emit("else:")
+            self._emit_body([_stmt.else_branch])
+
+    def visit_print_stmt(self, _stmt: stmt.Print) -> None:
+        self._emit(f"print(_stringify({self._expr(_stmt.expression)}))")
+
+    def visit_return_stmt(self, _stmt: stmt.Return) -> None:
+        value = "None"
+        if self._function.this is not None and self._is_initializer():
+            value = self._function.this
+        elif _stmt.value is not None:
+            value = self._expr(_stmt.value)
+
+        if self._function.type is None:
+            self._emit(f"return ({value},)")
+        else:
+            self._emit(f"return {value}")
+
+    def _is_initializer(self) -> bool:
+        function = self._function
+        while function.type is None:
+            function = function.enclosing
+        return function.type == FunctionType.INTIALIZER
+
+    def visit_var_stmt(self, _stmt: stmt.Var) -> None:
+        # Declared before the initializer, like the Resolver does, since the
+        # initializer can assign the variable
+        python_name = self._declare(_stmt.name.lexme)
+        value = "None"
+        if _stmt.initializer is not None:
+            value = self._expr(_stmt.initializer)
+        self._store(_stmt.name, python_name, value)
+
+    def visit_while_stmt(self, _stmt: stmt.While) -> None:
+        self._emit(f"while {self._condition(_stmt.condition)}:")
+        self._function.loop_depth += 1
+        self._emit_body([_stmt.body])
+        self._function.loop_depth -= 1
+
+    def visit_for_stmt(self, _stmt: stmt.For) -> None:
+        body = [_stmt.body]
+        if _stmt.increment is not None:
+            body.append(stmt.Expression(_stmt.increment))
+
+        self._emit(f"while {self._condition(_stmt.condition)}:")
+        self._function.loop_depth += 1
+        self._emit_body(body)
+        self._function.loop_depth -= 1
+
+    def visit_forrange_stmt(self, _stmt: stmt.ForRange) -> None:
+        value = self._temp()
+        end = self._temp()
+        self._emit(f"{value} = {self._expr(_stmt.start)}")
+        self._emit(f"{end} = {self._expr(_stmt.end)}")
+        self._emit(f"if not {value}.__class__ is {end}.__class__ is float:")
+        self._emit(
+            f"    _error({self._constant(_stmt.dots)}, 'Operands must be numbers.')"
+        )
+
+        name = self._declare(_stmt.name.lexme)
+        self._emit(f"while {value} < {end}:")
+        self._function.loop_depth += 1
+        self._indent += 1
+        self._emit(f"{name} = {value}")
+        self._stmt(_stmt.body)
+        self._emit(f"{value} += 1")
+        self._indent -= 1
+        self._function.loop_depth -= 1
+
+
+def _declares_closure(statements: List[stmt.Stmt]) -> bool:
+    """
+    Whether a function or class is declared anywhere among the statements,
+    so that one of their variables might be captured.
+    """
+    for statement in statements:
+        if isinstance(statement, (stmt.Function, stmt.Class)):
+            return True
+        if isinstance(statement, stmt.Block):
+            if _declares_closure(statement.statements):
+                return True
+        elif isinstance(statement, stmt.If):
+            branches = [statement.then_branch]
+            if statement.else_branch is not None:
+                branches.append(statement.else_branch)
+            if _declares_closure(branches):
+                return True
+        elif isinstance(statement, (stmt.While, stmt.For, stmt.ForRange)):
+            if _declares_closure([statement.body]):
+                return True
+    return False
+
+
+_BINARY_OPS = {
+    TokenType.MINUS: "-",
+    TokenType.STAR: "*",
+    TokenType.GREATER: ">",
+    TokenType.GREATER_EQUAL: ">=",
+    TokenType.LESS: "<",
+    TokenType.LESS_EQUAL: "<=",
+}
+
+
+class TranspiledInterpreter(Interpreter):
+    """
+    Runs programs by translating them to Python with the Transpiler and
+    executing the result.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self._namespace = {
+            "_G": self.globals._values,
+            "_function": PyFunction,
+            "_LoxInstance": LoxInstance,
+            "_LoxClass": LoxClass,
+            "_TranspiledMethod": TranspiledMethod,
+            "_py_call": self._py_call,
+            "_partial": partial,
+            "_stringify": self._stringify,
+            "_error": _error,
+            "_undefined": _undefined,
+            "_set_global": _set_global,
+            "_get": _get,
+            "_set": _set,
+            "_super": _super,
+            "_check_superclass": _check_superclass,
+        }
+
+    def interpret(self, statements: List[stmt.Stmt]) -> None:
+        transpiler = Transpiler()
+        source = transpiler.transpile(statements)
+
+        try:
+            code = compile(source, "<lox>", "exec")
+        except (SyntaxError, RecursionError, MemoryError):
+            # CPython's compiler refuses very deeply nested expressions,
+            # which the tree-walker can still run
+            super().interpret(statements)
+            return
+
+        # Every program numbers its constants from "_k0", so each gets its
+        # own namespace, where functions it declares still find its constants
+        # when a later program, such as the next line at the prompt, calls them
+        namespace = dict(self._namespace)
+        namespace.update(transpiler.constants)
+        exec(code, namespace)
+
+        try:
+            namespace["_script"]()
+        except RuntimeError as error:
+            error_reporter.runtime_error(error)
+
+    def _call(
+        self, _expr: expr.Call, callee: object, arguments: List[object]
+    ) -> object:
+        # The tree-walker runs the programs that CPython can't compile, and
+        # they can call the functions of programs that were transpiled, such
+        # as earlier lines at the prompt
+        if isinstance(callee, (PyFunction, MethodType)):
+            return self._py_call(callee, _expr.paren, *arguments)
+        return super()._call(_expr, callee, arguments)
+
+    def _tail_call(self, _expr: expr.Call) -> Return:
+        # Transpiled functions can't run in place of the tree-walked one that
+        # is returning, and the engine doesn't eliminate tail calls anyway
+        return Return(self._evaluate(_expr))
+
+    def _py_call(self, callee: object, paren: Token, *arguments: object) -> object:
+        if isinstance(callee, PyFunction):
+            arity = callee.__code__.co_argcount
+        elif isinstance(callee, MethodType):
+            arity = callee.__func__.__code__.co_argcount - 1
+        elif isinstance(callee, LoxCallable):
+            arity = callee.arity()
+        else:
+            raise RuntimeError(paren, "Can only call functions and classes.")
+
+        if len(arguments) != arity:
+            raise RuntimeError(
+                paren, f"Expected {arity} arguments but got {len(arguments)}."
+            )
+
+        if isinstance(callee, LoxClass):
+            instance = LoxInstance(callee)
+            initializer = callee.find_method("init")
+            if initializer is not None:
+                initializer.invoke(self, [instance, *arguments])
+            return instance
+
+        if isinstance(callee, (PyFunction, MethodType)):
+            return callee(*arguments)
+        return callee.call(self, list(arguments))
+
+    def _stringify(self, object: object) -> str:
+        if isinstance(object, PyFunction):
+            return f"<fn {_function_name(object)}>"
+        if isinstance(object, MethodType):
+            return f"<fn {_function_name(object.__func__)}>"
+        return super()._stringify(object)
@@ -0,0 +1,515 @@
+from typing import Dict, List
+import stmt
+from token import Token
+from token_type import TokenType
+from runtime_error import RuntimeError
+from error_reporter import error_reporter
+from chunk import OpCode, CompiledFunction
+from compiler import Compiler
+from interpreter import Interpreter
+from lox_callable import LoxCallable
+from lox_class import LoxClass
+from lox_instance import LoxInstance
+
+
+FRAMES_MAX = 4096
+
+
+class Upvalue:
+    def __init__(self, values: List[object], index: int):
+        # While the variable is still on the stack, "values" is the VM stack
+        # and "index" its slot. Closing it moves the value into a list of its
+        # own, so reads and writes look the same either way.
+        self.values = values
+        self.index = index
+
+    def close(self) -> None:
+        self.values = [self.values[self.index]]
+        self.index = 0
+
+
+class Closure(LoxCallable):
+    def __init__(self, function: CompiledFunction, upvalues: List[Upvalue]):
+        self.function = function
+        self.upvalues = upvalues
+
+    def arity(self) -> int:
+        return self.function.arity
+
+    def bind(self, instance: LoxInstance) -> "BoundMethod":
+        return BoundMethod(instance, self)
+
+    def __str__(self) -> str:
+        return str(self.function)
+
+
+class BoundMethod(LoxCallable):
+    def __init__(self, receiver: LoxInstance, method: Closure):
+        self.receiver = receiver
+        self.method = method
+
+    def arity(self) -> int:
+        return self.method.arity()
+
+    def __str__(self) -> str:
+        return str(self.method)
+
+
+class CallFrame:
+    def __init__(self, closure: Closure, base: int):
+        self.closure = closure
+        self.code = closure.function.chunk.code
+        self.constants = closure.function.chunk.constants
+        self.base = base
+        self.ip = 0
+
+
+class VM(Interpreter):
+    """
+    Compiles programs to bytecode with the Compiler and runs them on a stack
+    machine. Lox calls push a CallFrame instead of recursing in Python.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.max_call_depth = FRAMES_MAX
+        self._stack: List[object] = []
+        self._frames: List[CallFrame] = []
+        self._open_upvalues: Dict[int, Upvalue] = {}
+
+    def interpret(self, statements: List[stmt.Stmt]) -> None:
+        function = Compiler().compile(statements)
+        if error_reporter.had_error:
+            return
+
+        closure = Closure(function, [])
+        self._stack = [closure]
+        self._frames = [CallFrame(closure, 0)]
+        self._open_upvalues = {}
+
+        try:
+            self._run()
+        except RuntimeError as error:
+            error_reporter.runtime_error(error)
+
+    def _error(self, msg: str) -> RuntimeError:
+        frame = self._frames[-1]
+        line = frame.closure.function.chunk.get_line(frame.ip - 1)
+        return RuntimeError(Token(TokenType.EOF, "", None, line), msg)
+
+    def _capture_upvalue(self, location: int) -> Upvalue:
+        upvalue = self._open_upvalues.get(location)
+        if upvalue is None:
+            upvalue = Upvalue(self._stack, location)
+            self._open_upvalues[location] = upvalue
+        return upvalue
+
+    def _close_upvalues(self, last: int) -> None:
+        open_upvalues = self._open_upvalues
+        closing = [location for location in open_upvalues if location >= last]
+        for location in closing:
+            open_upvalues.pop(location).close()
+
+    def _call(self, closure: Closure, arg_count: int) -> None:
+        if arg_count != closure.function.arity:
+            raise self._error(
+                f"Expected {closure.function.arity} arguments but got {arg_count}."
+            )
+
+        if len(self._frames) >= self.max_call_depth:
+            raise self._error("Stack overflow.")
+
+        self._frames.append(CallFrame(closure, len(self._stack) - arg_count - 1))
+
+    def _call_value(self, callee: object, arg_count: int) -> None:
+        """
+        Calls anything that isn't a plain closure. Calls into Lox code push
+        a new frame, native functions run to completion right away.
+        """
+        stack = self._stack
+
+        if isinstance(callee, Closure):
+            self._call(callee, arg_count)
+        elif isinstance(callee, BoundMethod):
+            stack[-arg_count - 1] = callee.receiver
+            self._call(callee.method, arg_count)
+        elif isinstance(callee, LoxClass):
+            stack[-arg_count - 1] = LoxInstance(callee)
+            initializer = callee.find_method("init")
+            if initializer is not None:
+                self._call(initializer, arg_count)
+            elif arg_count != 0:
+                raise self._error(f"Expected 0 arguments but got {arg_count}.")
+        elif isinstance(callee, LoxCallable):
+            if arg_count != callee.arity():
+                raise self._error(
+                    f"Expected {callee.arity()} arguments but got {arg_count}."
+                )
+            arguments = stack[len(stack) - arg_count :]
+            del stack[len(stack) - arg_count - 1 :]
+            stack.append(callee.call(self, arguments))
+        else:
+            raise self._error("Can only call functions and classes.")
+
+    def _invoke(self, name: str, arg_count: int) -> None:
+        receiver = self._stack[-arg_count - 1]
+        if not isinstance(receiver, LoxInstance):
+            raise self._error("Only instances have properties.")
+
+        # A field holding a function shadows any method of the same name
+        if name in receiver._fields:
+            value = receiver._fields[name]
+            self._stack[-arg_count - 1] = value
+            self._call_value(value, arg_count)
+            return
+
+        self._invoke_from_class(receiver._klass, name, arg_count)
+
+    def _invoke_from_class(
+        self, klass: LoxClass, name: str, arg_count: int
+    ) -> None:
+        method = klass.find_method(name)
+        if method is None:
+            raise self._error(f"Undefined property '{name}'.")
+        self._call(method, arg_count)
+
+    def _run(self) -> None:
+        stack = self._stack
+        push = stack.append
+        pop = stack.pop
+        frames = self._frames
+        frames_max = self.max_call_depth
+        values = self.globals._values
+        open_upvalues = self._open_upvalues
+        stringify = self._stringify
+
+        GET_LOCAL = OpCode.GET_LOCAL.value
+        CONSTANT = OpCode.CONSTANT.value
+        GET_GLOBAL = OpCode.GET_GLOBAL.value
+        SET_LOCAL = OpCode.SET_LOCAL.value
+        POP = OpCode.POP.value
+        ADD = OpCode.ADD.value
+        SUBTRACT = OpCode.SUBTRACT.value
+        LESS = OpCode.LESS.value
+        POP_JUMP_IF_FALSE = OpCode.POP_JUMP_IF_FALSE.value
+        LOOP = OpCode.LOOP.value
+        CALL = OpCode.CALL.value
+        RETURN = OpCode.RETURN.value
+        GET_UPVALUE = OpCode.GET_UPVALUE.value
+        GET_PROPERTY = OpCode.GET_PROPERTY.value
+        INVOKE = OpCode.INVOKE.value
+        JUMP = OpCode.JUMP.value
+        MULTIPLY = OpCode.MULTIPLY.value
+        GREATER = OpCode.GREATER.value
+        LESS_EQUAL = OpCode.LESS_EQUAL.value
+        GREATER_EQUAL = OpCode.GREATER_EQUAL.value
+        EQUAL = OpCode.EQUAL.value
+        NOT_EQUAL = OpCode.NOT_EQUAL.value
+        SET_PROPERTY = OpCode.SET_PROPERTY.value
+        SET_GLOBAL = OpCode.SET_GLOBAL.value
+        SET_UPVALUE = OpCode.SET_UPVALUE.value
+        NIL = OpCode.NIL.value
+        TRUE = OpCode.TRUE.value
+        FALSE = OpCode.FALSE.value
+        DIVIDE = OpCode.DIVIDE.value
+        NOT = OpCode.NOT.value
+        NEGATE = OpCode.NEGATE.value
+        JUMP_IF_FALSE = OpCode.JUMP_IF_FALSE.value
+        JUMP_IF_TRUE = OpCode.JUMP_IF_TRUE.value
+        PRINT = OpCode.PRINT.value
+        DEFINE_GLOBAL = OpCode.DEFINE_GLOBAL.value
+        CLOSURE = OpCode.CLOSURE.value
+        CLOSE_UPVALUE = OpCode.CLOSE_UPVALUE.value
+        GET_SUPER = OpCode.GET_SUPER.value
+        SUPER_INVOKE = OpCode.SUPER_INVOKE.value
+        CLASS = OpCode.CLASS.value
+
+        frame = frames[-1]
+        code = frame.code
+        constants = frame.constants
+        upvalues = frame.closure.upvalues
+        base = frame.base
+        ip = frame.ip
+
+        while True:
+            op = code[ip]
+            ip += 1
+
+            if op == GET_LOCAL:
+                push(stack[base + code[ip]])
+                ip += 1
+            elif op == CONSTANT:
+                push(constants[(code[ip] << 8) | code[ip + 1]])
+                ip += 2
+            elif op == GET_GLOBAL:
+                name = constants[(code[ip] << 8) | code[ip + 1]]
+                ip += 2
+                if name not in values:
+                    frame.ip = ip
+                    raise self._error(f"Undefined variable '{name}'.")
+                push(values[name])
+            elif op == SET_LOCAL:
+                stack[base + code[ip]] = stack[-1]
+                ip += 1
+            elif op == POP:
+                pop()
+            elif op == ADD:
+                b = pop()
+                a = stack[-1]
+                if a.__class__ is b.__class__ and (
+                    a.__class__ is float or a.__class__ is str
+                ):
+                    stack[-1] = a + b
+                else:
+                    frame.ip = ip
+                    raise self._error("Operands must be two numbers or two strings.")
+            elif op == SUBTRACT:
+                b = pop()
+                a = stack[-1]
+                if a.__class__ is not float or b.__class__ is not float:
+                    frame.ip = ip
+                    raise self._error("Operands must be numbers.")
+                stack[-1] = a - b
+            elif op == LESS:
+                b = pop()
+                a = stack[-1]
+                if a.__class__ is not float or b.__class__ is not float:
+                    frame.ip = ip
+                    raise self._error("Operands must be numbers.")
+                stack[-1] = a < b
+            elif op == POP_JUMP_IF_FALSE:
+                value = pop()
+                if value is None or value is False:
+                    ip += ((code[ip] << 8) | code[ip + 1]) + 2
+                else:
+                    ip += 2
+            elif op == LOOP:
+                ip += 2 - ((code[ip] << 8) | code[ip + 1])
+            elif op == CALL:
+                arg_count = code[ip]
+                ip += 1
+                frame.ip = ip
+                callee = stack[-arg_count - 1]
+                if (
+                    callee.__class__ is Closure
+                    and callee.function.arity == arg_count
+                    and len(frames) < frames_max
+                ):
+                    frame = CallFrame(callee, len(stack) - arg_count - 1)
+                    frames.append(frame)
+                    code = frame.code
+                    constants = frame.constants
+                    upvalues = callee.upvalues
+                    base = frame.base
+                    ip = 0
+                    continue
+
+                self._call_value(callee, arg_count)
+                frame = frames[-1]
+                code = frame.code
+                constants = frame.constants
+                upvalues = frame.closure.upvalues
+                base = frame.base
+                ip = frame.ip
+            elif op == RETURN:
+                result = pop()
+                if open_upvalues:
+                    self._close_upvalues(base)
+                frames.pop()
+                if not frames:
+                    pop()
+                    return
+
+                del stack[base:]
+                push(result)
+                frame = frames[-1]
+                code = frame.code
+                constants = frame.constants
+                upvalues = frame.closure.upvalues
+                base = frame.base
+                ip = frame.ip
+            elif op == GET_UPVALUE:
+                upvalue = upvalues[code[ip]]
+                push(upvalue.values[upvalue.index])
+                ip += 1
+            elif op == GET_PROPERTY:
+                name = constants[(code[ip] << 8) | code[ip + 1]]
+                ip += 2
+                instance = stack[-1]
+                if not isinstance(instance, LoxInstance):
+                    frame.ip = ip
+                    raise self._error("Only instances have properties.")
+
+                if name in instance._fields:
+                    stack[-1] = instance._fields[name]
+                else:
+                    method = instance._klass.find_method(name)
+                    if method is None:
+                        frame.ip = ip
+                        raise self._error(f"Undefined property '{name}'.")
+                    stack[-1] = BoundMethod(instance, method)
+            elif op == INVOKE:
+                name = constants[(code[ip] << 8) | code[ip + 1]]
+                arg_count = code[ip + 2]
+                ip += 3
+                frame.ip = ip
+                self._invoke(name, arg_count)
+                frame = frames[-1]
+                code = frame.code
+                constants = frame.constants
+                upvalues = frame.closure.upvalues
+                base = frame.base
+                ip = frame.ip
+            elif op == JUMP:
+                ip += ((code[ip] << 8) | code[ip + 1]) + 2
+            elif op == MULTIPLY:
+                b = pop()
+                a = stack[-1]
+                if a.__class__ is not float or b.__class__ is not float:
+                    frame.ip = ip
+                    raise self._error("Operands must be numbers.")
+                stack[-1] = a * b
+            elif op == GREATER:
+                b = pop()
+                a = stack[-1]
+                if a.__class__ is not float or b.__class__ is not float:
+                    frame.ip = ip
+                    raise self._error("Operands must be numbers.")
+                stack[-1] = a > b
+            elif op == LESS_EQUAL:
+                b = pop()
+                a = stack[-1]
+                if a.__class__ is not float or b.__class__ is not float:
+                    frame.ip = ip
+                    raise self._error("Operands must be numbers.")
+                stack[-1] = a <= b
+            elif op == GREATER_EQUAL:
+                b = pop()
+                a = stack[-1]
+                if a.__class__ is not float or b.__class__ is not float:
+                    frame.ip = ip
+                    raise self._error("Operands must be numbers.")
+                stack[-1] = a >= b
+            elif op == EQUAL:
+                b = pop()
+                a = stack[-1]
+                stack[-1] = a.__class__ is b.__class__ and a == b
+            elif op == NOT_EQUAL:
+                b = pop()
+                a = stack[-1]
+                stack[-1] = not (a.__class__ is b.__class__ and a == b)
+            elif op == SET_PROPERTY:
+                name = constants[(code[ip] << 8) | code[ip + 1]]
+                ip += 2
+                value = pop()
+                instance = stack[-1]
+                if not isinstance(instance, LoxInstance):
+                    frame.ip = ip
+                    raise self._error("Only instances have fields.")
+                instance._fields[name] = value
+                stack[-1] = value
+            elif op == SET_GLOBAL:
+                name = constants[(code[ip] << 8) | code[ip + 1]]
+                ip += 2
+                if name not in values:
+                    frame.ip = ip
+                    raise self._error(f"Undefined variable '{name}'.")
+                values[name] = stack[-1]
+            elif op == SET_UPVALUE:
+                upvalue = upvalues[code[ip]]
+                upvalue.values[upvalue.index] = stack[-1]
+                ip += 1
+            elif op == NIL:
+                push(None)
+            elif op == TRUE:
+                push(True)
+            elif op == FALSE:
+                push(False)
+            elif op == DIVIDE:
+                # Mirrors Interpreter.visit_binary_expr, which does not check
+                # the operands of a division
+                b = pop()
+                stack[-1] = float(stack[-1]) / float(b)
+            elif op == NOT:
+                value = stack[-1]
+                stack[-1] = value is None or value is False
+            elif op == NEGATE:
+                value = stack[-1]
+                if value.__class__ is not float:
+                    frame.ip = ip
+                    raise self._error("Operand must be a number.")
+                stack[-1] = -value
+            elif op == JUMP_IF_FALSE:
+                value = stack[-1]
+                if value is None or value is False:
+                    ip += ((code[ip] << 8) | code[ip + 1]) + 2
+                else:
+                    ip += 2
+            elif op == JUMP_IF_TRUE:
+                value = stack[-1]
+                if value is None or value is False:
+                    ip += 2
+                else:
+                    ip += ((code[ip] << 8) | code[ip + 1]) + 2
+            elif op == PRINT:
+                print(stringify(pop()))
+            elif op == DEFINE_GLOBAL:
+                values[constants[(code[ip] << 8) | code[ip + 1]]] = pop()
+                ip += 2
+            elif op == CLOSURE:
+                function = constants[(code[ip] << 8) | code[ip + 1]]
+                ip += 2
+                captured = []
+                for _ in range(function.upvalue_count):
+                    is_local = code[ip]
+                    index = code[ip + 1]
+                    ip += 2
+                    if is_local:
+                        captured.append(self._capture_upvalue(base + index))
+                    else:
+                        captured.append(upvalues[index])
+                push(Closure(function, captured))
+            elif op == CLOSE_UPVALUE:
+                self._close_upvalues(len(stack) - 1)
+                pop()
+            elif op == GET_SUPER:
+                name = constants[(code[ip] << 8) | code[ip + 1]]
+                ip += 2
+                superclass = pop()
+                method = superclass.find_method(name)
+                if method is None:
+                    frame.ip = ip
+                    raise self._error(f"Undefined property '{name}'.")
+                stack[-1] = BoundMethod(stack[-1], method)
+            elif op == SUPER_INVOKE:
+                name = constants[(code[ip] << 8) | code[ip + 1]]
+                arg_count = code[ip + 2]
+                ip += 3
+                frame.ip = ip
+                self._invoke_from_class(pop(), name, arg_count)
+                frame = frames[-1]
+                code = frame.code
+                constants = frame.constants
+                upvalues = frame.closure.upvalues
+                base = frame.base
+                ip = frame.ip
+            elif op == CLASS:
+                name = constants[(code[ip] << 8) | code[ip + 1]]
+                method_count = (code[ip + 2] << 8) | code[ip + 3]
+                has_superclass = code[ip + 4]
+                ip += 5
+
+                methods = {}
+                if method_count:
+                    for method in stack[-method_count:]:
+                        methods[method.function.name] = method
+                    del stack[-method_count:]
+
+                superclass = None
+                if has_superclass:
+                    superclass = stack[-1]
+                    if not isinstance(superclass, LoxClass):
+                        frame.ip = ip
+                        raise self._error("Superclass must be a class.")
+
+                push(LoxClass(name, superclass, methods))